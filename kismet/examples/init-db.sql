@@ -22,6 +22,7 @@ CREATE TABLE IF NOT EXISTS kismet_devices (
     latitude DOUBLE PRECISION,
     longitude DOUBLE PRECISION,
     altitude DOUBLE PRECISION,
+    sensor TEXT,
     last_updated TIMESTAMP DEFAULT NOW()
 );
 
@@ -34,20 +35,17 @@ CREATE INDEX IF NOT EXISTS idx_kismet_devices_last_updated ON kismet_devices(las
 CREATE INDEX IF NOT EXISTS idx_kismet_devices_location ON kismet_devices(latitude, longitude) WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
 
 -- Create events table for storing Kismet events
+-- Partitioned by day; the export client creates daily partitions (kismet_events_YYYYMMDD) as needed
 CREATE TABLE IF NOT EXISTS kismet_events (
-    id SERIAL PRIMARY KEY,
+    event_time TIMESTAMPTZ NOT NULL,
     event_type TEXT NOT NULL,
-    event_time TIMESTAMP DEFAULT NOW(),
-    device_mac TEXT,
-    event_data JSONB,
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    sensor TEXT,
+    payload JSONB NOT NULL
+) PARTITION BY RANGE (event_time);
 
 -- Create indexes for events table
-CREATE INDEX IF NOT EXISTS idx_kismet_events_type ON kismet_events(event_type);
-CREATE INDEX IF NOT EXISTS idx_kismet_events_time ON kismet_events(event_time);
-CREATE INDEX IF NOT EXISTS idx_kismet_events_device ON kismet_events(device_mac);
-CREATE INDEX IF NOT EXISTS idx_kismet_events_data ON kismet_events USING GIN(event_data);
+CREATE INDEX IF NOT EXISTS kismet_events_type_time_idx ON kismet_events(event_type, event_time);
+CREATE INDEX IF NOT EXISTS idx_kismet_events_payload ON kismet_events USING GIN(payload);
 
 -- Create a view for recent device activity
 CREATE OR REPLACE VIEW recent_devices AS
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Kismet Decode Pool
+Process-pool decode and normalization stage for high-rate Kismet streams
+Raw WebSocket frames go out in batches; DeviceRecords with their JSON already encoded come back
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from kismet_device_record import BatchTimestamp, DeviceRecord
+from kismet_json_codec import codec
+from kismet_monitor import MonitorSubscription
+
+# Per-process extractor cache (profile -> extract function)
+_extractors = {}
+
+
+def _init_worker(backend: str):
+    """Use the parent's JSON backend in each worker process"""
+    codec.set_backend(backend)
+
+
+def decode_batch(profile: str, frames: List[Any], timestamp: str, sensor: str = None,
+                 encode: bool = True) -> Tuple[List[DeviceRecord], int]:
+    """Decode and normalize a batch of monitor frames (runs in a worker)
+
+    Returns the records in frame order and the number of frames that failed
+    to parse. With encode set, each record's JSON is encoded here as well,
+    and only that JSON is pickled back to the parent.
+    """
+    extract = _extractors.get(profile)
+    if extract is None:
+        extract = _extractors[profile] = MonitorSubscription(profile=profile).extract
+
+    records = []
+    errors = 0
+    for frame in frames:
+        try:
+            record = extract(codec.loads(frame), timestamp, sensor)
+        except (json.JSONDecodeError, AttributeError):
+            errors += 1
+            continue
+        if encode:
+            record.to_json()
+        records.append(record)
+    return records, errors
+
+
+class DecodePool:
+    """Worker processes shared by every monitor stream of a client
+
+    Each stream gets a DecodePipeline that batches its frames. Batches are
+    decoded in parallel, but results are handed back strictly in the order
+    the frames arrived, so updates for a MAC never overtake each other.
+
+    If a worker dies the executor is broken for good: it is replaced with a
+    fresh one, and the batches that were lost with it are decoded in-process.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 256, batch_interval: float = 0.01,
+                 max_inflight: int = None, encode: bool = True,
+                 timestamp: Callable[[], str] = None):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_inflight = max_inflight or workers * 2
+        self.encode = encode
+        self.timestamp = timestamp or BatchTimestamp()
+        self.executor = None
+        self.stats = {
+            'batches': 0,
+            'frames': 0,
+            'records': 0,
+            'decode_errors': 0,
+            'worker_errors': 0,
+            'pool_restarts': 0,
+            'inline_batches': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.DecodePool")
+
+    def start(self):
+        """Start the worker processes"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(codec.backend,))
+            self.logger.info(f"Decode pool started with {self.workers} workers "
+                             f"(batch size {self.batch_size})")
+
+    def restart(self, executor: ProcessPoolExecutor, error: Exception):
+        """Replace a broken executor, once however many batches saw it fail"""
+        if executor is None or self.executor is not executor:
+            return
+        self.logger.warning(f"Decode worker pool broken ({error}), restarting it")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.stats['pool_restarts'] += 1
+        try:
+            self.start()
+        except Exception as e:
+            self.logger.error(f"Failed to restart decode workers, decoding in-process: {e}")
+
+    def decode_inline(self, profile: str, frames: List[Any], timestamp: str,
+                      sensor: str = None) -> Tuple[List[DeviceRecord], int]:
+        """Decode a batch on the event loop when no worker can take it"""
+        self.stats['inline_batches'] += 1
+        return decode_batch(profile, frames, timestamp, sensor, self.encode)
+
+    def pipeline(self, profile: str, deliver: Callable[[DeviceRecord], Awaitable[None]],
+                 sensor: str = None) -> 'DecodePipeline':
+        """Create an ordered pipeline for one monitor stream"""
+        self.start()
+        return DecodePipeline(self, profile, deliver, sensor)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get decode statistics"""
+        stats = dict(self.stats)
+        stats['avg_batch_size'] = stats['frames'] / stats['batches'] if stats['batches'] else 0
+        return stats
+
+    async def close(self):
+        """Stop the worker processes"""
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+class DecodePipeline:
+    """Batches one stream's frames into a DecodePool and delivers results in order"""
+
+    def __init__(self, pool: DecodePool, profile: str,
+                 deliver: Callable[[DeviceRecord], Awaitable[None]], sensor: str = None):
+        self.pool = pool
+        self.profile = profile
+        self.deliver = deliver
+        self.sensor = sensor
+        self.frames = []
+        # (future, executor, frames, timestamp) per submitted batch, oldest first;
+        # the frames are kept so a batch lost with a broken executor can be redone
+        self.inflight = deque()
+        self.ready = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.closed = False
+        self.task = asyncio.create_task(self._deliver_loop())
+
+    async def feed(self, frame):
+        """Queue a raw frame, submitting a batch once batch_size frames are pending"""
+        self.frames.append(frame)
+        if len(self.frames) == 1:
+            # Arm the partial-batch timer in the delivery loop
+            self.ready.set()
+        if len(self.frames) >= self.pool.batch_size:
+            await self._submit()
+
+    async def _submit(self):
+        """Send pending frames to the pool, waiting while too many batches are in flight"""
+        while len(self.inflight) >= self.pool.max_inflight:
+            self.drained.clear()
+            await self.drained.wait()
+
+        frames, self.frames = self.frames, []
+        if not frames:
+            return
+        loop = asyncio.get_running_loop()
+        executor = self.pool.executor
+        timestamp = self.pool.timestamp()
+        future = None
+        if executor is not None:
+            try:
+                future = loop.run_in_executor(executor, decode_batch, self.profile, frames,
+                                              timestamp, self.sensor, self.pool.encode)
+            except BrokenProcessPool as e:
+                self.pool.restart(executor, e)
+        self.inflight.append((future, executor, frames, timestamp))
+        self.pool.stats['batches'] += 1
+        self.pool.stats['frames'] += len(frames)
+        self.ready.set()
+
+    async def _deliver_loop(self):
+        """Hand back decoded batches in submission order"""
+        while not self.closed:
+            if not self.inflight:
+                if self.frames:
+                    try:
+                        await asyncio.wait_for(self.ready.wait(), self.pool.batch_interval)
+                    except asyncio.TimeoutError:
+                        # Flush a partial batch once the stream goes quiet
+                        if self.frames:
+                            await self._submit()
+                else:
+                    # Nothing pending: sleep until a frame or batch arrives
+                    await self.ready.wait()
+                self.ready.clear()
+                continue
+
+            future, executor, frames, timestamp = self.inflight[0]
+            try:
+                if future is None:
+                    raise BrokenProcessPool("batch was not accepted by the pool")
+                records, errors = await future
+            except BrokenProcessPool as e:
+                self.pool.restart(executor, e)
+                records, errors = self.pool.decode_inline(self.profile, frames, timestamp, self.sensor)
+            except Exception as e:
+                self.pool.stats['worker_errors'] += 1
+                self.pool.logger.error(f"Decode worker failed: {e}")
+                records, errors = [], 0
+            if self.closed:
+                break
+
+            self.pool.stats['records'] += len(records)
+            if errors:
+                self.pool.stats['decode_errors'] += errors
+                self.pool.logger.error(f"Failed to parse {errors} JSON messages")
+            for record in records:
+                await self.deliver(record)
+
+            self.inflight.popleft()
+            self.drained.set()
+
+    async def close(self, drain: bool = True):
+        """Stop the pipeline, delivering what is still pending unless told not to"""
+        if drain:
+            await self._submit()
+            while self.inflight and not self.task.done():
+                self.drained.clear()
+                await self.drained.wait()
+
+        # Stop the delivery loop without cancelling it mid-batch
+        self.closed = True
+        self.ready.set()
+        await self.task
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Kismet Device Record
+Schema-driven device record shared by the Kismet export clients
+The extractor is compiled once from DEVICE_FIELD_MAP instead of building a dict per message
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator
+
+from kismet_json_codec import codec
+
+# Output field, Kismet field path, default value.
+# Two-element paths read a leaf from a nested Kismet object; when the parent
+# object is missing, every field of that group is left unset.
+DEVICE_FIELD_MAP = [
+    ('mac_addr', ('kismet.device.base.macaddr',), ''),
+    ('name', ('kismet.device.base.name',), ''),
+    ('username', ('kismet.device.base.username',), ''),
+    ('phy_type', ('kismet.device.base.phyname',), ''),
+    ('manufacturer', ('kismet.device.base.manuf',), ''),
+    ('first_seen', ('kismet.device.base.first_time',), 0),
+    ('last_seen', ('kismet.device.base.last_time',), 0),
+    ('channel', ('kismet.device.base.channel',), ''),
+    ('frequency', ('kismet.device.base.frequency',), 0),
+    ('total_packets', ('kismet.device.base.packets.total',), 0),
+    ('tx_packets', ('kismet.device.base.packets.tx',), 0),
+    ('rx_packets', ('kismet.device.base.packets.rx',), 0),
+    ('data_size', ('kismet.device.base.datasize',), 0),
+    ('signal_dbm', ('kismet.device.base.signal', 'kismet.common.signal.last_signal'), 0),
+    ('noise_dbm', ('kismet.device.base.signal', 'kismet.common.signal.last_noise'), 0),
+    ('snr_db', ('kismet.device.base.signal', 'kismet.common.signal.last_snr'), 0),
+    ('latitude', ('kismet.device.base.location', 'kismet.common.location.avg_lat'), 0),
+    ('longitude', ('kismet.device.base.location', 'kismet.common.location.avg_lon'), 0),
+    ('altitude', ('kismet.device.base.location', 'kismet.common.location.avg_alt'), 0)
+]
+
+
+class DeviceRecord:
+    """Normalized device update stored in slots
+
+    Supports the read-only dict operations the exporters use (record['key'],
+    get, in, keys, items). Sinks that need a real dict call to_dict(), and
+    sinks that send JSON call to_json(); both are built once per record and
+    cached, so fan-out to several sinks pays for at most one of each (the
+    decode pool fills the JSON cache in its worker processes, and a record
+    pickled with its JSON ships only that and reloads its fields from it
+    on first access). Grouped fields
+    (signal, location) that Kismet did not send, and the origin sensor when
+    the client follows a single server, are left out of the dict view.
+    """
+
+    FIELDS = ('timestamp',) + tuple(name for name, _, _ in DEVICE_FIELD_MAP) + ('sensor',)
+    FIELD_SET = frozenset(FIELDS)
+    OPTIONAL = frozenset([name for name, path, _ in DEVICE_FIELD_MAP if len(path) > 1] + ['sensor'])
+
+    __slots__ = FIELDS + ('_dict', '_json')
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for unset slots, i.e. a record unpickled from its JSON
+        if name in self.FIELD_SET and self._json is not None:
+            self._load_json()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def _load_json(self):
+        """Fill the slots (and the dict cache) from the encoded JSON"""
+        data = codec.loads(self._json)
+        for name in self.FIELDS:
+            setattr(self, name, data.get(name))
+        if self._dict is None:
+            self._dict = data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELD_SET:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in self.OPTIONAL:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key) if key in self.FIELD_SET else None
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELD_SET and not (key in self.OPTIONAL and getattr(self, key) is None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict view of the record (cached; treat as read-only)"""
+        if self._dict is None:
+            optional = self.OPTIONAL
+            self._dict = {name: getattr(self, name) for name in self.FIELDS
+                          if not (name in optional and getattr(self, name) is None)}
+        return self._dict
+
+    def to_json(self) -> bytes:
+        """Compact JSON encoding of the dict view (cached)"""
+        if self._json is None:
+            self._json = codec.dumps_bytes(self.to_dict())
+        return self._json
+
+    def __reduce__(self):
+        # Ship the JSON if already encoded (the fields reload from it lazily),
+        # otherwise the slot values
+        if self._json is not None:
+            return (_rebuild_record, (None, self._json))
+        return (_rebuild_record, (tuple(getattr(self, name) for name in self.FIELDS),))
+
+    def copy(self) -> Dict[str, Any]:
+        """Mutable dict copy of the record"""
+        return dict(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"DeviceRecord({self.to_dict()!r})"
+
+
+def _rebuild_record(values: tuple, encoded: bytes = None) -> DeviceRecord:
+    """Unpickle a DeviceRecord (slots stay unset when only the JSON was sent)"""
+    record = object.__new__(DeviceRecord)
+    for name, value in zip(DeviceRecord.FIELDS, values or ()):
+        setattr(record, name, value)
+    record._dict = None
+    record._json = encoded
+    return record
+
+
+def record_dict(device_info) -> Dict[str, Any]:
+    """Dict form of a DeviceRecord, or the value itself if already a dict"""
+    return device_info.to_dict() if isinstance(device_info, DeviceRecord) else device_info
+
+
+def record_json(device_info) -> bytes:
+    """Compact JSON for a DeviceRecord (cached) or a plain dict"""
+    if isinstance(device_info, DeviceRecord):
+        return device_info.to_json()
+    return codec.dumps_bytes(device_info)
+
+
+def compile_extractor(field_map=DEVICE_FIELD_MAP):
+    """Generate extract(raw, timestamp, sensor=None) -> DeviceRecord for a field map
+
+    The generated function binds raw.get once, reads each nested Kismet
+    object once and assigns straight into the record slots.
+    """
+    lines = [
+        "def extract(raw, timestamp, sensor=None):",
+        "    get = raw.get",
+        "    record = new(DeviceRecord)",
+        "    record.timestamp = timestamp",
+        "    record.sensor = sensor",
+        "    record._dict = None",
+        "    record._json = None"
+    ]
+
+    groups = {}
+    for name, path, default in field_map:
+        if len(path) == 1:
+            lines.append(f"    record.{name} = get({path[0]!r}, {default!r})")
+        else:
+            groups.setdefault(path[0], []).append((name, path[1], default))
+
+    for parent, fields in groups.items():
+        lines.append(f"    group = get({parent!r})")
+        lines.append("    if group:")
+        lines.extend(f"        record.{name} = group.get({leaf!r}, {default!r})"
+                     for name, leaf, default in fields)
+        lines.append("    else:")
+        lines.extend(f"        record.{name} = None" for name, _, _ in fields)
+
+    lines.append("    return record")
+
+    namespace = {'new': object.__new__, 'DeviceRecord': DeviceRecord}
+    exec("\n".join(lines), namespace)
+    return namespace['extract']
+
+
+extract_device_record = compile_extractor()
+
+
+def compile_flat_extractor(names=None, field_map=DEVICE_FIELD_MAP):
+    """Generate extract(raw, timestamp, sensor=None) -> DeviceRecord for simplified payloads
+
+    Used with Kismet field simplification, where every requested leaf arrives
+    as a top-level key already renamed to its output name. Fields outside
+    names keep their defaults (grouped fields are left unset). Kismet fills a
+    missing path with 0, so a group whose leaves are all zero is treated as
+    absent, as it would be for the nested payload.
+    """
+    names = set(name for name, _, _ in field_map) if names is None else set(names)
+    lines = [
+        "def extract(raw, timestamp, sensor=None):",
+        "    get = raw.get",
+        "    record = new(DeviceRecord)",
+        "    record.timestamp = timestamp",
+        "    record.sensor = sensor",
+        "    record._dict = None",
+        "    record._json = None"
+    ]
+
+    groups = {}
+    for name, path, default in field_map:
+        if len(path) > 1:
+            groups.setdefault(path[0], []).append((name, default))
+        elif name in names:
+            lines.append(f"    record.{name} = get({name!r}, {default!r})")
+        else:
+            lines.append(f"    record.{name} = {default!r}")
+
+    for fields in groups.values():
+        requested = [(name, default) for name, default in fields if name in names]
+        unset = " = ".join(f"record.{name}" for name, _ in fields)
+        if not requested:
+            lines.append(f"    {unset} = None")
+            continue
+        lines.extend(f"    record.{name} = get({name!r}, {default!r})" for name, default in requested)
+        present = " or ".join(f"record.{name}" for name, _ in requested)
+        lines.append(f"    if not ({present}):")
+        lines.append(f"        {unset} = None")
+        missing = [(name, default) for name, default in fields if name not in names]
+        if missing:
+            lines.append("    else:")
+            lines.extend(f"        record.{name} = {default!r}" for name, default in missing)
+
+    lines.append("    return record")
+
+    namespace = {'new': object.__new__, 'DeviceRecord': DeviceRecord}
+    exec("\n".join(lines), namespace)
+    return namespace['extract']
+
+
+class BatchTimestamp:
+    """ISO-8601 timestamp string regenerated at most once per resolution window
+
+    Kismet delivers device updates in bursts, so records decoded within the
+    same window share one timestamp string instead of formatting a datetime
+    per message.
+    """
+
+    def __init__(self, utc: bool = False, resolution: float = 0.001):
+        self.tz = timezone.utc if utc else None
+        self.resolution = resolution
+        self.bucket = None
+        self.value = ''
+
+    def __call__(self) -> str:
+        now = time.time()
+        bucket = int(now / self.resolution)
+        if bucket != self.bucket:
+            self.bucket = bucket
+            self.value = datetime.fromtimestamp(now, self.tz).isoformat()
+        return self.value
@@ -6,20 +6,28 @@ Supports offline mode with local storage and store-and-forward capability
 """
 
 import asyncio
-import websockets
+import functools
 import json
 import argparse
 import logging
+import math
+import random
 import time
 import os
 import sqlite3
 import threading
-from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List
+import queue
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
 import signal
 import sys
 from pathlib import Path
 
+from kismet_json_codec import JSONCodec, codec
+from kismet_device_record import BatchTimestamp, DeviceRecord, record_dict
+from kismet_monitor import MonitorSubscription, MonitorSupervisor
+
 # Elasticsearch client
 try:
     from elasticsearch import Elasticsearch, helpers
@@ -28,17 +36,124 @@ try:
 except ImportError:
     ELASTICSEARCH_AVAILABLE = False
 
+# Async client for the live export path (aiohttp transport)
+try:
+    import aiohttp
+    from elasticsearch import AsyncElasticsearch
+    from elasticsearch.helpers import async_streaming_bulk
+    ASYNC_ELASTICSEARCH_AVAILABLE = True
+except ImportError:
+    ASYNC_ELASTICSEARCH_AVAILABLE = False
+
 class OfflineStorage:
-    """Local SQLite storage for offline data buffering"""
-    
-    def __init__(self, db_path: str = "kismet_offline_buffer.db"):
+    """Local SQLite storage for offline data buffering
+
+    Each thread that uses the buffer (the exporter and the background sync
+    thread) keeps one long-lived connection. The database runs in WAL mode
+    with synchronous=NORMAL, so readers do not block the writer and commits
+    do not wait on an fsync, and the busy timeout makes a thread wait for
+    the other's write to finish instead of failing.
+
+    Inserts are group-committed. Rows are queued and written with
+    executemany once batch_size rows are pending or the oldest has waited
+    flush_interval seconds. Reads flush the queue first (unless called with
+    flush=False) so callers see their own writes. Rows still queued when
+    the process dies are lost.
+
+    After start_writer(), a single writer thread owns the insert connection.
+    enqueue_device() and enqueue_event() only put rows on its queue (capped
+    at max_pending rows), so they never touch SQLite and are safe to call
+    from the event loop. flush_async() and close_async() wait for the
+    writer without blocking the loop.
+
+    Sync progress is a persisted per-table high-water mark on the row id
+    rather than a flag per row. compact() deletes confirmed rows with one
+    range delete, evicts the oldest rows while the database is over
+    max_bytes, and hands the freed pages back with incremental vacuum.
+    A buffer created before incremental vacuum needs one full VACUUM to
+    switch over; that rewrite only runs at open when convert_vacuum is set,
+    and until then freed pages are reused but the file does not shrink.
+    """
+
+    INSERT_SQL = {
+        'device_buffer': "INSERT INTO device_buffer (timestamp, mac_addr, data) VALUES (?, ?, ?)",
+        'event_buffer': "INSERT INTO event_buffer (timestamp, event_type, data) VALUES (?, ?, ?)"
+    }
+
+    def __init__(self, db_path: str = "kismet_offline_buffer.db", batch_size: int = 500,
+                 flush_interval: float = 1.0, busy_timeout: float = 30.0, max_pending: int = 100000,
+                 max_bytes: int = None, compact_interval: float = 60.0,
+                 convert_vacuum: bool = False):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.busy_timeout = busy_timeout
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+        self.convert_vacuum = convert_vacuum
+
+        # One connection per thread, all closed by close()
+        self.local = threading.local()
+        self.connections = []
+        # Guards the write queue; held across a flush so batches commit in order
+        self.write_lock = threading.RLock()
+        self.pending = {table: [] for table in self.INSERT_SQL}
+        self.pending_count = 0
+        self.pending_since = None
+        self.write_stats = {
+            'rows_written': 0,
+            'commits': 0,
+            'write_errors': 0,
+            'rows_dropped': 0,
+            'rows_deleted': 0,
+            'rows_evicted': 0
+        }
+
+        # Last synced id per table (mirrors the sync_cursor table)
+        self.cursor_lock = threading.Lock()
+        self.cursors = {table: 0 for table in self.INSERT_SQL}
+        self.last_compact = time.monotonic()
+
+        # Writer thread state
+        self.writer = None
+        self.write_queue = None
+        self.queue_stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'max_depth': 0
+        }
         self.init_database()
-        
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened and configured on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+            # Only takes effect on a new database (see init_database)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            with self.write_lock:
+                self.connections.append(conn)
+        return conn
+
     def init_database(self):
         """Initialize SQLite database for offline storage"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connection()
         cursor = conn.cursor()
+
+        # Freed pages are returned to the filesystem by compact(); a database
+        # created without incremental vacuum needs one full VACUUM to switch,
+        # which rewrites the whole file and so is only done on request
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if self.convert_vacuum:
+                logging.info(f"Enabling incremental vacuum on {self.db_path}")
+                cursor.execute("VACUUM")
+            else:
+                logging.warning(f"{self.db_path} does not use incremental vacuum, so compaction "
+                                "cannot shrink it; convert it with --buffer-convert-vacuum")
         
         # Create tables for buffering data
         cursor.execute("""
@@ -47,7 +162,6 @@ class OfflineStorage:
                 timestamp TEXT NOT NULL,
                 mac_addr TEXT NOT NULL,
                 data JSON NOT NULL,
-                synced INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -58,37 +172,198 @@ class OfflineStorage:
                 timestamp TEXT NOT NULL,
                 event_type TEXT,
                 data JSON NOT NULL,
-                synced INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_cursor (
+                table_name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL
+            )
+        """)
         
         # Create indexes for performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_device_synced ON device_buffer(synced)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_synced ON event_buffer(synced)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_device_timestamp ON device_buffer(timestamp)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_timestamp ON event_buffer(timestamp)")
+
+        # Buffers written before the sync cursor carry a synced flag per row
+        for table in self.INSERT_SQL:
+            columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+            if 'synced' in columns:
+                cursor.execute(f"DELETE FROM {table} WHERE synced = 1")
+        cursor.execute("DROP INDEX IF EXISTS idx_device_synced")
+        cursor.execute("DROP INDEX IF EXISTS idx_event_synced")
         
         conn.commit()
-        conn.close()
+
+        for table, last_id in cursor.execute("SELECT table_name, last_id FROM sync_cursor"):
+            if table in self.cursors:
+                self.cursors[table] = last_id
+
+    @staticmethod
+    def _device_row(device_data: Dict[str, Any]) -> tuple:
+        return (device_data['timestamp'], device_data['mac_addr'], codec.dumps(record_dict(device_data)))
+
+    @staticmethod
+    def _event_row(event_data: Dict[str, Any], timestamp: str = None) -> tuple:
+        return (timestamp or datetime.now(timezone.utc).isoformat(),
+                event_data.get('event_type', 'unknown'), codec.dumps(event_data))
+
+    def _queue(self, table: str, row: tuple):
+        """Queue a row, flushing when the batch is full or old enough"""
+        with self.write_lock:
+            self.pending[table].append(row)
+            self.pending_count += 1
+            now = time.monotonic()
+            if self.pending_since is None:
+                self.pending_since = now
+            if self.pending_count >= self.batch_size or now - self.pending_since >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> bool:
+        """Write all queued rows in one transaction"""
+        if self.writer is not None:
+            return self._writer_request('flush').result()
+
+        with self.write_lock:
+            if not self.pending_count:
+                return True
+            batches, self.pending = self.pending, {table: [] for table in self.INSERT_SQL}
+            count, self.pending_count = self.pending_count, 0
+            self.pending_since = None
+
+            if self._write_rows(batches, count):
+                return True
+            # Keep the rows for the next flush unless the queue is already full
+            if count + self.pending_count <= self.max_pending:
+                for table, rows in batches.items():
+                    self.pending[table][:0] = rows
+                self.pending_count += count
+                self.pending_since = time.monotonic()
+            else:
+                self.write_stats['rows_dropped'] += count
+            return False
+
+    def _write_rows(self, batches: Dict[str, list], count: int) -> bool:
+        """Insert batched rows in one transaction on this thread's connection"""
+        conn = self._connection()
+        try:
+            with conn:
+                for table, rows in batches.items():
+                    if rows:
+                        conn.executemany(self.INSERT_SQL[table], rows)
+        except Exception as e:
+            self.write_stats['write_errors'] += 1
+            logging.error(f"Failed to write {count} buffered records: {e}")
+            return False
+
+        self.write_stats['rows_written'] += count
+        self.write_stats['commits'] += 1
+        self.maybe_compact()
+        return True
+
+    def start_writer(self):
+        """Move inserts to a dedicated writer thread"""
+        if self.writer is not None:
+            return
+        self.flush()
+        # Unbounded so control messages are never refused; _enqueue caps the rows
+        self.write_queue = queue.Queue()
+        self.writer = threading.Thread(target=self._writer_loop, name="offline-buffer-writer", daemon=True)
+        self.writer.start()
+
+    def _enqueue(self, item: tuple) -> bool:
+        """Hand an item to the writer thread without blocking"""
+        if self.writer is None:
+            self.start_writer()
+        if self.write_queue.qsize() >= self.max_pending:
+            self.queue_stats['dropped'] += 1
+            return False
+        self.write_queue.put_nowait(item)
+        self.queue_stats['enqueued'] += 1
+        depth = self.write_queue.qsize()
+        if depth > self.queue_stats['max_depth']:
+            self.queue_stats['max_depth'] = depth
+        return True
+
+    def enqueue_device(self, device_data: Dict[str, Any]) -> bool:
+        """Queue device data for the writer thread (never blocks)"""
+        return self._enqueue(('device_buffer', device_data))
+
+    def enqueue_event(self, event_data: Dict[str, Any]) -> bool:
+        """Queue event data for the writer thread (never blocks)"""
+        return self._enqueue(('event_buffer', (datetime.now(timezone.utc).isoformat(), event_data)))
+
+    def _writer_request(self, command: str) -> Future:
+        """Ask the writer thread to commit (and optionally stop), resolving when done"""
+        done = Future()
+        self.write_queue.put((command, done))
+        return done
+
+    def _writer_loop(self):
+        """Group-commit queued rows until asked to stop"""
+        batches = {table: [] for table in self.INSERT_SQL}
+        count = 0
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, payload = self.write_queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, payload = None, None
+
+            if kind in self.INSERT_SQL:
+                try:
+                    row = (self._device_row(payload) if kind == 'device_buffer'
+                           else self._event_row(payload[1], payload[0]))
+                except Exception as e:
+                    logging.error(f"Failed to encode buffered record: {e}")
+                    continue
+                batches[kind].append(row)
+                count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if count < self.batch_size:
+                    continue
+
+            ok = True
+            if count:
+                ok = self._write_rows(batches, count)
+                if ok or count >= self.max_pending:
+                    if not ok:
+                        self.write_stats['rows_dropped'] += count
+                    batches = {table: [] for table in self.INSERT_SQL}
+                    count = 0
+                    deadline = None
+                else:
+                    # Retry the batch after another interval
+                    deadline = time.monotonic() + self.flush_interval
+
+            if kind in ('flush', 'stop'):
+                payload.set_result(ok)
+                if kind == 'stop':
+                    return
+
+    async def flush_async(self) -> bool:
+        """Wait for the writer thread to commit everything queued so far"""
+        if self.writer is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.flush)
+        return await asyncio.wrap_future(self._writer_request('flush'))
+
+    def get_queue_stats(self) -> Dict[str, int]:
+        """Writer queue depth and counters"""
+        stats = dict(self.queue_stats)
+        stats['depth'] = self.write_queue.qsize() if self.write_queue else self.pending_count
+        return stats
         
     def store_device(self, device_data: Dict[str, Any]) -> bool:
         """Store device data locally"""
+        if self.writer is not None:
+            return self.enqueue_device(device_data)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO device_buffer (timestamp, mac_addr, data)
-                VALUES (?, ?, ?)
-            """, (
-                device_data['timestamp'],
-                device_data['mac_addr'],
-                json.dumps(device_data)
-            ))
-            
-            conn.commit()
-            conn.close()
+            self._queue('device_buffer', self._device_row(device_data))
             return True
         except Exception as e:
             logging.error(f"Failed to store device data locally: {e}")
@@ -96,110 +371,111 @@ class OfflineStorage:
             
     def store_event(self, event_data: Dict[str, Any]) -> bool:
         """Store event data locally"""
+        if self.writer is not None:
+            return self.enqueue_event(event_data)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO event_buffer (timestamp, event_type, data)
-                VALUES (?, ?, ?)
-            """, (
-                datetime.now(timezone.utc).isoformat(),
-                event_data.get('event_type', 'unknown'),
-                json.dumps(event_data)
-            ))
-            
-            conn.commit()
-            conn.close()
+            self._queue('event_buffer', self._event_row(event_data))
             return True
         except Exception as e:
             logging.error(f"Failed to store event data locally: {e}")
             return False
             
-    def get_unsynced_devices(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Get unsynced device records"""
+    def get_unsynced_devices(self, limit: int = 1000, after_id: int = 0,
+                             flush: bool = True) -> List[Dict[str, Any]]:
+        """Get unsynced device records (optionally only those after after_id)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            if flush:
+                self.flush()
+            cursor = self._connection().execute("""
                 SELECT id, data FROM device_buffer 
-                WHERE synced = 0 
-                ORDER BY created_at ASC 
+                WHERE id > ? 
+                ORDER BY id ASC 
                 LIMIT ?
-            """, (limit,))
+            """, (max(self.cursors['device_buffer'], after_id), limit))
             
             results = []
             for row in cursor.fetchall():
                 record_id, data_json = row
-                data = json.loads(data_json)
+                data = codec.loads(data_json)
                 data['_buffer_id'] = record_id
                 results.append(data)
                 
-            conn.close()
             return results
         except Exception as e:
             logging.error(f"Failed to get unsynced devices: {e}")
             return []
             
-    def get_unsynced_events(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Get unsynced event records"""
+    def get_unsynced_events(self, limit: int = 1000, after_id: int = 0,
+                             flush: bool = True) -> List[Dict[str, Any]]:
+        """Get unsynced event records (optionally only those after after_id)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            if flush:
+                self.flush()
+            cursor = self._connection().execute("""
                 SELECT id, data FROM event_buffer 
-                WHERE synced = 0 
-                ORDER BY created_at ASC 
+                WHERE id > ? 
+                ORDER BY id ASC 
                 LIMIT ?
-            """, (limit,))
+            """, (max(self.cursors['event_buffer'], after_id), limit))
             
             results = []
             for row in cursor.fetchall():
                 record_id, data_json = row
-                data = json.loads(data_json)
+                data = codec.loads(data_json)
                 data['_buffer_id'] = record_id
                 results.append(data)
                 
-            conn.close()
             return results
         except Exception as e:
             logging.error(f"Failed to get unsynced events: {e}")
             return []
             
     def mark_synced(self, table: str, record_ids: List[int]) -> bool:
-        """Mark records as synced"""
+        """Mark records as synced
+
+        Unsynced records are read in id order, so confirming a batch moves
+        the table's cursor to its highest id; the rows themselves are removed
+        by the next compact().
+        """
         if not record_ids:
             return True
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            placeholders = ','.join(['?' for _ in record_ids])
-            cursor.execute(f"""
-                UPDATE {table} SET synced = 1 
-                WHERE id IN ({placeholders})
-            """, record_ids)
-            
-            conn.commit()
-            conn.close()
+            last_id = max(record_ids)
+            with self.cursor_lock:
+                if last_id <= self.cursors[table]:
+                    return True
+                conn = self._connection()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO sync_cursor (table_name, last_id) VALUES (?, ?)",
+                                 (table, last_id))
+                self.cursors[table] = last_id
             return True
         except Exception as e:
             logging.error(f"Failed to mark records as synced: {e}")
             return False
             
+    def count_unsynced(self, table: str, flush: bool = True) -> int:
+        """Number of records in table not yet synced"""
+        try:
+            if flush:
+                self.flush()
+            return self._connection().execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?",
+                                              (self.cursors[table],)).fetchone()[0]
+        except Exception as e:
+            logging.error(f"Failed to count unsynced records: {e}")
+            return 0
+
     def get_stats(self) -> Dict[str, int]:
         """Get buffer statistics"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.flush()
+            cursor = self._connection().cursor()
             
-            cursor.execute("SELECT COUNT(*) FROM device_buffer WHERE synced = 0")
+            cursor.execute("SELECT COUNT(*) FROM device_buffer WHERE id > ?", (self.cursors['device_buffer'],))
             unsynced_devices = cursor.fetchone()[0]
             
-            cursor.execute("SELECT COUNT(*) FROM event_buffer WHERE synced = 0")
+            cursor.execute("SELECT COUNT(*) FROM event_buffer WHERE id > ?", (self.cursors['event_buffer'],))
             unsynced_events = cursor.fetchone()[0]
             
             cursor.execute("SELECT COUNT(*) FROM device_buffer")
@@ -208,56 +484,321 @@ class OfflineStorage:
             cursor.execute("SELECT COUNT(*) FROM event_buffer")
             total_events = cursor.fetchone()[0]
             
-            conn.close()
-            
             return {
                 'unsynced_devices': unsynced_devices,
                 'unsynced_events': unsynced_events,
                 'total_devices': total_devices,
-                'total_events': total_events
+                'total_events': total_events,
+                'buffer_commits': self.write_stats['commits'],
+                'buffer_write_errors': self.write_stats['write_errors'],
+                'buffer_queue_depth': self.get_queue_stats()['depth'],
+                'buffer_bytes': self._used_bytes(self._connection()),
+                'buffer_evicted': self.write_stats['rows_evicted']
             }
         except Exception as e:
             logging.error(f"Failed to get buffer stats: {e}")
             return {}
             
-    def cleanup_old_synced(self, days: int = 7) -> int:
-        """Clean up old synced records"""
+    @staticmethod
+    def _used_bytes(conn: sqlite3.Connection) -> int:
+        """Bytes of the database file holding live pages"""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def maybe_compact(self):
+        """Run compact() at most once per compact_interval"""
+        now = time.monotonic()
+        with self.cursor_lock:
+            if now - self.last_compact < self.compact_interval:
+                return
+            self.last_compact = now
+        self.compact()
+
+    def compact(self) -> int:
+        """Delete synced rows, enforce the size cap and reclaim free pages
+
+        Returns the number of rows removed.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            cursor.execute("""
-                DELETE FROM device_buffer 
-                WHERE synced = 1 AND created_at < ?
-            """, (cutoff_date.isoformat(),))
-            
-            device_deleted = cursor.rowcount
-            
-            cursor.execute("""
-                DELETE FROM event_buffer 
-                WHERE synced = 1 AND created_at < ?
-            """, (cutoff_date.isoformat(),))
-            
-            event_deleted = cursor.rowcount
-            
-            conn.commit()
-            conn.close()
-            
-            return device_deleted + event_deleted
+            conn = self._connection()
+            with self.cursor_lock:
+                cursors = dict(self.cursors)
+
+            deleted = 0
+            with conn:
+                for table, last_id in cursors.items():
+                    deleted += conn.execute(f"DELETE FROM {table} WHERE id <= ?", (last_id,)).rowcount
+            self.write_stats['rows_deleted'] += deleted
+
+            evicted = self._evict(conn) if self.max_bytes else 0
+
+            # executescript steps the pragma until every free page is released
+            conn.executescript("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            return deleted + evicted
         except Exception as e:
-            logging.error(f"Failed to cleanup old records: {e}")
+            logging.error(f"Failed to compact offline buffer: {e}")
             return 0
 
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Drop the oldest rows until the live pages fit in max_bytes
+
+        Each pass removes the same oldest fraction of every table, aiming a
+        little under the cap so a full buffer does not evict on every insert.
+        """
+        evicted = 0
+        target = self.max_bytes * 0.9
+        while True:
+            used = self._used_bytes(conn)
+            if used <= self.max_bytes:
+                break
+            fraction = (used - target) / used
+
+            removed = 0
+            with conn:
+                for table in self.INSERT_SQL:
+                    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    oldest = math.ceil(count * fraction)
+                    if oldest:
+                        removed += conn.execute(f"""
+                            DELETE FROM {table} WHERE id IN (
+                                SELECT id FROM {table} ORDER BY id LIMIT ?
+                            )
+                        """, (oldest,)).rowcount
+            if not removed:
+                break
+            evicted += removed
+
+        if evicted:
+            self.write_stats['rows_evicted'] += evicted
+            logging.warning(f"Offline buffer over {self.max_bytes} bytes, evicted {evicted} oldest records")
+        return evicted
+
+    def _stop_writer(self) -> Optional[Future]:
+        """Ask the writer thread to commit what is queued and exit"""
+        if self.writer is None:
+            return None
+        return self._writer_request('stop')
+
+    def _close_connections(self):
+        self.writer = None
+        with self.write_lock:
+            for conn in self.connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self.connections = []
+        self.local = threading.local()
+
+    def close(self):
+        """Write queued rows and close every thread's connection"""
+        stopped = self._stop_writer()
+        if stopped is not None:
+            stopped.result()
+        else:
+            self.flush()
+        self._close_connections()
+
+    async def close_async(self):
+        """Close without blocking the event loop"""
+        stopped = self._stop_writer()
+        if stopped is not None:
+            await asyncio.wrap_future(stopped)
+        else:
+            await self.flush_async()
+        self._close_connections()
+
+
+class DrainThrottle:
+    """Concurrency limit for draining the offline buffer
+
+    Halves the number of bulk requests in flight whenever Elasticsearch
+    answers 429 and adds one back after each chunk that goes through
+    cleanly, up to max_workers. Retry delays back off exponentially with
+    jitter and reset after a clean chunk.
+    """
+
+    def __init__(self, max_workers: int, initial_backoff: float = 1.0, max_backoff: float = 30.0):
+        self.max_workers = max_workers
+        self.limit = max_workers
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.delay = initial_backoff
+        self.lock = threading.Lock()
+        self.throttled = 0
+
+    def backoff(self) -> float:
+        """Record a 429 and return how long to wait before retrying"""
+        with self.lock:
+            self.throttled += 1
+            self.limit = max(1, self.limit // 2)
+            delay = self.delay
+            self.delay = min(self.delay * 2, self.max_backoff)
+        return delay + random.uniform(0, delay / 2)
+
+    def recover(self):
+        """Record a chunk that was indexed without throttling"""
+        with self.lock:
+            self.limit = min(self.max_workers, self.limit + 1)
+            self.delay = self.initial_backoff
+
+
+class BulkIndexer:
+    """Buffered bulk indexing on AsyncElasticsearch for the live export path
+
+    Prepared documents are buffered with their source already encoded and
+    sent as one bulk request once max_docs documents or max_bytes of source
+    are pending, or flush_interval has passed. Up to max_inflight requests
+    run at once; past that, add() waits for one to finish, which bounds the
+    memory held while Elasticsearch is slow. Results come back in request
+    order, so only the documents Elasticsearch rejected (or all documents of
+    a request that failed outright) are handed to fallback(kind, record).
+    """
+
+    def __init__(self, client: 'AsyncElasticsearch', fallback: Callable[[str, Any], Any],
+                 max_docs: int = 500, max_bytes: int = 5 * 1024 * 1024,
+                 flush_interval: float = 1.0, max_inflight: int = 2):
+        self.client = client
+        self.fallback = fallback
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.max_inflight = max_inflight
+
+        # (action, kind, record) waiting for the next request
+        self.docs = []
+        self.pending_bytes = 0
+        self.inflight = set()
+        self.slots = None
+        self.flush_task = None
+        self.flush_event = None
+        self.flush_lock = None
+        self.stats = {
+            'docs_indexed': 0,
+            'docs_failed': 0,
+            'requests': 0,
+            'request_errors': 0,
+            'last_request_ms': 0.0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.BulkIndexer")
+
+    async def add(self, action: Dict[str, Any], kind: str, record: Any):
+        """Buffer a prepared document, sending a request once a batch is ready"""
+        action['_source'] = codec.dumps(action['_source'])
+        self.docs.append((action, kind, record))
+        self.pending_bytes += len(action['_source'])
+        self._ensure_flush_task()
+        if len(self.docs) >= self.max_docs or self.pending_bytes >= self.max_bytes:
+            await self.flush()
+
+    def _ensure_flush_task(self):
+        """Start the interval flusher on first use"""
+        if self.flush_task is None or self.flush_task.done():
+            self.slots = self.slots or asyncio.Semaphore(self.max_inflight)
+            self.flush_event = asyncio.Event()
+            self.flush_lock = asyncio.Lock()
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Send partial batches once flush_interval elapses"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Start a bulk request for everything buffered, waiting for a free slot"""
+        if not self.docs or self.flush_lock is None:
+            return
+
+        async with self.flush_lock:
+            await self.slots.acquire()
+            batch, self.docs = self.docs, []
+            self.pending_bytes = 0
+            if not batch:
+                self.slots.release()
+                return
+            task = asyncio.create_task(self._send(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def _send(self, batch: list):
+        """Index one batch and hand failed documents to the fallback"""
+        start = time.perf_counter()
+        done = 0
+        failed = []
+        try:
+            async for ok, item in async_streaming_bulk(
+                    self.client, (action for action, _, _ in batch),
+                    chunk_size=len(batch), max_chunk_bytes=self.max_bytes * 2,
+                    raise_on_error=False, raise_on_exception=False):
+                if not ok:
+                    if not failed:
+                        info = next(iter(item.values()))
+                        self.logger.error(f"Elasticsearch rejected document (status {info.get('status')}): "
+                                          f"{info.get('error')}")
+                    failed.append(batch[done])
+                done += 1
+        except Exception as e:
+            self.stats['request_errors'] += 1
+            self.logger.error(f"Bulk request of {len(batch)} documents failed: {e}")
+            failed.extend(batch[done:])
+        finally:
+            self.slots.release()
+
+        self.stats['requests'] += 1
+        self.stats['docs_indexed'] += len(batch) - len(failed)
+        self.stats['docs_failed'] += len(failed)
+        self.stats['last_request_ms'] = (time.perf_counter() - start) * 1000
+        for _, kind, record in failed:
+            self.fallback(kind, record)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bulk indexer statistics"""
+        stats = dict(self.stats)
+        stats['buffered'] = len(self.docs)
+        stats['inflight'] = len(self.inflight)
+        return stats
+
+    async def close(self):
+        """Send what is buffered, wait for in-flight requests and close the client"""
+        if self.flush_task:
+            # Let a flush that is waiting for a slot finish first
+            async with self.flush_lock:
+                self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+            await self.flush()
+        if self.inflight:
+            await asyncio.gather(*self.inflight, return_exceptions=True)
+        await self.client.close()
+
 
 class ElasticsearchExporter:
-    """Export device data to Elasticsearch with offline support"""
+    """Export device data to Elasticsearch with offline support
+
+    While connected, live updates go through a BulkIndexer on
+    AsyncElasticsearch; documents it fails to index are written to the
+    offline buffer and synced later with the rest of the backlog.
+    """
     
     def __init__(self, hosts: List[str], index_prefix: str = "kismet", 
                  username: str = None, password: str = None, 
                  api_key: str = None, offline_mode: bool = False,
-                 offline_storage: OfflineStorage = None):
+                 offline_storage: OfflineStorage = None, bulk_size: int = 500,
+                 bulk_max_bytes: int = 5 * 1024 * 1024, bulk_interval: float = 1.0,
+                 bulk_inflight: int = 2, drain_workers: int = 4, drain_chunk_size: int = 500):
         
         if not ELASTICSEARCH_AVAILABLE:
             raise ImportError("elasticsearch not available. Install with: pip install elasticsearch")
@@ -268,6 +809,18 @@ class ElasticsearchExporter:
         self.offline_storage = offline_storage or OfflineStorage()
         self.es_client = None
         self.connected = False
+        self.client_config = None
+
+        # Live export path, created on the event loop at the first update
+        self.bulk_size = bulk_size
+        self.bulk_max_bytes = bulk_max_bytes
+        self.bulk_interval = bulk_interval
+        self.bulk_inflight = bulk_inflight
+
+        # Offline backlog sync (0 workers syncs one batch per interval)
+        self.drain_workers = drain_workers
+        self.drain_chunk_size = drain_chunk_size
+        self.indexer = None
         
         # Setup Elasticsearch client
         if not offline_mode:
@@ -292,6 +845,7 @@ class ElasticsearchExporter:
             elif username and password:
                 client_config['basic_auth'] = (username, password)
                 
+            self.client_config = client_config
             self.es_client = Elasticsearch(**client_config)
             
             # Test connection
@@ -389,9 +943,15 @@ class ElasticsearchExporter:
                     self._setup_elasticsearch_client()
                     
                 if self.connected:
-                    synced = self.sync_offline_data()
+                    if self.drain_workers:
+                        synced = self.drain_offline_data(chunk_size=self.drain_chunk_size,
+                                                         workers=self.drain_workers,
+                                                         should_stop=lambda: not self.sync_running)
+                    else:
+                        synced = self.sync_offline_data()
                     if synced > 0:
                         logging.info(f"Background sync: {synced} records synced")
+                        self.offline_storage.maybe_compact()
                         
                 time.sleep(interval)
             except Exception as e:
@@ -422,7 +982,7 @@ class ElasticsearchExporter:
                     total_synced += len(device_docs)
                     
             # Sync events
-            events = self.offline_storage.get_unsynced_events(batch_size)
+            events = self.offline_storage.get_unsynced_events(batch_size, flush=False)
             if events:
                 event_docs = []
                 event_ids = []
@@ -441,11 +1001,192 @@ class ElasticsearchExporter:
             
         return total_synced
         
+    def drain_offline_data(self, chunk_size: int = 500, workers: int = 4,
+                           progress_interval: float = 10.0, initial_backoff: float = 1.0,
+                           should_stop: Callable[[], bool] = None) -> int:
+        """Sync the whole offline backlog, keeping several bulk requests in flight
+
+        Chunks are read ahead from the buffer while earlier ones are being
+        indexed. Chunks can finish out of order, so the sync cursor only
+        advances over the contiguous run of finished chunks; a chunk that
+        cannot be delivered stops the drain and everything from it onwards is
+        sent again next time.
+        """
+        if not self.connected:
+            return 0
+
+        throttle = DrainThrottle(workers, initial_backoff=initial_backoff)
+        total_synced = 0
+        # Commit queued rows once; chunk reads then skip the flush so the
+        # drain does not force a writer commit per chunk
+        self.offline_storage.flush()
+        tables = (
+            ('device_buffer', self.offline_storage.get_unsynced_devices, self._prepare_device_doc),
+            ('event_buffer', self.offline_storage.get_unsynced_events, self._prepare_event_doc)
+        )
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="offline-drain") as executor:
+            for table, read, prepare in tables:
+                synced, complete = self._drain_table(executor, throttle, table, read, prepare,
+                                                     chunk_size, progress_interval, should_stop)
+                total_synced += synced
+                if not complete:
+                    break
+
+        if throttle.throttled:
+            logging.warning(f"Offline drain throttled {throttle.throttled} times by Elasticsearch")
+        return total_synced
+
+    def _drain_table(self, executor: ThreadPoolExecutor, throttle: DrainThrottle, table: str,
+                     read: Callable, prepare: Callable, chunk_size: int,
+                     progress_interval: float, should_stop: Callable[[], bool] = None):
+        """Drain one buffer table; returns (records synced, whether the backlog was emptied)"""
+        backlog = self.offline_storage.count_unsynced(table, flush=False)
+        if not backlog:
+            return 0, True
+
+        logging.info(f"Draining {backlog} buffered records from {table}")
+        start = last_report = time.monotonic()
+        # Sequence number -> (future, last buffer id, record count)
+        inflight = {}
+        finished = {}
+        next_seq = confirmed_seq = 0
+        after_id = 0
+        exhausted = failed = False
+        synced = 0
+
+        while inflight or not (exhausted or failed):
+            if should_stop and should_stop():
+                failed = True
+
+            # Read ahead while the throttle allows more requests
+            while not (exhausted or failed) and len(inflight) < throttle.limit:
+                rows = read(chunk_size, after_id=after_id, flush=False)
+                if not rows:
+                    exhausted = True
+                    break
+                after_id = rows[-1]['_buffer_id']
+                docs = [prepare(row) for row in rows]
+                inflight[next_seq] = (executor.submit(self._index_chunk, docs, throttle, should_stop),
+                                      after_id, len(rows))
+                next_seq += 1
+
+            if not inflight:
+                break
+            wait([future for future, _, _ in inflight.values()], return_when=FIRST_COMPLETED)
+            for seq in [seq for seq, (future, _, _) in inflight.items() if future.done()]:
+                future, last_id, count = inflight.pop(seq)
+                if future.result() is None:
+                    failed = True
+                else:
+                    finished[seq] = (last_id, count)
+
+            # Confirm the contiguous run of finished chunks
+            last_id = None
+            while confirmed_seq in finished:
+                last_id, count = finished.pop(confirmed_seq)
+                synced += count
+                confirmed_seq += 1
+            if last_id is not None:
+                self.offline_storage.mark_synced(table, [last_id])
+
+            now = time.monotonic()
+            if now - last_report >= progress_interval:
+                last_report = now
+                rate = synced / (now - start)
+                eta = f"{(backlog - synced) / rate:.0f}s" if rate else "unknown"
+                logging.info(f"Drain {table}: {synced}/{backlog} records, {rate:.0f} records/s, "
+                             f"{throttle.limit} requests in flight, ETA {eta}")
+
+        elapsed = time.monotonic() - start
+        logging.info(f"Drained {synced} records from {table} in {elapsed:.1f}s")
+        return synced, not failed
+
+    def _index_chunk(self, docs: List[Dict[str, Any]], throttle: DrainThrottle,
+                     should_stop: Callable[[], bool] = None, max_retries: int = 8) -> Optional[int]:
+        """Index one chunk, retrying documents Elasticsearch throttled
+
+        Returns the number of documents indexed, or None if the chunk could
+        not be delivered: the request failed, documents were still throttled
+        after max_retries retries, or should_stop() turned true while waiting.
+        Documents rejected for other reasons (mappings, malformed data) are
+        logged and skipped so they cannot stall the drain.
+        """
+        indexed = 0
+        pending = docs
+        for attempt in range(max_retries + 1):
+            retry = []
+            try:
+                results = helpers.streaming_bulk(self.es_client, pending, chunk_size=len(pending),
+                                                 raise_on_error=False, raise_on_exception=False)
+                for doc, (ok, item) in zip(pending, results):
+                    if ok:
+                        indexed += 1
+                        continue
+                    info = next(iter(item.values()))
+                    if info.get('status') == 429:
+                        retry.append(doc)
+                    else:
+                        logging.error(f"Elasticsearch rejected buffered document "
+                                      f"(status {info.get('status')}): {info.get('error')}")
+            except Exception as e:
+                logging.error(f"Bulk request of {len(pending)} buffered documents failed: {e}")
+                return None
+
+            if not retry:
+                throttle.recover()
+                return indexed
+            if attempt == max_retries:
+                logging.error(f"Giving up on {len(retry)} buffered documents still throttled "
+                              f"after {max_retries} retries")
+                return None
+
+            # Wait out the backoff in short steps so a stop request is not held up
+            deadline = time.monotonic() + throttle.backoff()
+            while True:
+                if should_stop and should_stop():
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.1))
+            pending = retry
+        return None
+
+    @staticmethod
+    def _record_time(data: Dict[str, Any]) -> Optional[datetime]:
+        """When a record was observed: last_seen, else its timestamp field"""
+        last_seen = data.get('last_seen')
+        if last_seen:
+            try:
+                return datetime.fromtimestamp(float(last_seen), timezone.utc)
+            except (TypeError, ValueError, OverflowError, OSError):
+                pass
+        timestamp = data.get('timestamp')
+        if isinstance(timestamp, str):
+            try:
+                observed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+            return observed if observed.tzinfo else observed.replace(tzinfo=timezone.utc)
+        return None
+
     def _prepare_device_doc(self, device_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Prepare device document for Elasticsearch"""
+        """Prepare device document for Elasticsearch
+
+        The index month and _id come from the record itself, so a replayed or
+        drained record lands in the same document however late it is sent.
+        """
+        observed = self._record_time(device_data)
+        if observed is not None:
+            doc_id = f"{device_data['mac_addr']}-{round(observed.timestamp() * 1000)}"
+        elif device_data.get('_buffer_id') is not None:
+            doc_id = f"{device_data['mac_addr']}-buffer-{device_data['_buffer_id']}"
+        else:
+            doc_id = f"{device_data['mac_addr']}-{int(time.time())}"
+        month = (observed or datetime.now(timezone.utc)).strftime('%Y.%m')
         doc = {
-            '_index': f"{self.index_prefix}-devices-{datetime.now().strftime('%Y.%m')}",
-            '_id': f"{device_data['mac_addr']}-{int(time.time())}",
+            '_index': f"{self.index_prefix}-devices-{month}",
+            '_id': doc_id,
             '_source': device_data.copy()
         }
         
@@ -463,8 +1204,9 @@ class ElasticsearchExporter:
         
     def _prepare_event_doc(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
         """Prepare event document for Elasticsearch"""
+        month = (self._record_time(event_data) or datetime.now(timezone.utc)).strftime('%Y.%m')
         doc = {
-            '_index': f"{self.index_prefix}-events-{datetime.now().strftime('%Y.%m')}",
+            '_index': f"{self.index_prefix}-events-{month}",
             '_source': event_data.copy()
         }
         
@@ -482,11 +1224,28 @@ class ElasticsearchExporter:
             logging.error(f"Bulk index failed: {e}")
             return False
             
+    def _get_indexer(self) -> Optional[BulkIndexer]:
+        """Bulk indexer for the live path, or None to index one document at a time"""
+        if self.indexer is None and ASYNC_ELASTICSEARCH_AVAILABLE and self.client_config:
+            self.indexer = BulkIndexer(AsyncElasticsearch(**self.client_config), self._buffer_failed,
+                                       max_docs=self.bulk_size, max_bytes=self.bulk_max_bytes,
+                                       flush_interval=self.bulk_interval, max_inflight=self.bulk_inflight)
+        return self.indexer
+
+    def _buffer_failed(self, kind: str, record: Any):
+        """Keep a document the bulk indexer could not deliver"""
+        if kind == 'device':
+            self.offline_storage.enqueue_device(record)
+        else:
+            self.offline_storage.enqueue_event(record)
+
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device to Elasticsearch (online) or local storage (offline)"""
         if self.offline_mode or not self.connected:
             # Store locally
-            self.offline_storage.store_device(device_info)
+            self.offline_storage.enqueue_device(device_info)
+        elif self._get_indexer():
+            await self.indexer.add(self._prepare_device_doc(device_info), 'device', device_info)
         else:
             # Try to send to Elasticsearch directly
             try:
@@ -499,13 +1258,15 @@ class ElasticsearchExporter:
             except Exception as e:
                 logging.error(f"Failed to export device to Elasticsearch: {e}")
                 # Fallback to local storage
-                self.offline_storage.store_device(device_info)
+                self.offline_storage.enqueue_device(device_info)
                 
     async def export_event(self, event_data: Dict[str, Any]):
         """Export event to Elasticsearch (online) or local storage (offline)"""
         if self.offline_mode or not self.connected:
             # Store locally
-            self.offline_storage.store_event(event_data)
+            self.offline_storage.enqueue_event(event_data)
+        elif self._get_indexer():
+            await self.indexer.add(self._prepare_event_doc(event_data), 'event', event_data)
         else:
             # Try to send to Elasticsearch directly
             try:
@@ -517,7 +1278,7 @@ class ElasticsearchExporter:
             except Exception as e:
                 logging.error(f"Failed to export event to Elasticsearch: {e}")
                 # Fallback to local storage
-                self.offline_storage.store_event(event_data)
+                self.offline_storage.enqueue_event(event_data)
                 
     def get_status(self) -> Dict[str, Any]:
         """Get exporter status"""
@@ -530,11 +1291,17 @@ class ElasticsearchExporter:
         # Add buffer stats
         buffer_stats = self.offline_storage.get_stats()
         status.update(buffer_stats)
+
+        if self.indexer:
+            status['bulk'] = self.indexer.get_stats()
         
         return status
         
     async def close(self):
         """Close exporter and cleanup"""
+        if self.indexer:
+            await self.indexer.close()
+
         self.sync_running = False
         if self.sync_thread:
             self.sync_thread.join(timeout=5)
@@ -542,21 +1309,35 @@ class ElasticsearchExporter:
         if self.es_client:
             self.es_client.close()
 
+        await self.offline_storage.close_async()
+
 
 class KismetElasticsearchClient:
     """Main client for Kismet to Elasticsearch export"""
     
     def __init__(self, kismet_host: str = "localhost", kismet_port: int = 2501,
                  update_rate: int = 5, elasticsearch_hosts: List[str] = None,
-                 offline_mode: bool = False):
+                 offline_mode: bool = False, subscription: MonitorSubscription = None,
+                 catchup_page_size: int = 500, reconnect_max_backoff: float = 60.0):
         self.kismet_host = kismet_host
         self.kismet_port = kismet_port
         self.update_rate = update_rate
         self.elasticsearch_hosts = elasticsearch_hosts or ["http://localhost:9200"]
         self.offline_mode = offline_mode
         self.running = False
-        self.websocket = None
         self.exporter = None
+
+        # Fields and phy/device filters requested from Kismet
+        self.subscription = subscription or MonitorSubscription(rate=update_rate)
+
+        # Reconnects with backoff and catches up on updates missed while down
+        self.supervisor = MonitorSupervisor(kismet_host, kismet_port, self.subscription,
+                                            self.process_device_update,
+                                            catchup_page_size=catchup_page_size,
+                                            max_backoff=reconnect_max_backoff)
+
+        # Updates arriving in the same burst share one timestamp string
+        self.timestamp = BatchTimestamp(utc=True)
         
         # Statistics
         self.stats = {
@@ -575,9 +1356,19 @@ class KismetElasticsearchClient:
         self.logger = logging.getLogger(__name__)
         
     async def initialize(self, es_username: str = None, es_password: str = None, 
-                        es_api_key: str = None, index_prefix: str = "kismet"):
+                        es_api_key: str = None, index_prefix: str = "kismet",
+                        buffer_db: str = "kismet_offline_buffer.db", buffer_batch_size: int = 500,
+                        buffer_flush_interval: float = 1.0, buffer_max_bytes: int = None,
+                        buffer_convert_vacuum: bool = False,
+                        bulk_size: int = 500, bulk_max_bytes: int = 5 * 1024 * 1024,
+                        bulk_interval: float = 1.0, bulk_inflight: int = 2,
+                        drain_workers: int = 4, drain_chunk_size: int = 500,
+                        background_sync: bool = True):
         """Initialize the Elasticsearch exporter"""
-        offline_storage = OfflineStorage()
+        offline_storage = OfflineStorage(buffer_db, batch_size=buffer_batch_size,
+                                         flush_interval=buffer_flush_interval,
+                                         max_bytes=buffer_max_bytes,
+                                         convert_vacuum=buffer_convert_vacuum)
         
         self.exporter = ElasticsearchExporter(
             hosts=self.elasticsearch_hosts,
@@ -586,70 +1377,25 @@ class KismetElasticsearchClient:
             password=es_password,
             api_key=es_api_key,
             offline_mode=self.offline_mode,
-            offline_storage=offline_storage
+            offline_storage=offline_storage,
+            bulk_size=bulk_size,
+            bulk_max_bytes=bulk_max_bytes,
+            bulk_interval=bulk_interval,
+            bulk_inflight=bulk_inflight,
+            drain_workers=drain_workers,
+            drain_chunk_size=drain_chunk_size
         )
         
         # Start background sync if not in offline mode
-        if not self.offline_mode:
+        if not self.offline_mode and background_sync:
             self.exporter.start_background_sync(interval=60)
             
     async def connect_and_monitor(self):
-        """Connect to Kismet WebSocket and start monitoring"""
-        uri = f"ws://{self.kismet_host}:{self.kismet_port}/devices/monitor"
-        
-        try:
-            self.logger.info(f"Connecting to Kismet at {uri}")
-            async with websockets.connect(uri) as websocket:
-                self.websocket = websocket
-                self.running = True
-                self.stats['start_time'] = time.time()
-                
-                # Configure device monitoring
-                monitor_config = {
-                    "monitor": "*",
-                    "rate": self.update_rate,
-                    "request": 1,
-                    "format": "json",
-                    "fields": [
-                        "kismet.device.base.macaddr",
-                        "kismet.device.base.name",
-                        "kismet.device.base.username", 
-                        "kismet.device.base.phyname",
-                        "kismet.device.base.signal",
-                        "kismet.device.base.location",
-                        "kismet.device.base.last_time",
-                        "kismet.device.base.first_time",
-                        "kismet.device.base.packets.total",
-                        "kismet.device.base.packets.tx",
-                        "kismet.device.base.packets.rx",
-                        "kismet.device.base.datasize",
-                        "kismet.device.base.channel",
-                        "kismet.device.base.frequency",
-                        "kismet.device.base.manuf"
-                    ]
-                }
-                
-                await websocket.send(json.dumps(monitor_config))
-                self.logger.info(f"Started monitoring devices with {self.update_rate}s update rate")
-                
-                # Process incoming messages
-                async for message in websocket:
-                    if not self.running:
-                        break
-                        
-                    try:
-                        device_data = json.loads(message)
-                        await self.process_device_update(device_data)
-                        
-                    except json.JSONDecodeError as e:
-                        self.logger.error(f"Failed to parse JSON message: {e}")
-                    except Exception as e:
-                        self.logger.error(f"Error processing device update: {e}")
-                        
-        except websockets.exceptions.ConnectionClosed:
-            self.logger.warning("WebSocket connection closed")
-        except Exception as e:
-            self.logger.error(f"Connection error: {e}")
+        """Connect to Kismet WebSocket and keep monitoring until stopped"""
+        self.running = True
+        self.stats['start_time'] = time.time()
+        self.logger.info(f"Monitoring devices: {self.subscription.describe()}")
+        await self.supervisor.run()
             
     async def process_device_update(self, device_data: Dict[str, Any]):
         """Process a device update message"""
@@ -663,44 +1409,9 @@ class KismetElasticsearchClient:
         if self.exporter:
             await self.exporter.export_device(device_info)
             
-    def extract_device_info(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    def extract_device_info(self, raw_data: Dict[str, Any]) -> DeviceRecord:
         """Extract and normalize device information"""
-        device_info = {
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'mac_addr': raw_data.get('kismet.device.base.macaddr', ''),
-            'name': raw_data.get('kismet.device.base.name', ''),
-            'username': raw_data.get('kismet.device.base.username', ''),
-            'phy_type': raw_data.get('kismet.device.base.phyname', ''),
-            'manufacturer': raw_data.get('kismet.device.base.manuf', ''),
-            'first_seen': raw_data.get('kismet.device.base.first_time', 0),
-            'last_seen': raw_data.get('kismet.device.base.last_time', 0),
-            'channel': raw_data.get('kismet.device.base.channel', ''),
-            'frequency': raw_data.get('kismet.device.base.frequency', 0),
-            'total_packets': raw_data.get('kismet.device.base.packets.total', 0),
-            'tx_packets': raw_data.get('kismet.device.base.packets.tx', 0),
-            'rx_packets': raw_data.get('kismet.device.base.packets.rx', 0),
-            'data_size': raw_data.get('kismet.device.base.datasize', 0)
-        }
-        
-        # Extract signal information
-        signal_data = raw_data.get('kismet.device.base.signal', {})
-        if signal_data:
-            device_info.update({
-                'signal_dbm': signal_data.get('kismet.common.signal.last_signal', 0),
-                'noise_dbm': signal_data.get('kismet.common.signal.last_noise', 0),
-                'snr_db': signal_data.get('kismet.common.signal.last_snr', 0)
-            })
-            
-        # Extract location information
-        location_data = raw_data.get('kismet.device.base.location', {})
-        if location_data:
-            device_info.update({
-                'latitude': location_data.get('kismet.common.location.avg_lat', 0),
-                'longitude': location_data.get('kismet.common.location.avg_lon', 0),
-                'altitude': location_data.get('kismet.common.location.avg_alt', 0)
-            })
-            
-        return device_info
+        return self.subscription.extract(raw_data, self.timestamp())
         
     def print_stats(self):
         """Print current statistics"""
@@ -714,6 +1425,10 @@ class KismetElasticsearchClient:
             print(f"Events processed: {self.stats['events_processed']}")
             print(f"Processing rate: {rate:.2f} devices/second")
             print(f"Last update: {datetime.fromtimestamp(self.stats['last_update']) if self.stats['last_update'] else 'Never'}")
+
+            monitor_stats = self.supervisor.get_stats()
+            print(f"Kismet reconnects: {monitor_stats['reconnects']}, "
+                  f"caught up: {monitor_stats['catchup_records']}, duplicates: {monitor_stats['duplicates']}")
             
             if self.exporter:
                 status = self.exporter.get_status()
@@ -721,11 +1436,23 @@ class KismetElasticsearchClient:
                 print(f"Offline mode: {status['offline_mode']}")
                 print(f"Unsynced devices: {status.get('unsynced_devices', 0)}")
                 print(f"Unsynced events: {status.get('unsynced_events', 0)}")
+                print(f"Buffer size: {status.get('buffer_bytes', 0)} bytes, "
+                      f"evicted over the size cap: {status.get('buffer_evicted', 0)}")
+                if 'bulk' in status:
+                    bulk = status['bulk']
+                    print(f"Bulk indexed: {bulk['docs_indexed']}, failed: {bulk['docs_failed']}, "
+                          f"requests: {bulk['requests']} (last {bulk['last_request_ms']:.0f} ms)")
                 
     async def sync_offline_data(self):
         """Manually trigger sync of offline data"""
         if self.exporter:
-            synced = self.exporter.sync_offline_data()
+            loop = asyncio.get_running_loop()
+            if self.exporter.drain_workers:
+                synced = await loop.run_in_executor(None, functools.partial(
+                    self.exporter.drain_offline_data, chunk_size=self.exporter.drain_chunk_size,
+                    workers=self.exporter.drain_workers))
+            else:
+                synced = await loop.run_in_executor(None, self.exporter.sync_offline_data)
             self.stats['sync_count'] += synced
             self.logger.info(f"Manual sync: {synced} records synced")
             return synced
@@ -734,8 +1461,7 @@ class KismetElasticsearchClient:
     async def stop(self):
         """Stop the export client"""
         self.running = False
-        if self.websocket:
-            await self.websocket.close()
+        await self.supervisor.stop()
         if self.exporter:
             await self.exporter.close()
         self.print_stats()
@@ -754,13 +1480,52 @@ async def main():
     parser.add_argument("--es-password", help="Elasticsearch password")
     parser.add_argument("--es-api-key", help="Elasticsearch API key")
     parser.add_argument("--index-prefix", default="kismet", help="Elasticsearch index prefix")
+    parser.add_argument("--bulk-size", type=int, default=500,
+                       help="Documents per bulk request on the live export path")
+    parser.add_argument("--bulk-max-bytes", type=int, default=5 * 1024 * 1024,
+                       help="Document bytes that trigger a bulk request")
+    parser.add_argument("--bulk-interval", type=float, default=1.0,
+                       help="Maximum seconds a document waits before its bulk request is sent")
+    parser.add_argument("--bulk-inflight", type=int, default=2,
+                       help="Concurrent bulk requests before new updates wait")
+    
+    # Subscription options
+    parser.add_argument("--monitor-profile", choices=MonitorSubscription.PROFILES, default="compact",
+                       help="Fields requested from Kismet (compact/minimal use server-side field simplification)")
+    parser.add_argument("--phy", nargs='+',
+                       help="Only subscribe to these phy types (e.g. IEEE802.11 Bluetooth)")
+    parser.add_argument("--device", nargs='+',
+                       help="Only subscribe to these device keys or MAC addresses")
+    parser.add_argument("--catchup-page-size", type=int, default=500,
+                       help="Devices per page when catching up after a reconnect (0 disables catch-up)")
+    parser.add_argument("--reconnect-max-backoff", type=float, default=60.0,
+                       help="Maximum seconds between Kismet reconnect attempts")
     
     # Offline mode options
     parser.add_argument("--offline", action="store_true", help="Run in offline mode (local storage only)")
     parser.add_argument("--sync-only", action="store_true", help="Only sync offline data, don't monitor")
+    parser.add_argument("--drain-workers", type=int, default=4,
+                       help="Concurrent bulk requests when draining the offline buffer "
+                            "(0 syncs one batch per interval)")
+    parser.add_argument("--drain-chunk-size", type=int, default=500,
+                       help="Buffered records per bulk request when draining")
     parser.add_argument("--buffer-db", default="kismet_offline_buffer.db", help="Offline buffer database path")
+    parser.add_argument("--buffer-batch-size", type=int, default=500,
+                       help="Buffered records written per SQLite commit")
+    parser.add_argument("--buffer-flush-interval", type=float, default=1.0,
+                       help="Maximum seconds a record waits before it is committed to the buffer")
+    parser.add_argument("--buffer-max-mb", type=int, default=1024,
+                       help="Offline buffer size cap in MB; oldest records are evicted beyond it (0 = unlimited)")
+    parser.add_argument("--buffer-convert-vacuum", action="store_true",
+                       help="Run a one-off full VACUUM on an old buffer so compaction can shrink it")
+    parser.add_argument("--json-backend", choices=JSONCodec.BACKENDS, default="auto",
+                       help="JSON library for decoding and encoding (auto picks orjson/msgspec if installed)")
     
     args = parser.parse_args()
+    codec.set_backend(args.json_backend)
+    
+    subscription = MonitorSubscription(profile=args.monitor_profile, phys=args.phy,
+                                       devices=args.device, rate=args.update_rate)
     
     # Create export client
     client = KismetElasticsearchClient(
@@ -768,7 +1533,10 @@ async def main():
         kismet_port=args.kismet_port,
         update_rate=args.update_rate,
         elasticsearch_hosts=args.es_hosts,
-        offline_mode=args.offline
+        offline_mode=args.offline,
+        subscription=subscription,
+        catchup_page_size=args.catchup_page_size,
+        reconnect_max_backoff=args.reconnect_max_backoff
     )
     
     # Initialize exporter
@@ -776,7 +1544,19 @@ async def main():
         es_username=args.es_username,
         es_password=args.es_password,
         es_api_key=args.es_api_key,
-        index_prefix=args.index_prefix
+        index_prefix=args.index_prefix,
+        buffer_db=args.buffer_db,
+        buffer_batch_size=args.buffer_batch_size,
+        buffer_flush_interval=args.buffer_flush_interval,
+        buffer_max_bytes=args.buffer_max_mb * 1024 * 1024 or None,
+        buffer_convert_vacuum=args.buffer_convert_vacuum,
+        bulk_size=args.bulk_size,
+        bulk_max_bytes=args.bulk_max_bytes,
+        bulk_interval=args.bulk_interval,
+        bulk_inflight=args.bulk_inflight,
+        drain_workers=args.drain_workers,
+        drain_chunk_size=args.drain_chunk_size,
+        background_sync=not args.sync_only
     )
     
     # Handle sync-only mode
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Kismet Export JSON Codec
+Shared JSON encode/decode layer for the Kismet export clients
+Uses orjson or msgspec when installed and falls back to the standard library
+"""
+
+import json
+from typing import Any, Union
+
+import websockets
+
+# Fast JSON backends
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+
+class JSONCodec:
+    """JSON codec backed by orjson, msgspec or the standard library
+
+    loads() accepts str or bytes, so WebSocket frames and SQLite rows can be
+    decoded without an intermediate str copy. Decode failures always raise
+    json.JSONDecodeError regardless of backend. All backends emit compact
+    UTF-8 JSON.
+    """
+
+    BACKENDS = ["auto", "orjson", "msgspec", "stdlib"]
+
+    def __init__(self, backend: str = "auto"):
+        self.set_backend(backend)
+
+    def set_backend(self, backend: str = "auto"):
+        """Select the JSON backend ("auto" picks the fastest installed)"""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+
+        if backend == "auto":
+            if ORJSON_AVAILABLE:
+                backend = "orjson"
+            elif MSGSPEC_AVAILABLE:
+                backend = "msgspec"
+            else:
+                backend = "stdlib"
+
+        if backend == "orjson":
+            if not ORJSON_AVAILABLE:
+                raise ImportError("orjson not available. Install with: pip install orjson")
+            self.loads = orjson.loads
+            self.dumps_bytes = orjson.dumps
+            self.dumps = lambda obj: orjson.dumps(obj).decode('utf-8')
+        elif backend == "msgspec":
+            if not MSGSPEC_AVAILABLE:
+                raise ImportError("msgspec not available. Install with: pip install msgspec")
+            encoder = msgspec.json.Encoder()
+            decoder = msgspec.json.Decoder()
+
+            def loads(data: Union[str, bytes]) -> Any:
+                try:
+                    return decoder.decode(data)
+                except msgspec.DecodeError as e:
+                    raise json.JSONDecodeError(str(e), '', 0) from e
+
+            self.loads = loads
+            self.dumps_bytes = encoder.encode
+            self.dumps = lambda obj: encoder.encode(obj).decode('utf-8')
+        else:
+            encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+            self.loads = json.loads
+            self.dumps = encoder.encode
+            self.dumps_bytes = lambda obj: encoder.encode(obj).encode('utf-8')
+
+        self.backend = backend
+
+
+# Shared codec used by the export clients
+codec = JSONCodec()
+
+
+async def iter_frames(websocket):
+    """Yield WebSocket messages, as raw bytes where the library allows it
+
+    Newer websockets releases can skip UTF-8 decoding of text frames
+    (recv(decode=False)), which lets the codec parse the original bytes.
+    Older releases fall back to str messages.
+    """
+    try:
+        message = await websocket.recv(decode=False)
+    except TypeError:
+        # Legacy implementation without the decode argument
+        async for message in websocket:
+            yield message
+        return
+    except websockets.exceptions.ConnectionClosedOK:
+        return
+
+    while True:
+        yield message
+        try:
+            message = await websocket.recv(decode=False)
+        except websockets.exceptions.ConnectionClosedOK:
+            return
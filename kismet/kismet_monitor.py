@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Kismet Monitor Subscription
+Builds /devices/monitor subscriptions for the Kismet export clients
+Profiles select which fields Kismet serializes and how they are decoded
+MonitorSupervisor keeps the subscription alive and catches up after outages
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import websockets
+
+from kismet_device_record import DEVICE_FIELD_MAP, DeviceRecord, compile_flat_extractor, extract_device_record
+from kismet_json_codec import codec, iter_frames
+
+# HTTP client for REST catch-up
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+ALL_FIELDS = [name for name, _, _ in DEVICE_FIELD_MAP]
+
+# Record fields needed by the lightweight sinks (console, CSV/simple TCP/UDP)
+MINIMAL_FIELDS = ['mac_addr', 'name', 'phy_type', 'last_seen', 'channel',
+                  'total_packets', 'signal_dbm']
+
+
+class MonitorSubscription:
+    """Device monitor subscription: field profile plus phy/device filters
+
+    Profiles:
+      full    - request the nested signal/location objects and decode them
+                client side (payload format of the original clients)
+      compact - request every record field as a renamed leaf using Kismet
+                field simplification, so only the values cross the socket
+      minimal - like compact, restricted to MINIMAL_FIELDS
+
+    phys subscribes through the per-phy device views
+    (/devices/views/phy-<name>/monitor), so Kismet never serializes devices
+    of other phy types. devices limits the subscription to specific device
+    keys or MAC addresses (one monitor request each).
+    """
+
+    PROFILES = ["full", "compact", "minimal"]
+
+    def __init__(self, profile: str = "full", phys: List[str] = None,
+                 devices: List[str] = None, rate: int = 5):
+        if profile not in self.PROFILES:
+            raise ValueError(f"Unknown subscription profile: {profile}")
+
+        self.profile = profile
+        self.phys = list(phys or [])
+        self.devices = list(devices or [])
+        self.rate = rate
+
+        if profile == "full":
+            self.fields = list(dict.fromkeys(path[0] for _, path, _ in DEVICE_FIELD_MAP))
+            self.extract = extract_device_record
+            self.mac_key = 'kismet.device.base.macaddr'
+            self.last_seen_key = 'kismet.device.base.last_time'
+            self.device_key = 'kismet.device.base.key'
+        else:
+            names = ALL_FIELDS if profile == "compact" else MINIMAL_FIELDS
+            self.fields = [["/".join(path), name] for name, path, _ in DEVICE_FIELD_MAP
+                           if name in names]
+            self.extract = compile_flat_extractor(names)
+            self.mac_key = 'mac_addr'
+            self.last_seen_key = 'last_seen'
+            self.device_key = 'device_key'
+
+        self.device_set = set(device.lower() for device in self.devices)
+
+    def views(self) -> List[str]:
+        """Kismet device views covered by the subscription"""
+        if not self.phys:
+            return ["all"]
+        return [f"phy-{phy}" for phy in self.phys]
+
+    def endpoints(self) -> List[str]:
+        """WebSocket paths to subscribe on"""
+        if not self.phys:
+            return ["/devices/monitor"]
+        return [f"/devices/views/{view}/monitor" for view in self.views()]
+
+    def catchup_path(self, endpoint: str) -> str:
+        """Paged device list of the view behind a monitor endpoint"""
+        view = "all" if endpoint == "/devices/monitor" else endpoint.split("/")[3]
+        return f"/devices/views/{view}/devices.json"
+
+    def catchup_request(self, since: int) -> Dict[str, Any]:
+        """Device list request for everything seen since a timestamp
+
+        Uses the same field projection as the stream; the device key is
+        added when the subscription is limited to specific devices so rows
+        can be matched against device keys as well as MAC addresses.
+        """
+        fields = list(self.fields)
+        if self.devices:
+            fields.append('kismet.device.base.key' if self.profile == "full"
+                          else ['kismet.device.base.key', 'device_key'])
+        return {"fields": fields, "last_time": since}
+
+    def identity(self, raw_data: Dict[str, Any]) -> Tuple[str, float]:
+        """MAC address and last_seen of a raw Kismet payload or decoded record"""
+        if isinstance(raw_data, DeviceRecord):
+            return raw_data.mac_addr, raw_data.last_seen
+        return raw_data.get(self.mac_key, ''), raw_data.get(self.last_seen_key, 0)
+
+    def matches(self, raw_data: Dict[str, Any]) -> bool:
+        """Check a catch-up row against the device filter"""
+        if not self.device_set:
+            return True
+        return (str(raw_data.get(self.mac_key, '')).lower() in self.device_set
+                or str(raw_data.get(self.device_key, '')).lower() in self.device_set)
+
+    def requests(self) -> List[Dict[str, Any]]:
+        """Monitor request messages to send on each endpoint"""
+        targets = self.devices or ["*"]
+        return [{
+            "monitor": target,
+            "rate": self.rate,
+            "request": request_id,
+            "format": "json",
+            "fields": self.fields
+        } for request_id, target in enumerate(targets, start=1)]
+
+    def describe(self) -> str:
+        """Short human readable summary for logging"""
+        scope = f"phys {', '.join(self.phys)}" if self.phys else "all phys"
+        if self.devices:
+            scope += f", {len(self.devices)} devices"
+        return f"{self.profile} profile, {scope}, {self.rate}s update rate"
+
+
+class MonitorSupervisor:
+    """Keeps the device monitor subscription alive across disconnects
+
+    Each monitor endpoint runs its own reconnect loop with exponential
+    backoff and jitter. The highest last_seen handed to the handler is
+    remembered per endpoint; after a reconnect the subscription is
+    re-established first and the outage is then filled in from the view's
+    paged device list (same field projection, last_time filter). Updates
+    are deduplicated per MAC on last_seen, so a device delivered by both
+    the catch-up and the stream is only handled once.
+
+    With a decoder (DecodePool), streamed frames are decoded in worker
+    processes and the handler receives DeviceRecords instead of raw dicts;
+    catch-up rows are always handed over raw.
+    """
+
+    def __init__(self, kismet_host: str, kismet_port: int, subscription: MonitorSubscription,
+                 handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 catchup_page_size: int = 500, min_backoff: float = 1.0,
+                 max_backoff: float = 60.0, dedupe_size: int = 100000,
+                 request_timeout: float = 30.0, decoder=None, sensor: str = None):
+        self.kismet_host = kismet_host
+        self.kismet_port = kismet_port
+        self.subscription = subscription
+        self.handler = handler
+        self.catchup_page_size = catchup_page_size
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.dedupe_size = dedupe_size
+        self.request_timeout = request_timeout
+        self.decoder = decoder
+        self.sensor = sensor
+
+        self.running = False
+        self.stopped = None
+        self.websockets = {}
+        # Endpoint -> highest last_seen handled
+        self.watermarks = {}
+        # MAC -> (last_seen, source) of the last handled update, in LRU order
+        self.seen = OrderedDict()
+
+        self.stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'messages': 0,
+            'duplicates': 0,
+            'catchup_requests': 0,
+            'catchup_records': 0,
+            'catchup_errors': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.MonitorSupervisor")
+
+    async def run(self):
+        """Supervise every endpoint until stop() is called"""
+        self.running = True
+        self.stopped = asyncio.Event()
+        await asyncio.gather(*(self._supervise(endpoint)
+                               for endpoint in self.subscription.endpoints()))
+
+    async def _supervise(self, endpoint: str):
+        """Reconnect loop for one monitor endpoint"""
+        backoff = 0.0
+        connected_before = False
+
+        while self.running:
+            uri = f"ws://{self.kismet_host}:{self.kismet_port}{endpoint}"
+            try:
+                self.logger.info(f"Connecting to Kismet at {uri}")
+                async with websockets.connect(uri) as websocket:
+                    self.websockets[endpoint] = websocket
+                    for monitor_config in self.subscription.requests():
+                        await websocket.send(codec.dumps(monitor_config))
+
+                    self.stats['connects'] += 1
+                    backoff = 0.0
+                    catchup = None
+                    if connected_before:
+                        self.stats['reconnects'] += 1
+                        since = int(self.watermarks.get(endpoint, 0))
+                        catchup = asyncio.create_task(self._catch_up(endpoint, since))
+                    connected_before = True
+                    self.logger.info(f"Started monitoring devices at {endpoint}")
+
+                    pipeline = None
+                    if self.decoder:
+                        pipeline = self.decoder.pipeline(
+                            self.subscription.profile,
+                            functools.partial(self._deliver, endpoint, source='stream'),
+                            sensor=self.sensor)
+
+                    try:
+                        async for message in iter_frames(websocket):
+                            if not self.running:
+                                break
+                            if pipeline:
+                                self.stats['messages'] += 1
+                                await pipeline.feed(message)
+                            else:
+                                await self._handle_message(endpoint, message)
+                    finally:
+                        if pipeline:
+                            await pipeline.close(drain=self.running)
+                        if catchup is not None:
+                            await self._finish(catchup)
+
+                if self.running:
+                    self.logger.warning(f"WebSocket connection closed ({endpoint})")
+
+            except websockets.exceptions.ConnectionClosed:
+                self.logger.warning(f"WebSocket connection closed ({endpoint})")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Connection error ({endpoint}): {e}")
+            finally:
+                self.websockets.pop(endpoint, None)
+
+            if not self.running:
+                break
+
+            backoff = min(max(backoff * 2, self.min_backoff), self.max_backoff)
+            delay = backoff * random.uniform(0.5, 1.0)
+            self.logger.info(f"Reconnecting to {endpoint} in {delay:.1f}s")
+            try:
+                await asyncio.wait_for(self.stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _finish(self, task: asyncio.Task):
+        """Let an in-flight catch-up complete, or cancel it when stopping"""
+        if not self.running:
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle_message(self, endpoint: str, message):
+        """Decode and hand over one streamed update"""
+        try:
+            device_data = codec.loads(message)
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Failed to parse JSON message: {e}")
+            return
+
+        self.stats['messages'] += 1
+        await self._deliver(endpoint, device_data, 'stream')
+
+    async def _deliver(self, endpoint: str, device_data: Dict[str, Any], source: str):
+        """Hand an update to the handler unless it was already delivered"""
+        mac_addr, last_seen = self.subscription.identity(device_data)
+        if mac_addr and not self._admit(mac_addr, last_seen, source):
+            self.stats['duplicates'] += 1
+            return
+
+        if last_seen > self.watermarks.get(endpoint, 0):
+            self.watermarks[endpoint] = last_seen
+
+        try:
+            await self.handler(device_data)
+        except Exception as e:
+            self.logger.error(f"Error processing device update: {e}")
+
+    def _admit(self, mac_addr: str, last_seen: float, source: str) -> bool:
+        """Drop stale updates and cross-source repeats of the same update"""
+        previous = self.seen.get(mac_addr)
+        if previous is not None:
+            previous_seen, previous_source = previous
+            if last_seen < previous_seen or (last_seen == previous_seen and source != previous_source):
+                return False
+
+        self.seen[mac_addr] = (last_seen, source)
+        self.seen.move_to_end(mac_addr)
+        if len(self.seen) > self.dedupe_size:
+            self.seen.popitem(last=False)
+        return True
+
+    async def _catch_up(self, endpoint: str, since: int):
+        """Fetch devices seen since the watermark, page by page"""
+        if self.catchup_page_size <= 0 or since <= 0:
+            return
+        if not AIOHTTP_AVAILABLE:
+            self.logger.warning("aiohttp not available, skipping catch-up. Install with: pip install aiohttp")
+            return
+
+        url = f"http://{self.kismet_host}:{self.kismet_port}{self.subscription.catchup_path(endpoint)}"
+        body = self.subscription.catchup_request(since)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        recovered = 0
+
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                page, last_page = 0, 1
+                while page < last_page and self.running:
+                    params = {'page': page, 'length': self.catchup_page_size}
+                    async with session.post(url, params=params, json=body) as response:
+                        response.raise_for_status()
+                        result = codec.loads(await response.read())
+                    self.stats['catchup_requests'] += 1
+
+                    rows = result.get('data', [])
+                    last_page = result.get('last_page', 0)
+                    for device_data in rows:
+                        if self.subscription.matches(device_data):
+                            recovered += 1
+                            await self._deliver(endpoint, device_data, 'catchup')
+                    if not rows:
+                        break
+                    page += 1
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['catchup_errors'] += 1
+            self.logger.error(f"Catch-up from {url} failed: {e}")
+
+        self.stats['catchup_records'] += recovered
+        self.logger.info(f"Caught up {recovered} devices seen since {since} ({endpoint})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get supervisor statistics"""
+        stats = dict(self.stats)
+        stats['connected'] = len(self.websockets)
+        stats['tracked_devices'] = len(self.seen)
+        return stats
+
+    async def stop(self):
+        """Stop reconnecting and close open subscriptions"""
+        self.running = False
+        if self.stopped:
+            self.stopped.set()
+        for websocket in list(self.websockets.values()):
+            await websocket.close()
@@ -10,12 +10,24 @@ import json
 import argparse
 import logging
 import time
-import socket
-from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+import struct
+import random
+import functools
+import os
+import re
+import zlib
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Any, Optional, Callable, List, Tuple, Union
 import signal
 import sys
 
+from kismet_json_codec import JSONCodec, codec, iter_frames
+from kismet_device_record import BatchTimestamp, DeviceRecord, record_json
+from kismet_monitor import MonitorSubscription, MonitorSupervisor
+from kismet_decode_pool import DecodePool
+
 # Database adapters
 try:
     import asyncpg
@@ -24,7 +36,7 @@ except ImportError:
     POSTGRES_AVAILABLE = False
 
 try:
-    from influxdb_client import InfluxDBClient, Point
+    from influxdb_client import InfluxDBClient
     from influxdb_client.client.write_api import SYNCHRONOUS
     INFLUXDB_AVAILABLE = True
 except ImportError:
@@ -36,18 +48,499 @@ try:
 except ImportError:
     MQTT_AVAILABLE = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+class IngestQueue:
+    """Bounded queue between the WebSocket reader and an exporter
+
+    Overflow policies:
+      block        - the reader waits for space (no loss, may stall the socket)
+      drop-oldest  - discard the oldest queued record to make room
+      drop-newest  - discard the incoming record
+      coalesce     - replace a queued update for the same MAC in place, and
+                     fall back to drop-oldest when a new MAC arrives on a full queue
+
+    With merge set, a coalesced update is merged into the queued one rather
+    than replacing it, so fields from an earlier unsent delta are kept.
+    """
+
+    POLICIES = ["block", "drop-oldest", "drop-newest", "coalesce"]
+
+    def __init__(self, maxsize: int = 10000, policy: str = "block", merge: bool = False):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge = merge
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # MAC -> queued entry, only used by the coalesce policy
+        self.pending = {}
+
+        self.stats = {
+            'enqueued': 0,
+            'dequeued': 0,
+            'dropped_oldest': 0,
+            'dropped_newest': 0,
+            'coalesced': 0,
+            'max_depth': 0
+        }
+
+    async def put(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None):
+        """Queue a record, applying the overflow policy when full"""
+        if self.policy == "coalesce" and key:
+            entry = self.pending.get(key)
+            if entry is not None:
+                entry[1] = {**entry[1], **payload} if self.merge else payload
+                self.stats['coalesced'] += 1
+                return
+
+        entry = [kind, payload, key]
+
+        if self.queue.full():
+            if self.policy == "block":
+                await self.queue.put(entry)
+                self._queued(entry)
+                return
+            if self.policy == "drop-newest":
+                self.stats['dropped_newest'] += 1
+                return
+            self._discard(self.queue.get_nowait())
+            self.queue.task_done()
+            self.stats['dropped_oldest'] += 1
+
+        self.queue.put_nowait(entry)
+        self._queued(entry)
+
+    def _queued(self, entry: list):
+        """Update bookkeeping for a newly queued entry"""
+        if self.policy == "coalesce" and entry[2]:
+            self.pending[entry[2]] = entry
+        self.stats['enqueued'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.queue.qsize())
+
+    def _discard(self, entry: list):
+        """Forget a dequeued entry so later updates for its MAC queue normally"""
+        if entry[2] and self.pending.get(entry[2]) is entry:
+            del self.pending[entry[2]]
+
+    async def get(self) -> tuple:
+        """Wait for the next (kind, payload) record"""
+        entry = await self.queue.get()
+        self._discard(entry)
+        self.stats['dequeued'] += 1
+        return entry[0], entry[1]
+
+    def task_done(self):
+        """Mark the last record returned by get() as exported"""
+        self.queue.task_done()
+
+    async def join(self):
+        """Wait until every queued record has been exported"""
+        await self.queue.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        stats = dict(self.stats)
+        stats['depth'] = self.queue.qsize()
+        stats['dropped'] = stats['dropped_oldest'] + stats['dropped_newest']
+        return stats
+
+
+class ExportSink:
+    """An exporter paired with its own ingest queue and worker task
+
+    Exporters that set accepts_deltas = True (PostgreSQL without history)
+    merge partial records into their stored state and receive delta-mode
+    updates as-is; every other exporter is given the full record.
+    """
+
+    def __init__(self, name: str, exporter, queue_size: int = 10000,
+                 overflow_policy: str = "block"):
+        self.name = name
+        self.exporter = exporter
+        self.accepts_deltas = getattr(exporter, 'accepts_deltas', False)
+        self.queue = IngestQueue(maxsize=queue_size, policy=overflow_policy,
+                                 merge=self.accepts_deltas)
+        self.task = None
+        self.logger = logging.getLogger(f"{__name__}.ExportSink")
+
+    def start(self):
+        """Start the task that drains the queue into the exporter"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._worker())
+
+    async def _worker(self):
+        """Export queued records one at a time"""
+        while True:
+            kind, payload = await self.queue.get()
+            try:
+                if kind == 'device':
+                    await self.exporter.export_device(payload)
+                else:
+                    await self.exporter.export_event(payload)
+            except Exception as e:
+                self.logger.error(f"Error exporting {kind} to {self.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the worker"""
+        if self.task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Discarding {self.queue.queue.qsize()} queued records for {self.name} on shutdown")
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def close(self):
+        """Stop the worker and close the exporter"""
+        await self.stop()
+        await self.exporter.close()
+
+
+class DeviceStateCache:
+    """Last exported state per MAC, used to suppress redundant exports
+
+    Modes:
+      off      - forward every update
+      changed  - forward the full record only when a field changed
+      delta    - forward only the changed fields (plus mac_addr, timestamp
+                 and last_seen) to sinks that merge deltas; other sinks
+                 still receive the full record
+
+    Fields in ignore_fields (by default the timestamps and packet counters,
+    which change on every update) do not count as a change. Entries expire
+    ttl seconds after they were last exported, so unchanged devices are
+    still re-exported periodically. At most max_entries devices are kept,
+    evicting the least recently updated.
+    """
+
+    MODES = ["off", "changed", "delta"]
+    DEFAULT_IGNORE_FIELDS = ['timestamp', 'last_seen', 'total_packets', 'tx_packets',
+                             'rx_packets', 'data_size']
+
+    def __init__(self, mode: str = "changed", max_entries: int = 100000,
+                 ttl: float = 300.0, ignore_fields: List[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown delta mode: {mode}")
+
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ignore_fields = set(ignore_fields if ignore_fields is not None
+                                 else self.DEFAULT_IGNORE_FIELDS)
+        # MAC -> (exported_at, last exported device_info), in LRU order
+        self.entries = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'suppressed': 0,
+            'forwarded': 0,
+            'evictions': 0
+        }
+
+    def filter(self, device_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the record to export, or None if nothing changed
+
+        In delta mode the returned record holds only the changed fields for
+        a known device; callers pick it or the full record per sink.
+        """
+        mac_addr = device_info.get('mac_addr')
+        if self.mode == "off" or not mac_addr:
+            return device_info
+
+        now = time.monotonic()
+        cached = self.entries.get(mac_addr)
+
+        if cached is None or now - cached[0] > self.ttl:
+            self.stats['misses'] += 1
+            self._store(mac_addr, now, device_info)
+            return device_info
+
+        self.stats['hits'] += 1
+        previous = cached[1]
+        changed = {key: value for key, value in device_info.items()
+                   if key not in self.ignore_fields
+                   and (key not in previous or previous[key] != value)}
+
+        if not changed:
+            self.stats['suppressed'] += 1
+            self.entries.move_to_end(mac_addr)
+            return None
+
+        self._store(mac_addr, now, device_info)
+        if self.mode == "delta":
+            changed['mac_addr'] = mac_addr
+            changed['timestamp'] = device_info.get('timestamp')
+            if 'last_seen' in device_info:
+                changed['last_seen'] = device_info['last_seen']
+            return changed
+        return device_info
+
+    def _store(self, mac_addr: str, exported_at: float, device_info: Dict[str, Any]):
+        """Remember an exported record, evicting the least recently updated"""
+        self.stats['forwarded'] += 1
+        self.entries[mac_addr] = (exported_at, device_info)
+        self.entries.move_to_end(mac_addr)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self.entries)
+        return stats
+
+
+class SensorDedupe:
+    """Cross-sensor duplicate suppression for multi-server aggregation
+
+    When several Kismet sensors hear the same device, the first sensor to
+    report a MAC owns it for window seconds; updates for that MAC from the
+    other sensors inside the window are dropped. Updates from the owning
+    sensor always pass. At most max_entries MACs are tracked.
+    """
+
+    def __init__(self, window: float = 2.0, max_entries: int = 100000):
+        self.window = window
+        self.max_entries = max_entries
+        # MAC -> (owned_since, sensor), in LRU order
+        self.owners = OrderedDict()
+        self.stats = {
+            'forwarded': 0,
+            'duplicates': 0,
+            'handovers': 0
+        }
+
+    def admit(self, mac_addr: str, sensor: str) -> bool:
+        """Check whether a sensor's update for a MAC should be exported"""
+        now = time.monotonic()
+        owner = self.owners.get(mac_addr)
+
+        if owner is not None and owner[1] != sensor:
+            if now - owner[0] < self.window:
+                self.stats['duplicates'] += 1
+                return False
+            self.stats['handovers'] += 1
+
+        self.owners[mac_addr] = (now, sensor)
+        self.owners.move_to_end(mac_addr)
+        if len(self.owners) > self.max_entries:
+            self.owners.popitem(last=False)
+
+        self.stats['forwarded'] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dedupe statistics"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self.owners)
+        return stats
+
+
+class IngestGovernor:
+    """Ingest-side rate control for chatty devices
+
+    Updates are classed as priority or routine. Priority updates (the first
+    update for a MAC, or one whose signal moved by at least signal_delta dB
+    since the last forwarded update) always pass. Routine updates must clear
+    three checks in turn:
+      adaptive   - a device that keeps reporting the same signal is sampled
+                   less often: its minimum interval starts at min_interval
+                   and doubles with every routine forward, up to
+                   max_interval, and resets on a priority update
+      per-MAC    - a token bucket of mac_rate updates/s (burst mac_burst)
+      global     - a shared token bucket of global_rate records/s; priority
+                   updates draw on it too, so routine traffic absorbs the load
+
+    A rate of 0 disables that bucket. At most max_entries MACs are tracked,
+    evicting the least recently seen (an evicted MAC counts as new again).
+    """
+
+    def __init__(self, mac_rate: float = 0, mac_burst: float = 5, global_rate: float = 0,
+                 global_burst: float = None, adaptive: bool = False, signal_delta: float = 5,
+                 min_interval: float = 1.0, max_interval: float = 60.0, max_entries: int = 100000):
+        self.mac_rate = mac_rate
+        self.mac_burst = max(mac_burst, 1)
+        self.global_rate = global_rate
+        self.global_burst = max(global_burst or global_rate, 1)
+        self.adaptive = adaptive
+        self.signal_delta = signal_delta
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_entries = max_entries
+
+        # MAC -> [tokens, refilled_at, forwarded_at, forwarded signal, interval], in LRU order
+        self.entries = OrderedDict()
+        self.global_tokens = self.global_burst
+        self.global_refilled_at = time.monotonic()
+        self.stats = {
+            'forwarded': 0,
+            'new_devices': 0,
+            'signal_changes': 0,
+            'sampled_out': 0,
+            'rate_limited': 0,
+            'budget_dropped': 0,
+            'evictions': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.mac_rate or self.global_rate or self.adaptive)
+
+    def admit(self, device_info: Dict[str, Any]) -> bool:
+        """Check whether an update should be exported"""
+        mac_addr = device_info.get('mac_addr')
+        if not mac_addr:
+            return True
+
+        now = time.monotonic()
+        signal = device_info.get('signal_dbm')
+        state = self.entries.get(mac_addr)
+
+        if state is None:
+            self.stats['new_devices'] += 1
+            state = [self.mac_burst, now, now, signal, 0.0]
+            self.entries[mac_addr] = state
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            self._take_global(now, force=True)
+            self.stats['forwarded'] += 1
+            return True
+
+        self.entries.move_to_end(mac_addr)
+        self._refill(state, now)
+
+        previous = state[3]
+        if signal is not None and previous is not None and abs(signal - previous) >= self.signal_delta:
+            self.stats['signal_changes'] += 1
+            state[0] = max(state[0] - 1, 0)
+            state[2], state[3], state[4] = now, signal, 0.0
+            self._take_global(now, force=True)
+            self.stats['forwarded'] += 1
+            return True
+
+        if self.adaptive and now - state[2] < state[4]:
+            self.stats['sampled_out'] += 1
+            return False
+        if self.mac_rate and state[0] < 1:
+            self.stats['rate_limited'] += 1
+            return False
+        if not self._take_global(now):
+            self.stats['budget_dropped'] += 1
+            return False
+
+        state[0] -= 1
+        state[2], state[3] = now, signal if signal is not None else previous
+        state[4] = min(max(state[4] * 2, self.min_interval), self.max_interval)
+        self.stats['forwarded'] += 1
+        return True
+
+    def _refill(self, state: list, now: float):
+        """Top up a MAC's token bucket"""
+        if self.mac_rate:
+            state[0] = min(self.mac_burst, state[0] + (now - state[1]) * self.mac_rate)
+        state[1] = now
+
+    def _take_global(self, now: float, force: bool = False) -> bool:
+        """Take a token from the global budget (priority updates may overdraw one burst)"""
+        if not self.global_rate:
+            return True
+        self.global_tokens = min(self.global_burst,
+                                 self.global_tokens + (now - self.global_refilled_at) * self.global_rate)
+        self.global_refilled_at = now
+        if self.global_tokens >= 1 or (force and self.global_tokens > -self.global_burst):
+            self.global_tokens -= 1
+            return True
+        return force
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get governor statistics"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self.entries)
+        return stats
+
+
 class KismetExportClient:
-    """Main client for connecting to Kismet and exporting data"""
+    """Main client for connecting to Kismet and exporting data
+
+    With servers set, one client follows several Kismet sensors at once:
+    every record is tagged with its sensor name, MACs heard by several
+    sensors are deduplicated within sensor_dedupe_window seconds, and all
+    sensors feed the same set of sinks (and their pooled connections).
+    """
     
     def __init__(self, kismet_host: str = "localhost", kismet_port: int = 2501,
-                 update_rate: int = 5, export_type: str = "console"):
+                 update_rate: int = 5, export_type: str = "console",
+                 queue_size: int = 10000, overflow_policy: str = "block",
+                 delta_mode: str = "off", delta_cache_size: int = 100000,
+                 delta_ttl: float = 300.0, delta_ignore_fields: List[str] = None,
+                 subscription: MonitorSubscription = None,
+                 catchup_page_size: int = 500, reconnect_max_backoff: float = 60.0,
+                 servers: List[Tuple[str, str, int]] = None, sensor_dedupe_window: float = 2.0,
+                 decode_workers: int = 0, decode_batch_size: int = 256,
+                 governor: IngestGovernor = None):
         self.kismet_host = kismet_host
         self.kismet_port = kismet_port
+        # (sensor name, host, port) per Kismet server; a lone server is not tagged
+        self.servers = list(servers) if servers else [(None, kismet_host, kismet_port)]
         self.update_rate = update_rate
         self.export_type = export_type
         self.running = False
-        self.websocket = None
-        self.exporter = None
+
+        # Each exporter gets its own queue and worker so a slow sink
+        # cannot stall the Kismet socket or the other sinks
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.sinks = []
+
+        # Suppress updates for devices that have not changed
+        self.delta_cache = DeviceStateCache(mode=delta_mode, max_entries=delta_cache_size,
+                                            ttl=delta_ttl, ignore_fields=delta_ignore_fields)
+
+        # Fields and phy/device filters requested from Kismet
+        self.subscription = subscription or MonitorSubscription(rate=update_rate)
+
+        # Updates arriving in the same burst share one timestamp string
+        self.timestamp = BatchTimestamp()
+
+        # Optionally move JSON decoding and normalization off the event loop
+        self.decoder = (DecodePool(workers=decode_workers, batch_size=decode_batch_size,
+                                   timestamp=self.timestamp)
+                        if decode_workers > 0 else None)
+
+        # Reconnects with backoff and catches up on updates missed while down
+        self.supervisors = [
+            MonitorSupervisor(host, port, self.subscription,
+                              functools.partial(self.process_device_update, sensor=sensor),
+                              catchup_page_size=catchup_page_size,
+                              max_backoff=reconnect_max_backoff,
+                              decoder=self.decoder, sensor=sensor)
+            for sensor, host, port in self.servers
+        ]
+
+        # Drop the same MAC reported by several sensors
+        self.sensor_dedupe = (SensorDedupe(window=sensor_dedupe_window, max_entries=delta_cache_size)
+                              if len(self.servers) > 1 and sensor_dedupe_window > 0 else None)
+
+        # Rate limit and sample chatty devices before they reach any sink
+        self.governor = governor if governor is not None and governor.enabled else None
         
         # Statistics
         self.stats = {
@@ -63,80 +556,59 @@ class KismetExportClient:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+
+    @property
+    def exporter(self):
+        """The first configured exporter (single-sink compatibility)"""
+        return self.sinks[0].exporter if self.sinks else None
+
+    @exporter.setter
+    def exporter(self, exporter):
+        self.sinks = []
+        if exporter:
+            self.add_exporter(exporter)
+
+    def add_exporter(self, exporter, name: str = None) -> ExportSink:
+        """Add an exporter to the fan-out set"""
+        sink = ExportSink(
+            name or type(exporter).__name__,
+            exporter,
+            queue_size=self.queue_size,
+            overflow_policy=self.overflow_policy
+        )
+        self.sinks.append(sink)
+        return sink
         
     async def connect_and_monitor(self):
-        """Connect to Kismet WebSocket and start monitoring"""
-        uri = f"ws://{self.kismet_host}:{self.kismet_port}/devices/monitor"
-        
-        try:
-            self.logger.info(f"Connecting to Kismet at {uri}")
-            async with websockets.connect(uri) as websocket:
-                self.websocket = websocket
-                self.running = True
-                self.stats['start_time'] = time.time()
-                
-                # Configure device monitoring
-                monitor_config = {
-                    "monitor": "*",  # Monitor all devices
-                    "rate": self.update_rate,
-                    "request": 1,
-                    "format": "json",
-                    "fields": [
-                        "kismet.device.base.macaddr",
-                        "kismet.device.base.name",
-                        "kismet.device.base.username",
-                        "kismet.device.base.phyname",
-                        "kismet.device.base.signal",
-                        "kismet.device.base.location",
-                        "kismet.device.base.last_time",
-                        "kismet.device.base.first_time",
-                        "kismet.device.base.packets.total",
-                        "kismet.device.base.packets.tx",
-                        "kismet.device.base.packets.rx",
-                        "kismet.device.base.datasize",
-                        "kismet.device.base.channel",
-                        "kismet.device.base.frequency",
-                        "kismet.device.base.manuf"
-                    ]
-                }
-                
-                await websocket.send(json.dumps(monitor_config))
-                self.logger.info(f"Started monitoring devices with {self.update_rate}s update rate")
-                
-                # Process incoming messages
-                async for message in websocket:
-                    if not self.running:
-                        break
-                        
-                    try:
-                        device_data = json.loads(message)
-                        await self.process_device_update(device_data)
-                        
-                    except json.JSONDecodeError as e:
-                        self.logger.error(f"Failed to parse JSON message: {e}")
-                    except Exception as e:
-                        self.logger.error(f"Error processing device update: {e}")
-                        
-        except websockets.exceptions.ConnectionClosed:
-            self.logger.warning("WebSocket connection closed")
-        except Exception as e:
-            self.logger.error(f"Connection error: {e}")
+        """Connect to Kismet WebSocket and keep monitoring until stopped"""
+        self.running = True
+        self.stats['start_time'] = time.time()
+        self.start_export_workers()
+        self.logger.info(f"Monitoring devices on {len(self.servers)} Kismet server(s): "
+                         f"{self.subscription.describe()}")
+        await asyncio.gather(*(supervisor.run() for supervisor in self.supervisors))
             
     async def connect_event_bus(self):
+        """Connect to the event bus of every Kismet server"""
+        await asyncio.gather(*(self.monitor_event_bus(host, port, sensor)
+                               for sensor, host, port in self.servers))
+
+    async def monitor_event_bus(self, kismet_host: str, kismet_port: int, sensor: str = None):
         """Connect to Kismet event bus for alerts and system events"""
-        uri = f"ws://{self.kismet_host}:{self.kismet_port}/eventbus/events"
+        uri = f"ws://{kismet_host}:{kismet_port}/eventbus/events"
         
         try:
             self.logger.info(f"Connecting to Kismet event bus at {uri}")
             async with websockets.connect(uri) as websocket:
+                self.start_export_workers()
                 
-                async for message in websocket:
+                async for message in iter_frames(websocket):
                     if not self.running:
                         break
                         
                     try:
-                        event_data = json.loads(message)
-                        await self.process_event(event_data)
+                        event_data = codec.loads(message)
+                        await self.process_event(event_data, sensor)
                         
                     except json.JSONDecodeError as e:
                         self.logger.error(f"Failed to parse event JSON: {e}")
@@ -146,63 +618,45 @@ class KismetExportClient:
         except Exception as e:
             self.logger.error(f"Event bus connection error: {e}")
             
-    async def process_device_update(self, device_data: Dict[str, Any]):
+    async def process_device_update(self, device_data: Dict[str, Any], sensor: str = None):
         """Process a device update message"""
         self.stats['devices_processed'] += 1
         self.stats['last_update'] = time.time()
         
-        # Extract key device information
-        device_info = self.extract_device_info(device_data)
+        # Extract key device information (already done by the decode pool for streamed records)
+        device_info = (device_data if isinstance(device_data, DeviceRecord)
+                       else self.extract_device_info(device_data, sensor))
+        if self.sensor_dedupe and not self.sensor_dedupe.admit(device_info.get('mac_addr'), sensor):
+            return
+        if self.governor and not self.governor.admit(device_info):
+            return
+
+        delta = self.delta_cache.filter(device_info)
+        if delta is None:
+            return
         
-        # Export to configured destination
-        if self.exporter:
-            await self.exporter.export_device(device_info)
+        # Fan out to every sink queue; only sinks that merge deltas get partial records
+        mac_addr = device_info.get('mac_addr')
+        for sink in self.sinks:
+            await sink.queue.put('device', delta if sink.accepts_deltas else device_info, mac_addr)
             
-    async def process_event(self, event_data: Dict[str, Any]):
+    async def process_event(self, event_data: Dict[str, Any], sensor: str = None):
         """Process an event bus message"""
         self.stats['alerts_processed'] += 1
+        if sensor is not None:
+            event_data['sensor'] = sensor
         
-        if self.exporter:
-            await self.exporter.export_event(event_data)
+        for sink in self.sinks:
+            await sink.queue.put('event', event_data)
+
+    def start_export_workers(self):
+        """Start one export worker per sink"""
+        for sink in self.sinks:
+            sink.start()
             
-    def extract_device_info(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    def extract_device_info(self, raw_data: Dict[str, Any], sensor: str = None) -> DeviceRecord:
         """Extract and normalize device information"""
-        device_info = {
-            'timestamp': datetime.now().isoformat(),
-            'mac_addr': raw_data.get('kismet.device.base.macaddr', ''),
-            'name': raw_data.get('kismet.device.base.name', ''),
-            'username': raw_data.get('kismet.device.base.username', ''),
-            'phy_type': raw_data.get('kismet.device.base.phyname', ''),
-            'manufacturer': raw_data.get('kismet.device.base.manuf', ''),
-            'first_seen': raw_data.get('kismet.device.base.first_time', 0),
-            'last_seen': raw_data.get('kismet.device.base.last_time', 0),
-            'channel': raw_data.get('kismet.device.base.channel', ''),
-            'frequency': raw_data.get('kismet.device.base.frequency', 0),
-            'total_packets': raw_data.get('kismet.device.base.packets.total', 0),
-            'tx_packets': raw_data.get('kismet.device.base.packets.tx', 0),
-            'rx_packets': raw_data.get('kismet.device.base.packets.rx', 0),
-            'data_size': raw_data.get('kismet.device.base.datasize', 0)
-        }
-        
-        # Extract signal information
-        signal_data = raw_data.get('kismet.device.base.signal', {})
-        if signal_data:
-            device_info.update({
-                'signal_dbm': signal_data.get('kismet.common.signal.last_signal', 0),
-                'noise_dbm': signal_data.get('kismet.common.signal.last_noise', 0),
-                'snr_db': signal_data.get('kismet.common.signal.last_snr', 0)
-            })
-            
-        # Extract location information
-        location_data = raw_data.get('kismet.device.base.location', {})
-        if location_data:
-            device_info.update({
-                'latitude': location_data.get('kismet.common.location.avg_lat', 0),
-                'longitude': location_data.get('kismet.common.location.avg_lon', 0),
-                'altitude': location_data.get('kismet.common.location.avg_alt', 0)
-            })
-            
-        return device_info
+        return self.subscription.extract(raw_data, self.timestamp(), sensor)
         
     def print_stats(self):
         """Print current statistics"""
@@ -216,14 +670,52 @@ class KismetExportClient:
             print(f"Alerts processed: {self.stats['alerts_processed']}")
             print(f"Processing rate: {rate:.2f} devices/second")
             print(f"Last update: {datetime.fromtimestamp(self.stats['last_update']) if self.stats['last_update'] else 'Never'}")
-            
+
+            for (sensor, host, port), supervisor in zip(self.servers, self.supervisors):
+                monitor_stats = supervisor.get_stats()
+                print(f"[{sensor or host}] Kismet reconnects: {monitor_stats['reconnects']}, "
+                      f"caught up: {monitor_stats['catchup_records']}, duplicates: {monitor_stats['duplicates']}")
+
+            if self.decoder:
+                decode_stats = self.decoder.get_stats()
+                print(f"Decode pool: {decode_stats['records']} records in {decode_stats['batches']} batches "
+                      f"(avg {decode_stats['avg_batch_size']:.1f}), {decode_stats['decode_errors']} errors, "
+                      f"{decode_stats['pool_restarts']} worker pool restarts")
+
+            if self.sensor_dedupe:
+                dedupe_stats = self.sensor_dedupe.get_stats()
+                print(f"Sensor dedupe: {dedupe_stats['duplicates']} duplicates dropped, "
+                      f"{dedupe_stats['handovers']} handovers, {dedupe_stats['entries']} devices")
+
+            if self.governor:
+                governor_stats = self.governor.get_stats()
+                print(f"Ingest governor: {governor_stats['sampled_out']} sampled out, "
+                      f"{governor_stats['rate_limited']} rate limited, "
+                      f"{governor_stats['budget_dropped']} over budget, {governor_stats['entries']} devices")
+
+            if self.delta_cache.mode != "off":
+                cache_stats = self.delta_cache.get_stats()
+                print(f"Delta cache: {cache_stats['entries']} devices, {cache_stats['hits']} hits, "
+                      f"{cache_stats['misses']} misses, {cache_stats['suppressed']} suppressed")
+
+            for sink in self.sinks:
+                queue_stats = sink.queue.get_stats()
+                print(f"[{sink.name}] Queue depth: {queue_stats['depth']} (max {queue_stats['max_depth']}, "
+                      f"policy {sink.queue.policy})")
+                print(f"[{sink.name}] Queue dropped: {queue_stats['dropped']}, coalesced: {queue_stats['coalesced']}")
+
+                if hasattr(sink.exporter, 'get_stats'):
+                    for key, value in sink.exporter.get_stats().items():
+                        print(f"[{sink.name}] {key}: {value:.1f}" if isinstance(value, float)
+                              else f"[{sink.name}] {key}: {value}")
+
     async def stop(self):
         """Stop the export client"""
         self.running = False
-        if self.websocket:
-            await self.websocket.close()
-        if self.exporter:
-            await self.exporter.close()
+        await asyncio.gather(*(supervisor.stop() for supervisor in self.supervisors))
+        if self.decoder:
+            await self.decoder.close()
+        await asyncio.gather(*(sink.close() for sink in self.sinks))
         self.print_stats()
 
 
@@ -252,21 +744,162 @@ class ConsoleExporter:
 
 
 class PostgreSQLExporter:
-    """Export device data to PostgreSQL database"""
-    
-    def __init__(self, connection_string: str):
+    """Export device data to PostgreSQL database
+
+    Delta records (see DeviceStateCache) are merged into the stored row, so
+    the exporter accepts them unless history mode needs every observation in
+    full.
+
+    Event bus messages are always batched: they are buffered and COPY'd into
+    kismet_events, a table range-partitioned by day on event_time. Daily
+    partitions are created on demand before each COPY. An unpartitioned
+    kismet_events left by an older install is renamed to
+    kismet_events_legacy and its rows copied across in chunks, skipping
+    (and counting) rows without a usable time or type; if that migration
+    fails, event persistence is disabled and device export carries on.
+    Failed event batches are retried with the device batches' backoff.
+
+    History mode additionally appends every update's signal, location and
+    packet counters to kismet_device_history, keyed by observation time.
+    The table is a TimescaleDB hypertable when the extension is installed
+    and a natively day-partitioned table otherwise. Rows are COPY'd in
+    batches, and retention drops whole chunks/partitions older than
+    history_retention_days rather than deleting rows.
+    """
+
+    # Column order shared by the single-row upsert and the COPY staging path
+    DEVICE_COLUMNS = [
+        ('mac_addr', str), ('name', str), ('username', str),
+        ('phy_type', str), ('manufacturer', str),
+        ('first_seen', int), ('last_seen', int), ('channel', str), ('frequency', int),
+        ('total_packets', int), ('tx_packets', int), ('rx_packets', int), ('data_size', int),
+        ('signal_dbm', int), ('noise_dbm', int), ('snr_db', int),
+        ('latitude', float), ('longitude', float), ('altitude', float),
+        ('sensor', str)
+    ]
+    # Single-row insert, also used to salvage a batch that keeps failing
+    DEVICE_INSERT = """
+            INSERT INTO kismet_devices (
+                mac_addr, name, username, phy_type, manufacturer,
+                first_seen, last_seen, channel, frequency,
+                total_packets, tx_packets, rx_packets, data_size,
+                signal_dbm, noise_dbm, snr_db,
+                latitude, longitude, altitude, sensor, last_updated
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, NOW())
+    """
+    # Conflict clause shared by both paths; an update older than the stored
+    # row (e.g. replayed or delivered late by another sensor) is ignored, and
+    # columns missing from a delta record keep their stored value
+    DEVICE_UPSERT = """
+            ON CONFLICT (mac_addr) DO UPDATE SET
+                name = COALESCE(EXCLUDED.name, kismet_devices.name),
+                username = COALESCE(EXCLUDED.username, kismet_devices.username),
+                last_seen = COALESCE(EXCLUDED.last_seen, kismet_devices.last_seen),
+                channel = COALESCE(EXCLUDED.channel, kismet_devices.channel),
+                frequency = COALESCE(EXCLUDED.frequency, kismet_devices.frequency),
+                total_packets = COALESCE(EXCLUDED.total_packets, kismet_devices.total_packets),
+                tx_packets = COALESCE(EXCLUDED.tx_packets, kismet_devices.tx_packets),
+                rx_packets = COALESCE(EXCLUDED.rx_packets, kismet_devices.rx_packets),
+                data_size = COALESCE(EXCLUDED.data_size, kismet_devices.data_size),
+                signal_dbm = COALESCE(EXCLUDED.signal_dbm, kismet_devices.signal_dbm),
+                noise_dbm = COALESCE(EXCLUDED.noise_dbm, kismet_devices.noise_dbm),
+                snr_db = COALESCE(EXCLUDED.snr_db, kismet_devices.snr_db),
+                latitude = COALESCE(EXCLUDED.latitude, kismet_devices.latitude),
+                longitude = COALESCE(EXCLUDED.longitude, kismet_devices.longitude),
+                altitude = COALESCE(EXCLUDED.altitude, kismet_devices.altitude),
+                sensor = COALESCE(EXCLUDED.sensor, kismet_devices.sensor),
+                last_updated = NOW()
+            WHERE kismet_devices.last_seen IS NULL
+               OR EXCLUDED.last_seen IS NULL
+               OR kismet_devices.last_seen <= EXCLUDED.last_seen
+    """
+    EVENT_COLUMNS = ['event_time', 'event_type', 'sensor', 'payload']
+    # Rows read and COPY'd per step when migrating kismet_events_legacy
+    LEGACY_CHUNK_SIZE = 5000
+    # Observation columns appended in history mode, after observed_at
+    HISTORY_COLUMNS = [
+        ('mac_addr', str), ('sensor', str),
+        ('signal_dbm', int), ('noise_dbm', int), ('snr_db', int),
+        ('latitude', float), ('longitude', float), ('altitude', float),
+        ('total_packets', int), ('tx_packets', int), ('rx_packets', int), ('data_size', int)
+    ]
+    # Content fields holding the time an event happened (Kismet epoch seconds)
+    EVENT_TIME_FIELDS = ['kismet.alert.timestamp', 'kismet.device.base.last_time']
+
+    def __init__(self, connection_string: str, batch_mode: bool = False,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 pool_min_size: int = 1, pool_max_size: int = 4,
+                 event_batch_size: int = 500, history: bool = False,
+                 history_retention_days: float = 30, history_maintenance_interval: float = 3600.0,
+                 max_flush_retries: int = 3, max_buffer: int = None):
         self.connection_string = connection_string
-        self.conn = None
-        
+        self.batch_mode = batch_mode
+        self.batch_size = batch_size
+        self.event_batch_size = event_batch_size
+        self.history = history
+        self.accepts_deltas = not history
+        self.history_retention_days = history_retention_days
+        self.history_maintenance_interval = history_maintenance_interval
+        self.flush_interval = flush_interval
+        self.max_flush_retries = max_flush_retries
+        self.max_buffer = max_buffer or batch_size * 20
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = max(pool_min_size, pool_max_size)
+        self.pool = None
+
+        # Batch mode state
+        self.buffer = []
+        self.flush_task = None
+        self.last_flush = time.time()
+        # Failed device/event batches are retried with backoff until max_flush_retries
+        self.flush_failures = {'devices': 0, 'events': 0}
+        self.retry_at = {'devices': 0.0, 'events': 0.0}
+        # Event batching state
+        self.event_buffer = []
+        self.last_event_flush = time.time()
+        self.event_partitions = set()
+        self.events_enabled = True
+        # History mode state
+        self.history_buffer = []
+        self.last_history_flush = time.time()
+        self.last_history_maintenance = 0.0
+        self.history_partitions = set()
+        self.timescale = False
+        self.stats = {
+            'flushes': 0,
+            'records_flushed': 0,
+            'flush_errors': 0,
+            'records_dropped': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'events_flushed': 0,
+            'event_flushes': 0,
+            'event_flush_errors': 0,
+            'events_dropped': 0,
+            'legacy_events_skipped': 0,
+            'history_rows': 0,
+            'history_flushes': 0,
+            'history_flush_errors': 0,
+            'history_partitions_dropped': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.PostgreSQLExporter")
+
     async def connect(self):
         """Connect to PostgreSQL"""
         if not POSTGRES_AVAILABLE:
             raise ImportError("asyncpg not available. Install with: pip install asyncpg")
-            
-        self.conn = await asyncpg.connect(self.connection_string)
-        
+
+        self.pool = await asyncpg.create_pool(
+            self.connection_string,
+            min_size=self.pool_min_size,
+            max_size=self.pool_max_size
+        )
+
         # Create table if it doesn't exist
-        await self.conn.execute("""
+        await self.pool.execute("""
             CREATE TABLE IF NOT EXISTS kismet_devices (
                 mac_addr TEXT PRIMARY KEY,
                 name TEXT,
@@ -287,169 +920,1395 @@ class PostgreSQLExporter:
                 latitude DOUBLE PRECISION,
                 longitude DOUBLE PRECISION,
                 altitude DOUBLE PRECISION,
+                sensor TEXT,
                 last_updated TIMESTAMP DEFAULT NOW()
             )
         """)
-        
+        await self.pool.execute("ALTER TABLE kismet_devices ADD COLUMN IF NOT EXISTS sensor TEXT")
+
+        try:
+            await self._create_events_table()
+        except Exception as e:
+            self.events_enabled = False
+            self.logger.error(f"Cannot use kismet_events, event persistence disabled: {e}")
+
+        if self.history:
+            await self._create_history_table()
+
+        self.last_flush = time.time()
+        self.last_event_flush = time.time()
+        self.last_history_flush = time.time()
+        self.flush_task = asyncio.create_task(self._flush_loop())
+        if self.batch_mode:
+            self.logger.info(f"PostgreSQL batch mode enabled (batch size: {self.batch_size}, "
+                             f"flush interval: {self.flush_interval}s, pool size: {self.pool_max_size})")
+
+    async def _create_events_table(self):
+        """Create the partitioned kismet_events table, migrating an unpartitioned one"""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                existing = await conn.fetchval("SELECT to_regclass('kismet_events')")
+                partitioned = existing is not None and await conn.fetchval(
+                    "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('kismet_events')"
+                )
+                if existing is not None and not partitioned:
+                    self.logger.warning("Migrating unpartitioned kismet_events to kismet_events_legacy")
+                    await conn.execute("ALTER TABLE kismet_events RENAME TO kismet_events_legacy")
+
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS kismet_events (
+                        event_time TIMESTAMPTZ NOT NULL,
+                        event_type TEXT NOT NULL,
+                        sensor TEXT,
+                        payload JSONB NOT NULL
+                    ) PARTITION BY RANGE (event_time)
+                """)
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS kismet_events_type_time_idx
+                    ON kismet_events (event_type, event_time)
+                """)
+
+                if existing is not None and not partitioned:
+                    await self._copy_legacy_events(conn)
+
+    async def _copy_legacy_events(self, conn):
+        """Copy rows from kismet_events_legacy into the partitioned table"""
+        columns = {row['column_name'] for row in await conn.fetch("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'kismet_events_legacy' AND table_schema = current_schema()
+        """)}
+        payload = next((column for column in ('payload', 'event_data') if column in columns), None)
+        if not {'event_time', 'event_type'} <= columns or payload is None:
+            self.logger.warning("Legacy kismet_events has an unknown layout; "
+                                "its rows were left in kismet_events_legacy")
+            return
+
+        # Rows are converted here rather than with SQL casts, so one row in
+        # an odd format is skipped instead of failing the whole migration
+        sensor = 'sensor::text' if 'sensor' in columns else 'NULL'
+        query = (f"SELECT event_time, event_type::text, {sensor}, {payload}::text "
+                 f"FROM kismet_events_legacy")
+        copied = skipped = 0
+        chunk = []
+        async for row in conn.cursor(query, prefetch=self.LEGACY_CHUNK_SIZE):
+            record = self._legacy_event_record(*row)
+            if record is None:
+                skipped += 1
+                continue
+            chunk.append(record)
+            if len(chunk) >= self.LEGACY_CHUNK_SIZE:
+                copied += await self._copy_events(conn, chunk)
+                chunk = []
+        if chunk:
+            copied += await self._copy_events(conn, chunk)
+
+        self.stats['legacy_events_skipped'] += skipped
+        if skipped:
+            self.logger.warning(f"Skipped {skipped} legacy events without a usable time or type; "
+                                "they remain in kismet_events_legacy")
+        self.logger.info(f"Copied {copied} legacy events into kismet_events")
+
+    @staticmethod
+    def _legacy_event_record(event_time, event_type, sensor, payload) -> Optional[tuple]:
+        """Convert a kismet_events_legacy row to EVENT_COLUMNS order, or None to skip it"""
+        if not event_type:
+            return None
+        if isinstance(event_time, str):
+            try:
+                event_time = float(event_time)
+            except ValueError:
+                try:
+                    event_time = datetime.fromisoformat(event_time.strip().replace('Z', '+00:00'))
+                except ValueError:
+                    return None
+        if isinstance(event_time, (int, float, Decimal)):
+            try:
+                event_time = datetime.fromtimestamp(float(event_time), timezone.utc)
+            except (ValueError, OverflowError, OSError):
+                return None
+        if not isinstance(event_time, datetime):
+            return None
+        # Unzoned legacy timestamps were written in UTC by NOW() on a UTC server
+        event_time = (event_time.replace(tzinfo=timezone.utc) if event_time.tzinfo is None
+                      else event_time.astimezone(timezone.utc))
+
+        if payload is None:
+            payload = '{}'
+        else:
+            try:
+                codec.loads(payload)
+            except json.JSONDecodeError:
+                payload = codec.dumps(payload)
+        return (event_time, event_type, sensor, payload)
+
+    async def _copy_events(self, conn, records: List[tuple]) -> int:
+        """COPY event rows, creating the daily partitions they need"""
+        await self._ensure_partitions(conn, 'kismet_events', records, self.event_partitions)
+        await conn.copy_records_to_table('kismet_events', records=records, columns=self.EVENT_COLUMNS)
+        return len(records)
+
+    async def _create_history_table(self):
+        """Create kismet_device_history as a hypertable or natively partitioned table"""
+        self.timescale = bool(await self.pool.fetchval(
+            "SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'"
+        ))
+        partitioning = "" if self.timescale else "PARTITION BY RANGE (observed_at)"
+        await self.pool.execute(f"""
+            CREATE TABLE IF NOT EXISTS kismet_device_history (
+                observed_at TIMESTAMPTZ NOT NULL,
+                mac_addr TEXT NOT NULL,
+                sensor TEXT,
+                signal_dbm INTEGER,
+                noise_dbm INTEGER,
+                snr_db INTEGER,
+                latitude DOUBLE PRECISION,
+                longitude DOUBLE PRECISION,
+                altitude DOUBLE PRECISION,
+                total_packets BIGINT,
+                tx_packets BIGINT,
+                rx_packets BIGINT,
+                data_size BIGINT
+            ) {partitioning}
+        """)
+        if self.timescale:
+            await self.pool.execute("""
+                SELECT create_hypertable('kismet_device_history', 'observed_at',
+                                         chunk_time_interval => INTERVAL '1 day',
+                                         if_not_exists => TRUE)
+            """)
+        await self.pool.execute("""
+            CREATE INDEX IF NOT EXISTS kismet_device_history_mac_time_idx
+            ON kismet_device_history (mac_addr, observed_at DESC)
+        """)
+        self.logger.info("PostgreSQL history mode enabled "
+                         f"({'TimescaleDB hypertable' if self.timescale else 'native partitions'}, "
+                         f"retention: {self.history_retention_days or 'unlimited'} days)")
+
+    @staticmethod
+    def _typed_values(device_info: Dict[str, Any], columns: list) -> list:
+        """Read columns from a record, coercing numeric values to their column type"""
+        values = []
+        for column, column_type in columns:
+            value = device_info.get(column)
+            if value is not None and column_type is not str:
+                try:
+                    value = column_type(value)
+                except (TypeError, ValueError):
+                    value = None
+            values.append(value)
+        return values
+
+    def _device_record(self, device_info: Dict[str, Any]) -> tuple:
+        """Build a typed row tuple in DEVICE_COLUMNS order.
+
+        Binary COPY is strict about Python types, so numeric values coming from
+        Kismet (which may arrive as floats or be missing) are coerced here.
+        """
+        return tuple(self._typed_values(device_info, self.DEVICE_COLUMNS))
+
+    def _history_record(self, device_info: Dict[str, Any]) -> tuple:
+        """Build a history row: observation time (from last_seen) then HISTORY_COLUMNS"""
+        observed_at = None
+        last_seen = device_info.get('last_seen')
+        if last_seen:
+            try:
+                observed_at = datetime.fromtimestamp(float(last_seen), timezone.utc)
+            except (TypeError, ValueError, OverflowError, OSError):
+                pass
+        if observed_at is None:
+            observed_at = datetime.now(timezone.utc)
+        return (observed_at, *self._typed_values(device_info, self.HISTORY_COLUMNS))
+
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device to PostgreSQL"""
-        if not self.conn:
+        if not self.pool:
             await self.connect()
-            
-        await self.conn.execute("""
-            INSERT INTO kismet_devices (
-                mac_addr, name, username, phy_type, manufacturer,
-                first_seen, last_seen, channel, frequency,
-                total_packets, tx_packets, rx_packets, data_size,
-                signal_dbm, noise_dbm, snr_db,
-                latitude, longitude, altitude, last_updated
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, NOW())
-            ON CONFLICT (mac_addr) DO UPDATE SET
-                name = EXCLUDED.name,
-                username = EXCLUDED.username,
-                last_seen = EXCLUDED.last_seen,
-                channel = EXCLUDED.channel,
-                frequency = EXCLUDED.frequency,
-                total_packets = EXCLUDED.total_packets,
-                tx_packets = EXCLUDED.tx_packets,
-                rx_packets = EXCLUDED.rx_packets,
-                data_size = EXCLUDED.data_size,
-                signal_dbm = EXCLUDED.signal_dbm,
-                noise_dbm = EXCLUDED.noise_dbm,
-                snr_db = EXCLUDED.snr_db,
-                latitude = EXCLUDED.latitude,
-                longitude = EXCLUDED.longitude,
-                altitude = EXCLUDED.altitude,
-                last_updated = NOW()
-        """, device_info['mac_addr'], device_info['name'], device_info['username'],
-             device_info['phy_type'], device_info['manufacturer'],
-             device_info['first_seen'], device_info['last_seen'],
-             device_info['channel'], device_info['frequency'],
-             device_info['total_packets'], device_info['tx_packets'], device_info['rx_packets'],
-             device_info['data_size'], device_info['signal_dbm'], device_info['noise_dbm'],
-             device_info['snr_db'], device_info['latitude'], device_info['longitude'],
-             device_info['altitude'])
-             
+
+        if self.history:
+            self.history_buffer.append(self._history_record(device_info))
+            if len(self.history_buffer) >= self.batch_size:
+                await self.flush_history()
+
+        if self.batch_mode:
+            self.buffer.append(self._device_record(device_info))
+            if len(self.buffer) > self.max_buffer:
+                # Still backing off from a failed flush
+                del self.buffer[0]
+                self.stats['records_dropped'] += 1
+            if len(self.buffer) >= self.batch_size:
+                await self.flush()
+            return
+
+        await self.pool.execute(self.DEVICE_INSERT + self.DEVICE_UPSERT, *self._device_record(device_info))
+
+    async def _upsert_rows(self, rows: List[tuple]) -> int:
+        """Upsert rows one at a time, dropping only those that fail"""
+        written = 0
+        error = None
+        for row in rows:
+            try:
+                await self.pool.execute(self.DEVICE_INSERT + self.DEVICE_UPSERT, *row)
+                written += 1
+            except Exception as e:
+                error = e
+        dropped = len(rows) - written
+        if dropped:
+            self.stats['records_dropped'] += dropped
+            self.logger.error(f"Dropped {dropped} of {len(rows)} devices that could not be "
+                              f"written one at a time: {error}")
+        return written
+
+    async def flush(self, force: bool = False):
+        """Stream buffered device rows into a staging table and merge them
+
+        A batch that fails is put back at the head of the buffer and retried
+        after a backoff; after max_flush_retries failures in a row its rows
+        are upserted one at a time and only the rows that still fail are
+        dropped (counted in records_dropped). The buffer never holds more
+        than max_buffer rows, dropping the oldest beyond that.
+        """
+        if not self.buffer or not self.pool:
+            return
+        if not force and time.time() < self.retry_at['devices']:
+            return
+
+        records, self.buffer = self.buffer, []
+        self.last_flush = time.time()
+        rows = self._merge_rows(records)
+        columns = [column for column, _ in self.DEVICE_COLUMNS]
+        column_list = ", ".join(columns)
+        start = time.perf_counter()
+
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # Temp tables are per-connection, so each pooled connection
+                    # creates its own staging table once and reuses it
+                    await conn.execute("""
+                        CREATE TEMP TABLE IF NOT EXISTS kismet_devices_staging
+                        (LIKE kismet_devices INCLUDING DEFAULTS)
+                        ON COMMIT DELETE ROWS
+                    """)
+                    await conn.copy_records_to_table(
+                        'kismet_devices_staging', records=rows, columns=columns
+                    )
+                    # DISTINCT ON keeps the newest row per MAC, since ON CONFLICT
+                    # cannot touch the same target row twice in one statement
+                    await conn.execute(f"""
+                        INSERT INTO kismet_devices ({column_list}, last_updated)
+                        SELECT DISTINCT ON (mac_addr) {column_list}, NOW()
+                        FROM kismet_devices_staging
+                        ORDER BY mac_addr, last_seen DESC
+                    """ + self.DEVICE_UPSERT)
+        except Exception as e:
+            self.stats['flush_errors'] += 1
+            if not self._retry_batch('devices', self.buffer, records, 'records_dropped', e):
+                # One bad row must not take the rest of the batch with it
+                self.logger.error(f"Batch of {len(rows)} devices failed {self.max_flush_retries} "
+                                  f"retries, writing them one at a time: {e}")
+                self.stats['records_flushed'] += await self._upsert_rows(rows)
+            return
+
+        self.flush_failures['devices'] = 0
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats['flushes'] += 1
+        self.stats['records_flushed'] += len(records)
+        self.stats['last_batch_size'] = len(records)
+        self.stats['last_flush_ms'] = elapsed_ms
+        self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
+        self.logger.debug(f"Flushed {len(records)} devices to PostgreSQL in {elapsed_ms:.1f}ms")
+
+    def _retry_batch(self, kind: str, buffer: list, records: list, dropped_stat: str,
+                     error: Exception) -> bool:
+        """Put a failed batch back at the head of its buffer and back off
+
+        Returns False, leaving the batch to the caller, once it has failed
+        max_flush_retries times in a row. The buffer is trimmed to max_buffer
+        rows, dropping the oldest.
+        """
+        self.flush_failures[kind] += 1
+        failures = self.flush_failures[kind]
+        if failures > self.max_flush_retries:
+            self.flush_failures[kind] = 0
+            return False
+
+        delay = min(2 ** failures, 30)
+        self.retry_at[kind] = time.time() + delay
+        buffer[:0] = records
+        overflow = len(buffer) - self.max_buffer
+        if overflow > 0:
+            del buffer[:overflow]
+            self.stats[dropped_stat] += overflow
+        self.logger.error(f"Failed to flush {len(records)} {kind} to PostgreSQL "
+                          f"(attempt {failures}), retrying in {delay}s: {error}")
+        return True
+
+    def _merge_rows(self, records: List[tuple]) -> List[tuple]:
+        """Collapse buffered rows to one per MAC, oldest last_seen first
+
+        Later values win, but a NULL (a column missing from a delta record)
+        keeps the earlier value, matching the COALESCE in DEVICE_UPSERT.
+        """
+        last_seen = [column for column, _ in self.DEVICE_COLUMNS].index('last_seen')
+        merged = {}
+        for row in sorted(records, key=lambda row: row[last_seen] or 0):
+            previous = merged.get(row[0])
+            merged[row[0]] = row if previous is None else tuple(
+                old if new is None else new for old, new in zip(previous, row))
+        return list(merged.values())
+
+    async def _flush_loop(self):
+        """Flush the batch buffers when they have been idle for flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            now = time.time()
+            if self.buffer and now - self.last_flush >= self.flush_interval:
+                await self.flush()
+            if self.event_buffer and now - self.last_event_flush >= self.flush_interval:
+                await self.flush_events()
+            if self.history_buffer and now - self.last_history_flush >= self.flush_interval:
+                await self.flush_history()
+            if self.history and now - self.last_history_maintenance >= self.history_maintenance_interval:
+                self.last_history_maintenance = now
+                await self.drop_expired_history()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batch flush statistics"""
+        stats = dict(self.stats)
+        stats['buffered'] = len(self.buffer)
+        stats['events_buffered'] = len(self.event_buffer)
+        stats['history_buffered'] = len(self.history_buffer)
+        stats['avg_batch_size'] = (stats['records_flushed'] / stats['flushes']
+                                   if stats['flushes'] else 0)
+        return stats
+
+    def _event_record(self, event_data: Dict[str, Any]) -> tuple:
+        """Build a row tuple in EVENT_COLUMNS order.
+
+        Kismet event bus messages carry their content under a single key
+        named after the event type, e.g. {"ALERT": {...}}.
+        """
+        event_type = 'unknown'
+        content = {}
+        for key, value in event_data.items():
+            if key != 'sensor' and isinstance(value, dict):
+                event_type, content = key, value
+                break
+
+        event_time = None
+        for field in self.EVENT_TIME_FIELDS:
+            value = content.get(field)
+            if value:
+                try:
+                    event_time = datetime.fromtimestamp(float(value), timezone.utc)
+                    break
+                except (TypeError, ValueError, OverflowError, OSError):
+                    pass
+        if event_time is None:
+            event_time = datetime.now(timezone.utc)
+
+        return (event_time, event_type, event_data.get('sensor'), codec.dumps(event_data))
+
+    @staticmethod
+    async def _ensure_partitions(conn, table: str, records: list, created: set):
+        """Create the daily partitions of table needed by records (timestamp first)"""
+        for day in sorted({record[0].date() for record in records} - created):
+            start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            end = start + timedelta(days=1)
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table}_{day:%Y%m%d}
+                PARTITION OF {table}
+                FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+            """)
+            created.add(day)
+
+    async def flush_events(self, force: bool = False):
+        """COPY buffered events into kismet_events
+
+        Failed batches are retried with the same backoff as device batches,
+        then dropped (counted in events_dropped).
+        """
+        if not self.event_buffer or not self.pool or not self.events_enabled:
+            return
+        if not force and time.time() < self.retry_at['events']:
+            return
+
+        records, self.event_buffer = self.event_buffer, []
+        self.last_event_flush = time.time()
+
+        try:
+            async with self.pool.acquire() as conn:
+                await self._copy_events(conn, records)
+        except Exception as e:
+            self.stats['event_flush_errors'] += 1
+            if not self._retry_batch('events', self.event_buffer, records, 'events_dropped', e):
+                self.stats['events_dropped'] += len(records)
+                self.logger.error(f"Dropping {len(records)} events after {self.max_flush_retries} "
+                                  f"failed PostgreSQL flushes: {e}")
+            return
+
+        self.flush_failures['events'] = 0
+        self.stats['event_flushes'] += 1
+        self.stats['events_flushed'] += len(records)
+        self.logger.debug(f"Flushed {len(records)} events to PostgreSQL")
+
+    async def flush_history(self):
+        """COPY buffered observations into kismet_device_history"""
+        if not self.history_buffer or not self.pool:
+            return
+
+        records, self.history_buffer = self.history_buffer, []
+        self.last_history_flush = time.time()
+        columns = ['observed_at'] + [column for column, _ in self.HISTORY_COLUMNS]
+
+        try:
+            async with self.pool.acquire() as conn:
+                if not self.timescale:
+                    await self._ensure_partitions(conn, 'kismet_device_history', records,
+                                                  self.history_partitions)
+                await conn.copy_records_to_table(
+                    'kismet_device_history', records=records, columns=columns
+                )
+        except Exception as e:
+            self.stats['history_flush_errors'] += 1
+            self.logger.error(f"Failed to flush {len(records)} history rows to PostgreSQL: {e}")
+            return
+
+        self.stats['history_flushes'] += 1
+        self.stats['history_rows'] += len(records)
+
+    async def drop_expired_history(self):
+        """Drop history chunks/partitions that lie entirely before the retention window"""
+        if not self.history_retention_days or not self.pool:
+            return
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.history_retention_days)
+        try:
+            if self.timescale:
+                dropped = await self.pool.fetch(
+                    "SELECT drop_chunks('kismet_device_history', older_than => $1::timestamptz)",
+                    cutoff
+                )
+                self.stats['history_partitions_dropped'] += len(dropped)
+                return
+
+            partitions = await self.pool.fetch("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = 'kismet_device_history'
+            """)
+            for row in partitions:
+                suffix = row['relname'].rsplit('_', 1)[-1]
+                try:
+                    day = datetime.strptime(suffix, '%Y%m%d').date()
+                except ValueError:
+                    continue
+                # A partition holds [day, day + 1), so it expires once its end passes the cutoff
+                if day + timedelta(days=1) <= cutoff.date():
+                    await self.pool.execute(f'DROP TABLE IF EXISTS "{row["relname"]}"')
+                    self.history_partitions.discard(day)
+                    self.stats['history_partitions_dropped'] += 1
+                    self.logger.info(f"Dropped expired history partition {row['relname']}")
+        except Exception as e:
+            self.logger.error(f"History retention failed: {e}")
+
     async def export_event(self, event_data: Dict[str, Any]):
-        """Export event to PostgreSQL (could create events table)"""
-        pass
-        
+        """Buffer event for a batched COPY into kismet_events"""
+        if not self.pool:
+            await self.connect()
+        if not self.events_enabled:
+            return
+
+        self.event_buffer.append(self._event_record(event_data))
+        if len(self.event_buffer) > self.max_buffer:
+            # Still backing off from a failed flush
+            del self.event_buffer[0]
+            self.stats['events_dropped'] += 1
+        if len(self.event_buffer) >= self.event_batch_size:
+            await self.flush_events()
+
     async def close(self):
         """Close PostgreSQL connection"""
-        if self.conn:
-            await self.conn.close()
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+
+        if self.pool:
+            await self.flush(force=True)
+            await self.flush_events(force=True)
+            await self.flush_history()
+            await self.pool.close()
+
+        if self.batch_mode:
+            stats = self.get_stats()
+            self.logger.info(f"PostgreSQL batch writer closed. Flushed {stats['records_flushed']} devices "
+                             f"in {stats['flushes']} batches (avg batch {stats['avg_batch_size']:.1f}, "
+                             f"last flush {stats['last_flush_ms']:.1f}ms, max {stats['max_flush_ms']:.1f}ms)")
+
+
+class InfluxDBExporter:
+    """Export device data to InfluxDB (time series database)
+
+    Points are encoded straight to line protocol and written in batches by a
+    background task, with the blocking client call pushed to an executor so
+    the event loop never waits on an HTTP round trip.
+
+    The "bounded" schema mode keeps series cardinality under control: only the
+    configured tag_keys become tags (other identifying attributes are written
+    as string fields), MACs can be hashed into a fixed number of mac_shard
+    tags (16 by default in bounded mode), and at most max_series tag sets are
+    tracked. When the tracker is full and its least recently used series is
+    still active, new series are written to an aggregate series with their
+    high-cardinality tags set to "_other" and the original values kept in
+    "<tag>_raw" fields.
+
+    Without a mac_addr tag, devices seen in the same second would share a
+    series and timestamp, and InfluxDB would keep only the last of them. Such
+    points are offset within their second by a per-MAC number of nanoseconds.
+
+    Records from a multi-server client also carry their origin sensor as a tag.
+    """
+
+    DEVICE_TAGS = ['mac_addr', 'phy_type', 'manufacturer']
+    SCHEMA_MODES = ["default", "bounded"]
+    AGGREGATE_KEEP_TAGS = ('phy_type', 'mac_shard', 'sensor')
+    AGGREGATE_TAG_VALUE = '_other'
+    DEFAULT_MAC_SHARDS = 16
+    # Fixed field types keep InfluxDB from rejecting points on type conflicts
+    DEVICE_FIELDS = [
+        ('signal_dbm', int), ('noise_dbm', int), ('snr_db', int),
+        ('total_packets', int), ('tx_packets', int), ('rx_packets', int),
+        ('data_size', int), ('frequency', float),
+        ('latitude', float), ('longitude', float)
+    ]
+    RETRY_STATUSES = (429, 503)
+
+    def __init__(self, url: str, token: str, org: str, bucket: str,
+                 batch_size: int = 5000, flush_interval: float = 1.0,
+                 max_retries: int = 5, max_buffer: int = 100000,
+                 schema_mode: str = "default", tag_keys: List[str] = None,
+                 mac_shards: int = None, max_series: int = 10000,
+                 series_idle_timeout: float = 3600.0):
+        if schema_mode not in self.SCHEMA_MODES:
+            raise ValueError(f"Unknown InfluxDB schema mode: {schema_mode}")
+        if not INFLUXDB_AVAILABLE:
+            raise ImportError("influxdb-client not available. Install with: pip install influxdb-client")
+
+        self.client = InfluxDBClient(url=url, token=token, org=org)
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+        self.bucket = bucket
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.max_buffer = max_buffer
+
+        # Series schema
+        self.schema_mode = schema_mode
+        if tag_keys is None:
+            tag_keys = ['phy_type'] if schema_mode == "bounded" else self.DEVICE_TAGS
+        self.tag_keys = list(tag_keys)
+        self.string_fields = [attr for attr in self.DEVICE_TAGS if attr not in self.tag_keys]
+        if mac_shards is None:
+            mac_shards = self.DEFAULT_MAC_SHARDS if schema_mode == "bounded" else 0
+        self.mac_shards = mac_shards
+        self.max_series = max_series
+        self.series_idle_timeout = series_idle_timeout
+        # Tag set -> last time a point was written to it, in LRU order
+        self.series = OrderedDict()
+
+        self.lines = []
+        self.flush_task = None
+        self.flush_event = None
+        self.flush_lock = None
+        self.stats = {
+            'points_written': 0,
+            'points_dropped': 0,
+            'batches_written': 0,
+            'retries': 0,
+            'last_flush_ms': 0.0,
+            'series_evicted': 0,
+            'points_aggregated': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.InfluxDBExporter")
+
+    @staticmethod
+    def _escape_key(value: str) -> str:
+        """Escape a measurement, tag key, tag value or field key"""
+        return value.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+    @staticmethod
+    def _encode_field(value: Any) -> str:
+        """Encode a field value using line protocol type rules"""
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, int):
+            return f"{value}i"
+        if isinstance(value, float):
+            return repr(value)
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{value}"'
+
+    def _encode_line(self, measurement: str, tags: Dict[str, Any],
+                     fields: Dict[str, Any], timestamp_ns: int) -> Optional[str]:
+        """Encode one point as a line protocol string"""
+        escape = self._escape_key
+        tag_set = ''.join(f",{escape(key)}={escape(str(value))}"
+                          for key, value in tags.items() if value not in (None, ''))
+        field_set = ','.join(f"{escape(key)}={self._encode_field(value)}"
+                             for key, value in fields.items() if value is not None)
+        if not field_set:
+            return None
+        return f"{escape(measurement)}{tag_set} {field_set} {timestamp_ns}"
+
+    def encode_device_line(self, device_info: Dict[str, Any]) -> Optional[str]:
+        """Encode a device record as a device_metrics line"""
+        tags = {tag: device_info.get(tag) for tag in self.tag_keys}
+        mac_addr = device_info.get('mac_addr') or ''
+        mac_hash = zlib.crc32(mac_addr.encode('utf-8'))
+        if self.mac_shards:
+            tags['mac_shard'] = str(mac_hash % self.mac_shards)
+        if device_info.get('sensor'):
+            tags['sensor'] = device_info['sensor']
+
+        fields = {}
+        for attr in self.string_fields:
+            if device_info.get(attr):
+                fields[attr] = str(device_info[attr])
+        for field, field_type in self.DEVICE_FIELDS:
+            value = device_info.get(field)
+            if value is not None:
+                try:
+                    fields[field] = field_type(value)
+                except (TypeError, ValueError):
+                    pass
+
+        if self.schema_mode == "bounded" and not self._admit_series(tags):
+            # Fold the point into the aggregate series for its phy/shard
+            self.stats['points_aggregated'] += 1
+            for tag, value in tags.items():
+                if tag not in self.AGGREGATE_KEEP_TAGS and value not in (None, ''):
+                    fields[f"{tag}_raw"] = str(value)
+                    tags[tag] = self.AGGREGATE_TAG_VALUE
+
+        last_seen = device_info.get('last_seen') or 0
+        timestamp_ns = int(last_seen * 1000000000) if last_seen else time.time_ns()
+        if last_seen and tags.get('mac_addr') != mac_addr:
+            # last_seen has one-second resolution; keep same-second devices apart
+            timestamp_ns += mac_hash % 1000000000
+        return self._encode_line("device_metrics", tags, fields, timestamp_ns)
+
+    def _admit_series(self, tags: Dict[str, Any]) -> bool:
+        """Track a tag set, returning False when it must use the aggregate series"""
+        key = tuple(tags.values())
+        now = time.time()
+
+        if key in self.series:
+            self.series[key] = now
+            self.series.move_to_end(key)
+            return True
+
+        if len(self.series) >= self.max_series:
+            oldest_seen = next(iter(self.series.values()))
+            if now - oldest_seen < self.series_idle_timeout:
+                return False
+            self.series.popitem(last=False)
+            self.stats['series_evicted'] += 1
+
+        self.series[key] = now
+        return True
+
+    def _append(self, line: Optional[str]):
+        """Buffer a line and wake the writer once a batch is ready"""
+        if line is None:
+            return
+        if len(self.lines) >= self.max_buffer:
+            self.stats['points_dropped'] += 1
+            return
+
+        self.lines.append(line)
+        self._ensure_flush_task()
+        if len(self.lines) >= self.batch_size:
+            self.flush_event.set()
+
+    def _ensure_flush_task(self):
+        """Start the background writer on first use"""
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_event = asyncio.Event()
+            self.flush_lock = asyncio.Lock()
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Flush when a batch fills up or flush_interval elapses"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write buffered lines in batch_size chunks"""
+        if not self.lines or self.flush_lock is None:
+            return
+
+        async with self.flush_lock:
+            while self.lines:
+                batch = self.lines[:self.batch_size]
+                del self.lines[:self.batch_size]
+                await self._write_batch(batch)
+
+    async def _write_batch(self, batch: list):
+        """Write one batch, retrying with jittered backoff on 429/503"""
+        loop = asyncio.get_running_loop()
+        payload = '\n'.join(batch)
+        delay = 1.0
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await loop.run_in_executor(
+                    None, functools.partial(self.write_api.write, bucket=self.bucket, record=payload)
+                )
+                self.stats['points_written'] += len(batch)
+                self.stats['batches_written'] += 1
+                self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+                return
+            except Exception as e:
+                status = getattr(e, 'status', None)
+                if status is not None and status not in self.RETRY_STATUSES:
+                    self.logger.error(f"InfluxDB rejected batch of {len(batch)} points: {e}")
+                    break
+                if attempt == self.max_retries:
+                    self.logger.error(f"Giving up on batch of {len(batch)} points after "
+                                      f"{self.max_retries} retries: {e}")
+                    break
+
+                retry_after = getattr(e, 'retry_after', None)
+                try:
+                    wait = float(retry_after) if retry_after else delay
+                except ValueError:
+                    wait = delay
+                wait += random.uniform(0, wait / 2)
+                self.stats['retries'] += 1
+                self.logger.warning(f"InfluxDB write failed (status {status}), retrying in {wait:.1f}s")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, 30.0)
 
+        self.stats['points_dropped'] += len(batch)
 
-class InfluxDBExporter:
-    """Export device data to InfluxDB (time series database)"""
-    
-    def __init__(self, url: str, token: str, org: str, bucket: str):
-        if not INFLUXDB_AVAILABLE:
-            raise ImportError("influxdb-client not available. Install with: pip install influxdb-client")
-            
-        self.client = InfluxDBClient(url=url, token=token, org=org)
-        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
-        self.bucket = bucket
-        
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device to InfluxDB"""
-        point = Point("device_metrics") \
-            .tag("mac_addr", device_info['mac_addr']) \
-            .tag("phy_type", device_info['phy_type']) \
-            .tag("manufacturer", device_info['manufacturer']) \
-            .field("signal_dbm", device_info['signal_dbm']) \
-            .field("noise_dbm", device_info['noise_dbm']) \
-            .field("snr_db", device_info['snr_db']) \
-            .field("total_packets", device_info['total_packets']) \
-            .field("tx_packets", device_info['tx_packets']) \
-            .field("rx_packets", device_info['rx_packets']) \
-            .field("data_size", device_info['data_size']) \
-            .field("frequency", device_info['frequency']) \
-            .field("latitude", device_info['latitude']) \
-            .field("longitude", device_info['longitude']) \
-            .time(int(device_info['last_seen'] * 1000000000))  # Convert to nanoseconds
-            
-        self.write_api.write(bucket=self.bucket, record=point)
-        
+        self._append(self.encode_device_line(device_info))
+
     async def export_event(self, event_data: Dict[str, Any]):
         """Export event to InfluxDB"""
-        point = Point("kismet_events") \
-            .field("event_data", json.dumps(event_data)) \
-            .time(int(time.time() * 1000000000))
-            
-        self.write_api.write(bucket=self.bucket, record=point)
-        
+        self._append(self._encode_line("kismet_events", {},
+                                       {"event_data": codec.dumps(event_data)}, time.time_ns()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batch writer statistics"""
+        stats = dict(self.stats)
+        stats['buffered'] = len(self.lines)
+        stats['series_tracked'] = len(self.series)
+        return stats
+
     async def close(self):
         """Close InfluxDB connection"""
+        if self.flush_task:
+            # Wait out any in-flight batch before stopping the writer
+            async with self.flush_lock:
+                self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+            await self.flush()
         self.client.close()
 
 
+class ParquetExporter:
+    """Archive device data as compressed Parquet files for offline analysis
+
+    Records are buffered per partition and written as Arrow record batches
+    (one row group per flush) to a file per partition. The archive uses
+    hive-style directories, <output_dir>/date=YYYY-MM-DD/phy_type=<phy>/,
+    so pandas, pyarrow.dataset and DuckDB can prune by day and phy without
+    opening the files; the partition values live in the path only. The date
+    is taken from the device's last_seen time (UTC).
+
+    Files are written under a dot-prefixed name, which readers skip, and
+    renamed into place once closed, so a scan never sees a partial file. A
+    file rolls when it reaches max_file_bytes or is roll_interval seconds old.
+    """
+
+    COMPRESSIONS = ["zstd", "snappy", "gzip", "none"]
+    # Values that do not convert to the column type are written as nulls
+    COLUMNS = [
+        ('timestamp', str), ('mac_addr', str), ('name', str), ('username', str),
+        ('manufacturer', str), ('first_seen', int), ('last_seen', int),
+        ('channel', str), ('frequency', float),
+        ('total_packets', int), ('tx_packets', int), ('rx_packets', int), ('data_size', int),
+        ('signal_dbm', int), ('noise_dbm', int), ('snr_db', int),
+        ('latitude', float), ('longitude', float), ('altitude', float),
+        ('sensor', str)
+    ]
+
+    def __init__(self, output_dir: str, compression: str = "zstd",
+                 batch_size: int = 10000, flush_interval: float = 10.0,
+                 max_file_bytes: int = 128 * 1024 * 1024, roll_interval: float = 3600.0,
+                 max_buffer: int = 500000):
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown Parquet compression: {compression}")
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow not available. Install with: pip install pyarrow")
+
+        self.output_dir = output_dir
+        self.compression = compression
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.roll_interval = roll_interval
+        self.max_buffer = max_buffer
+
+        arrow_types = {str: pa.string(), int: pa.int64(), float: pa.float64()}
+        self.schema = pa.schema([(column, arrow_types[column_type])
+                                 for column, column_type in self.COLUMNS])
+
+        # (date, phy) -> buffered row tuples
+        self.buffers = {}
+        self.buffered = 0
+        # (date, phy) -> [writer, temp path, final path, opened at]
+        self.writers = {}
+        # Day number -> partition date string
+        self.dates = {}
+        self.file_sequence = 0
+
+        self.flush_task = None
+        self.flush_event = None
+        self.flush_lock = None
+        self.stats = {
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'batches_written': 0,
+            'files_written': 0,
+            'bytes_written': 0,
+            'write_errors': 0,
+            'last_flush_ms': 0.0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.ParquetExporter")
+
+    def _partition(self, device_info: Dict[str, Any]) -> tuple:
+        """Partition key (date, phy) for a record"""
+        last_seen = device_info.get('last_seen') or time.time()
+        try:
+            day = int(last_seen // 86400)
+        except TypeError:
+            day = int(time.time() // 86400)
+        date = self.dates.get(day)
+        if date is None:
+            date = self.dates[day] = datetime.fromtimestamp(day * 86400, timezone.utc).strftime('%Y-%m-%d')
+
+        phy = re.sub(r'[^A-Za-z0-9._-]', '_', str(device_info.get('phy_type') or '')) or 'unknown'
+        return date, phy
+
+    def _row(self, device_info: Dict[str, Any]) -> tuple:
+        """Build a typed row tuple in COLUMNS order"""
+        row = []
+        for column, column_type in self.COLUMNS:
+            value = device_info.get(column)
+            if value is not None and column_type is not str:
+                try:
+                    value = column_type(value)
+                except (TypeError, ValueError):
+                    value = None
+            elif value is not None:
+                value = str(value)
+            row.append(value)
+        return tuple(row)
+
+    def _ensure_flush_task(self):
+        """Start the background writer on first use"""
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_event = asyncio.Event()
+            self.flush_lock = asyncio.Lock()
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Flush when a partition fills up or flush_interval elapses"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            await self.flush()
+
+    async def flush(self, close_files: bool = False):
+        """Convert buffered rows to record batches and write them off the event loop"""
+        if self.flush_lock is None:
+            return
+
+        async with self.flush_lock:
+            buffers, self.buffers = self.buffers, {}
+            self.buffered = 0
+            batches = []
+            for key, rows in buffers.items():
+                columns = zip(*rows)
+                batches.append((key, pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+                    schema=self.schema)))
+
+            if batches or self.writers:
+                start = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write_batches, batches, close_files)
+                self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+
+    def _write_batches(self, batches: list, close_files: bool = False):
+        """Append batches to their partition files and roll full or old files (runs in an executor)"""
+        for key, batch in batches:
+            try:
+                entry = self.writers.get(key)
+                if entry is None:
+                    entry = self.writers[key] = self._open_file(key)
+                entry[0].write_batch(batch)
+                self.stats['rows_written'] += batch.num_rows
+                self.stats['batches_written'] += 1
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                self.stats['rows_dropped'] += batch.num_rows
+                self.logger.error(f"Failed to write {batch.num_rows} rows to partition {key}: {e}")
+
+        now = time.time()
+        for key, (writer, temp_path, final_path, opened_at) in list(self.writers.items()):
+            if (close_files or now - opened_at >= self.roll_interval
+                    or os.path.getsize(temp_path) >= self.max_file_bytes):
+                self._roll(key)
+
+    def _open_file(self, key: tuple) -> list:
+        """Open a new temporary file for a partition"""
+        date, phy = key
+        directory = os.path.join(self.output_dir, f"date={date}", f"phy_type={phy}")
+        os.makedirs(directory, exist_ok=True)
+
+        self.file_sequence += 1
+        name = f"part-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self.file_sequence:04d}.parquet"
+        temp_path = os.path.join(directory, f".{name}.tmp")
+        writer = pq.ParquetWriter(temp_path, self.schema, compression=self.compression)
+        return [writer, temp_path, os.path.join(directory, name), time.time()]
+
+    def _roll(self, key: tuple):
+        """Close a partition file and atomically move it into place"""
+        writer, temp_path, final_path, _ = self.writers.pop(key)
+        try:
+            writer.close()
+            os.replace(temp_path, final_path)
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            self.logger.error(f"Failed to finalize {final_path}: {e}")
+            return
+        self.stats['files_written'] += 1
+        self.stats['bytes_written'] += os.path.getsize(final_path)
+        self.logger.debug(f"Rolled Parquet file {final_path}")
+
+    async def export_device(self, device_info: Dict[str, Any]):
+        """Buffer device for the Parquet archive"""
+        if self.buffered >= self.max_buffer:
+            self.stats['rows_dropped'] += 1
+            return
+
+        key = self._partition(device_info)
+        rows = self.buffers.get(key)
+        if rows is None:
+            rows = self.buffers[key] = []
+        rows.append(self._row(device_info))
+        self.buffered += 1
+
+        self._ensure_flush_task()
+        if len(rows) >= self.batch_size:
+            self.flush_event.set()
+
+    async def export_event(self, event_data: Dict[str, Any]):
+        """Events are not archived to Parquet"""
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get archive writer statistics"""
+        stats = dict(self.stats)
+        stats['buffered'] = self.buffered
+        stats['open_files'] = len(self.writers)
+        return stats
+
+    async def close(self):
+        """Flush buffered rows and finalize open files"""
+        if self.flush_task:
+            # Wait out any in-flight flush before stopping the writer
+            async with self.flush_lock:
+                self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+            await self.flush(close_files=True)
+
+
 class MQTTExporter:
-    """Export device data to MQTT broker"""
-    
-    def __init__(self, broker_host: str, broker_port: int = 1883, 
-                 topic_prefix: str = "kismet", username: str = None, password: str = None):
+    """Export device data to MQTT broker
+
+    Device topics are only published when a tracked field changes by at least
+    its threshold (the first sighting of a device always publishes). Updates
+    that do not qualify, or that hit the per-topic rate limit, are folded into
+    a periodic digest message when digest_interval is set. Without a digest,
+    the latest rate-limited update of a device is published once its rate
+    window ends. Compact per-device state can also be kept as retained
+    messages.
+
+    Until the first connection succeeds, failed attempts back off (up to
+    max_backoff seconds) instead of being retried for every record. Device
+    updates arriving meanwhile are held, latest per device and at most
+    max_devices, and published once connected; events are dropped.
+    """
+
+    # Tracked field -> minimum change that triggers a publish (0 = any change)
+    DEFAULT_CHANGE_THRESHOLDS = {
+        'signal_dbm': 5,
+        'channel': 0,
+        'name': 0,
+        'latitude': 0.0001,
+        'longitude': 0.0001
+    }
+    STATE_FIELDS = ['mac_addr', 'name', 'phy_type', 'channel', 'signal_dbm',
+                    'latitude', 'longitude', 'last_seen']
+
+    def __init__(self, broker_host: str, broker_port: int = 1883,
+                 topic_prefix: str = "kismet", username: str = None, password: str = None,
+                 change_thresholds: Dict[str, float] = None, retain_state: bool = False,
+                 digest_interval: float = 0, topic_rate_limit: float = 1.0,
+                 qos: int = 1, max_devices: int = 100000, connect_timeout: float = 10.0,
+                 max_backoff: float = 60.0):
         if not MQTT_AVAILABLE:
             raise ImportError("paho-mqtt not available. Install with: pip install paho-mqtt")
-            
+
         self.broker_host = broker_host
         self.broker_port = broker_port
         self.topic_prefix = topic_prefix
         self.client = mqtt.Client()
-        
+
         if username and password:
             self.client.username_pw_set(username, password)
-            
+
         self.connected = False
-        
+        # Once the network loop runs, paho reconnects on its own
+        self.started = False
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.next_connect = 0.0
+
+        # Publishing engine
+        self.change_thresholds = (self.DEFAULT_CHANGE_THRESHOLDS if change_thresholds is None
+                                  else change_thresholds)
+        self.retain_state = retain_state
+        self.digest_interval = digest_interval
+        self.min_publish_interval = 1.0 / topic_rate_limit if topic_rate_limit > 0 else 0
+        self.qos = qos
+        self.max_devices = max_devices
+        # MAC -> (last publish time, tracked field values), in LRU order
+        self.published = OrderedDict()
+        # MAC -> latest compact state waiting for the next digest
+        self.digest = {}
+        self.digest_task = None
+        # MAC -> latest rate-limited update, published when its window ends
+        self.deferred = {}
+        self.deferred_task = None
+        self.stats = {
+            'published': 0,
+            'suppressed': 0,
+            'rate_limited': 0,
+            'deferred_published': 0,
+            'digests_published': 0,
+            'digest_records': 0,
+            'connect_failures': 0,
+            'held_dropped': 0,
+            'events_dropped': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.MQTTExporter")
+
     async def connect(self):
         """Connect to MQTT broker"""
+        loop = asyncio.get_running_loop()
+        connected = loop.create_future()
+
+        def resolve(rc):
+            if not connected.done():
+                connected.set_result(rc)
+
         def on_connect(client, userdata, flags, rc):
-            if rc == 0:
-                self.connected = True
-                print(f"Connected to MQTT broker at {self.broker_host}:{self.broker_port}")
-            else:
-                print(f"Failed to connect to MQTT broker: {rc}")
-                
+            # Called from the paho network thread
+            self.connected = rc == 0
+            loop.call_soon_threadsafe(resolve, rc)
+
+        def on_disconnect(client, userdata, rc):
+            self.connected = False
+
         self.client.on_connect = on_connect
-        self.client.connect(self.broker_host, self.broker_port, 60)
+        self.client.on_disconnect = on_disconnect
+        self.client.connect_async(self.broker_host, self.broker_port, 60)
         self.client.loop_start()
-        
-        # Wait for connection
-        while not self.connected:
-            await asyncio.sleep(0.1)
-            
+
+        try:
+            rc = await asyncio.wait_for(connected, self.connect_timeout)
+        except asyncio.TimeoutError:
+            self.client.loop_stop()
+            raise ConnectionError(f"Timed out connecting to MQTT broker at {self.broker_host}:{self.broker_port}")
+
+        if rc != 0:
+            self.client.loop_stop()
+            raise ConnectionError(f"Failed to connect to MQTT broker: {rc}")
+
+        self.started = True
+        self.logger.info(f"Connected to MQTT broker at {self.broker_host}:{self.broker_port}")
+
+        if self.digest_interval > 0 and self.digest_task is None:
+            self.digest_task = asyncio.create_task(self._digest_loop())
+
+    async def _ensure_started(self) -> bool:
+        """Connect on first use, backing off between failed attempts"""
+        if self.started:
+            return True
+        if time.monotonic() < self.next_connect:
+            return False
+
+        try:
+            await self.connect()
+        except Exception as e:
+            self.stats['connect_failures'] += 1
+            self.backoff = min(max(self.backoff * 2, 0.5), self.max_backoff)
+            delay = self.backoff * random.uniform(0.5, 1.0)
+            self.next_connect = time.monotonic() + delay
+            self.logger.warning(f"{e}; retrying in {delay:.1f}s")
+            return False
+
+        self.backoff = 0.0
+        # Updates held while the broker was unreachable
+        self.publish_deferred(force=True)
+        return True
+
+    def _hold(self, mac_addr: str, device_info: Dict[str, Any]):
+        """Keep the latest update of a device until the broker is reachable"""
+        self.deferred.pop(mac_addr, None)
+        self.deferred[mac_addr] = device_info
+        if len(self.deferred) > self.max_devices:
+            del self.deferred[next(iter(self.deferred))]
+            self.stats['held_dropped'] += 1
+
+    def _mac_topic(self, mac_addr: str) -> str:
+        """Topic-safe form of a MAC address"""
+        return mac_addr.replace(':', '_')
+
+    def _significant_change(self, previous: Dict[str, Any], device_info: Dict[str, Any]) -> bool:
+        """Check whether any tracked field moved by at least its threshold"""
+        for field, threshold in self.change_thresholds.items():
+            old = previous.get(field)
+            new = device_info.get(field)
+            if old == new:
+                continue
+            if (threshold and isinstance(old, (int, float)) and isinstance(new, (int, float))
+                    and abs(new - old) < threshold):
+                continue
+            return True
+        return False
+
+    def _compact_state(self, device_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Small per-device payload used for state topics and digests"""
+        return {field: device_info[field] for field in self.STATE_FIELDS
+                if device_info.get(field) not in (None, '')}
+
+    def _remember(self, mac_addr: str, published_at: float, device_info: Dict[str, Any]):
+        """Record what was last published for a device, bounded by max_devices"""
+        tracked = {field: device_info.get(field) for field in self.change_thresholds}
+        self.published[mac_addr] = (published_at, tracked)
+        self.published.move_to_end(mac_addr)
+        if len(self.published) > self.max_devices:
+            self.published.popitem(last=False)
+
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device to MQTT"""
-        if not self.connected:
-            await self.connect()
-            
-        topic = f"{self.topic_prefix}/devices/{device_info['mac_addr'].replace(':', '_')}"
-        payload = json.dumps(device_info)
-        
-        self.client.publish(topic, payload, qos=1)
-        
+        mac_addr = device_info.get('mac_addr', '')
+        if not await self._ensure_started():
+            self._hold(mac_addr, device_info)
+            return
+
+        now = time.time()
+        previous = self.published.get(mac_addr)
+
+        if previous is not None:
+            last_published, tracked = previous
+            if not self._significant_change(tracked, device_info):
+                self.stats['suppressed'] += 1
+                if mac_addr in self.deferred:
+                    # Newer state for an update still waiting on its window
+                    self.deferred[mac_addr] = device_info
+                self._add_to_digest(mac_addr, device_info)
+                return
+            if now - last_published < self.min_publish_interval:
+                self.stats['rate_limited'] += 1
+                if self.digest_interval > 0:
+                    self._add_to_digest(mac_addr, device_info)
+                else:
+                    self._defer(mac_addr, device_info)
+                return
+
+        self._publish(mac_addr, device_info, now)
+
+    def _publish(self, mac_addr: str, device_info: Dict[str, Any], now: float):
+        """Publish a device update (and its retained state)"""
+        mac_topic = self._mac_topic(mac_addr)
+        self.client.publish(f"{self.topic_prefix}/devices/{mac_topic}",
+                            record_json(device_info), qos=self.qos)
+        if self.retain_state:
+            self.client.publish(f"{self.topic_prefix}/state/{mac_topic}",
+                                codec.dumps_bytes(self._compact_state(device_info)),
+                                qos=self.qos, retain=True)
+
+        self.stats['published'] += 1
+        self.digest.pop(mac_addr, None)
+        self.deferred.pop(mac_addr, None)
+        self._remember(mac_addr, now, device_info)
+
+    def _defer(self, mac_addr: str, device_info: Dict[str, Any]):
+        """Hold a rate-limited update until the device's rate window ends"""
+        self.deferred[mac_addr] = device_info
+        if self.deferred_task is None or self.deferred_task.done():
+            self.deferred_task = asyncio.create_task(self._deferred_loop())
+
+    async def _deferred_loop(self):
+        """Publish held updates as their rate windows end"""
+        while self.deferred:
+            await asyncio.sleep(self.min_publish_interval / 2)
+            self.publish_deferred()
+
+    def publish_deferred(self, force: bool = False):
+        """Publish held updates whose rate window has ended (all of them with force)"""
+        if not self.started:
+            return
+        now = time.time()
+        for mac_addr, device_info in list(self.deferred.items()):
+            previous = self.published.get(mac_addr)
+            if force or previous is None or now - previous[0] >= self.min_publish_interval:
+                self._publish(mac_addr, device_info, now)
+                self.stats['deferred_published'] += 1
+
+    def _add_to_digest(self, mac_addr: str, device_info: Dict[str, Any]):
+        """Keep the latest low-priority update for the next digest"""
+        if self.digest_interval > 0:
+            self.digest[mac_addr] = self._compact_state(device_info)
+
+    async def _digest_loop(self):
+        """Publish batched low-priority updates every digest_interval"""
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            self.publish_digest()
+
+    def publish_digest(self):
+        """Publish pending low-priority updates as one digest message"""
+        if not self.digest or not self.connected:
+            return
+
+        devices, self.digest = list(self.digest.values()), {}
+        payload = {'timestamp': time.time(), 'count': len(devices), 'devices': devices}
+        self.client.publish(f"{self.topic_prefix}/digest",
+                            codec.dumps_bytes(payload), qos=self.qos)
+        self.stats['digests_published'] += 1
+        self.stats['digest_records'] += len(devices)
+
     async def export_event(self, event_data: Dict[str, Any]):
         """Export event to MQTT"""
-        if not self.connected:
-            await self.connect()
-            
+        if not await self._ensure_started():
+            self.stats['events_dropped'] += 1
+            return
+
         topic = f"{self.topic_prefix}/events"
-        payload = json.dumps(event_data)
-        
-        self.client.publish(topic, payload, qos=1)
-        
+        payload = codec.dumps_bytes(event_data)
+
+        self.client.publish(topic, payload, qos=self.qos)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get publishing statistics"""
+        stats = dict(self.stats)
+        stats['devices_tracked'] = len(self.published)
+        stats['digest_pending'] = len(self.digest)
+        stats['deferred_pending'] = len(self.deferred)
+        return stats
+
     async def close(self):
         """Close MQTT connection"""
-        if self.connected:
-            self.client.loop_stop()
+        if self.digest_task:
+            self.digest_task.cancel()
+            try:
+                await self.digest_task
+            except asyncio.CancelledError:
+                pass
+            self.digest_task = None
+            self.publish_digest()
+
+        if self.deferred_task:
+            self.deferred_task.cancel()
+            try:
+                await self.deferred_task
+            except asyncio.CancelledError:
+                pass
+            self.deferred_task = None
+        if self.started:
+            self.publish_deferred(force=True)
             self.client.disconnect()
+            self.client.loop_stop()
+            self.started = False
+
+
+def encode_device_envelope(device_info: Dict[str, Any], sequence: int) -> bytes:
+    """JSON device message for the TCP/UDP exporters
+
+    The record's cached JSON is spliced in as-is, so records encoded by the
+    decode pool are not serialized again on the event loop.
+    """
+    return b'{"type":"device","data":%b,"sequence":%d,"timestamp":%r}' % (
+        record_json(device_info), sequence, time.time())
 
 
 class TCPExporter:
-    """Export device data to TCP server (configurable IP:port)"""
-    
-    def __init__(self, server_host: str, server_port: int, format_type: str = "json"):
+    """Export device data to TCP server (configurable IP:port)
+
+    Records are coalesced into larger writes flushed by size or interval.
+    Every written record stays in a bounded replay ring until the connection
+    has stayed up for replay_window seconds after it was written; when a
+    write fails, the ring is replayed ahead of pending records once the
+    connection is re-established (at-least-once delivery, so receivers should
+    dedupe on the JSON sequence number). Reconnects use exponential backoff
+    with jitter instead of retrying on every record.
+    """
+
+    def __init__(self, server_host: str, server_port: int, format_type: str = "json",
+                 flush_size: int = 65536, flush_interval: float = 0.1,
+                 replay_size: int = 10000, replay_window: float = 5.0,
+                 max_pending: int = 100000, max_backoff: float = 30.0):
         self.server_host = server_host
         self.server_port = server_port
         self.format_type = format_type
@@ -458,10 +2317,38 @@ class TCPExporter:
         self.connected = False
         self.device_count = 0
         self.event_count = 0
-        
+
+        # Write coalescing
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = deque()
+        self.pending_bytes = 0
+        self.max_pending = max_pending
+        self.flush_task = None
+        self.flush_event = None
+        self.flush_lock = None
+
+        # Replay ring of (written_at, line) for unconfirmed records
+        self.replay = deque(maxlen=replay_size)
+        self.replay_window = replay_window
+
+        # Reconnect backoff
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.next_connect = 0.0
+
+        self.stats = {
+            'records_sent': 0,
+            'bytes_sent': 0,
+            'writes': 0,
+            'reconnects': 0,
+            'records_replayed': 0,
+            'records_dropped': 0
+        }
+
         # Setup logging
         self.logger = logging.getLogger(f"{__name__}.TCPExporter")
-        
+
     async def connect(self):
         """Connect to TCP server"""
         try:
@@ -469,65 +2356,176 @@ class TCPExporter:
                 self.server_host, self.server_port
             )
             self.connected = True
+            self.backoff = 0.0
             self.logger.info(f"Connected to TCP server at {self.server_host}:{self.server_port}")
         except Exception as e:
             self.logger.error(f"Failed to connect to TCP server: {e}")
             self.connected = False
-            
-    async def send_data(self, data: str):
-        """Send data to TCP server"""
+
+    def _schedule_reconnect(self):
+        """Back off exponentially (with jitter) before the next connect attempt"""
+        self.backoff = min(max(self.backoff * 2, 0.5), self.max_backoff)
+        delay = self.backoff * random.uniform(0.5, 1.0)
+        self.next_connect = time.monotonic() + delay
+        self.logger.warning(f"TCP server unavailable, retrying in {delay:.1f}s "
+                            f"({len(self.pending)} pending, {len(self.replay)} to replay)")
+
+    async def _drop_connection(self):
+        """Close a broken connection"""
+        self.connected = False
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+
+    async def send_data(self, data: Union[str, bytes]):
+        """Queue data for the next coalesced write"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        # Add newline delimiter for easier parsing on server side
+        line = data + b"\n"
+        if len(self.pending) >= self.max_pending:
+            self.pending_bytes -= len(self.pending.popleft())
+            self.stats['records_dropped'] += 1
+
+        self.pending.append(line)
+        self.pending_bytes += len(line)
+        self._ensure_flush_task()
+        if self.pending_bytes >= self.flush_size:
+            self.flush_event.set()
+
+    def _ensure_flush_task(self):
+        """Start the background writer on first use"""
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_event = asyncio.Event()
+            self.flush_lock = asyncio.Lock()
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Flush when enough data is pending or flush_interval elapses"""
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_event.clear()
+            async with self.flush_lock:
+                await self.flush()
+
+    async def flush(self):
+        """Write pending records (and any replay) in a single write"""
+        if not self.pending and not (self.replay and not self.connected):
+            return
+
         if not self.connected:
+            if time.monotonic() < self.next_connect:
+                return
+            reconnecting = self.backoff > 0
             await self.connect()
-            
-        if self.connected and self.writer:
-            try:
-                # Add newline delimiter for easier parsing on server side
-                message = data + "\n"
-                self.writer.write(message.encode('utf-8'))
-                await self.writer.drain()
-            except Exception as e:
-                self.logger.error(f"Failed to send data to TCP server: {e}")
-                self.connected = False
-                
+            if not self.connected:
+                self._schedule_reconnect()
+                return
+            if reconnecting:
+                self.stats['reconnects'] += 1
+
+            # Resend everything that was not confirmed before the failure
+            replayed = [line for _, line in self.replay]
+            self.replay.clear()
+            if replayed:
+                self.stats['records_replayed'] += len(replayed)
+                self.logger.info(f"Replaying {len(replayed)} records to TCP server")
+            self.pending.extendleft(reversed(replayed))
+            self.pending_bytes += sum(len(line) for line in replayed)
+
+        batch = list(self.pending)
+        self.pending.clear()
+        self.pending_bytes = 0
+        now = time.monotonic()
+
+        try:
+            self.writer.write(b''.join(batch))
+            await self.writer.drain()
+        except Exception as e:
+            self.logger.error(f"Failed to send data to TCP server: {e}")
+            self._keep_for_replay(now, batch, failed=True)
+            await self._drop_connection()
+            self._schedule_reconnect()
+            return
+
+        self._keep_for_replay(now, batch)
+        while self.replay and self.replay[0][0] < now - self.replay_window:
+            self.replay.popleft()
+
+        self.stats['records_sent'] += len(batch)
+        self.stats['bytes_sent'] += sum(len(line) for line in batch)
+        self.stats['writes'] += 1
+
+    def _keep_for_replay(self, written_at: float, batch: list, failed: bool = False):
+        """Add written records to the replay ring"""
+        overflow = len(self.replay) + len(batch) - self.replay.maxlen
+        if failed and overflow > 0:
+            # Records pushed out of a full ring after a failure are lost
+            self.stats['records_dropped'] += overflow
+        self.replay.extend((written_at, line) for line in batch)
+
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device to TCP server"""
         self.device_count += 1
-        
+
         if self.format_type == "json":
             # Send as JSON
-            data = json.dumps({
-                "type": "device",
-                "data": device_info,
-                "sequence": self.device_count,
-                "timestamp": time.time()
-            })
+            data = encode_device_envelope(device_info, self.device_count)
         elif self.format_type == "csv":
             # Send as CSV format
             data = f"DEVICE,{device_info['mac_addr']},{device_info['phy_type']},{device_info['signal_dbm']},{device_info['total_packets']},{device_info['timestamp']}"
         else:
             # Send as simple key-value format
             data = f"DEVICE|{device_info['mac_addr']}|{device_info['phy_type']}|{device_info['signal_dbm']}|{device_info['total_packets']}"
-            
+
         await self.send_data(data)
-        
+
     async def export_event(self, event_data: Dict[str, Any]):
         """Export event to TCP server"""
         self.event_count += 1
-        
+
         if self.format_type == "json":
-            data = json.dumps({
+            data = codec.dumps_bytes({
                 "type": "event",
                 "data": event_data,
                 "sequence": self.event_count,
                 "timestamp": time.time()
             })
         else:
-            data = f"EVENT|{json.dumps(event_data)}"
-            
+            data = f"EVENT|{codec.dumps(event_data)}"
+
         await self.send_data(data)
-        
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        stats = dict(self.stats)
+        stats['pending'] = len(self.pending)
+        stats['replay_ring'] = len(self.replay)
+        return stats
+
     async def close(self):
         """Close TCP connection"""
+        if self.flush_task:
+            # Wait out any in-flight write before stopping the writer
+            async with self.flush_lock:
+                self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+
+            # One last attempt at delivering what is still pending
+            self.next_connect = 0.0
+            await self.flush()
+
         if self.writer:
             self.writer.close()
             await self.writer.wait_closed()
@@ -536,51 +2534,177 @@ class TCPExporter:
 
 
 class UDPExporter:
-    """Export device data to UDP server (configurable IP:port)"""
-    
-    def __init__(self, server_host: str, server_port: int, format_type: str = "json"):
+    """Export device data to UDP server (configurable IP:port)
+
+    Records are packed into datagrams of at most max_datagram_size bytes and
+    sent through a non-blocking asyncio datagram transport, either when the
+    next record would not fit or every flush_interval seconds. Each datagram
+    starts with a 10 byte header (magic, version, flags, record count,
+    datagram sequence) followed by newline-separated records, optionally
+    zlib-compressed. Receivers unpack datagrams with decode_datagram().
+
+    While the socket cannot be set up (e.g. the host does not resolve),
+    records are held up to max_pending, dropping the oldest beyond that, and
+    setup is retried with exponential backoff.
+    """
+
+    HEADER = struct.Struct('!2sBBHI')
+    MAGIC = b'KU'
+    VERSION = 1
+    FLAG_COMPRESSED = 0x01
+
+    def __init__(self, server_host: str, server_port: int, format_type: str = "json",
+                 max_datagram_size: int = 1400, flush_interval: float = 0.05,
+                 compress: bool = False, max_pending: int = 10000, max_backoff: float = 30.0):
         self.server_host = server_host
         self.server_port = server_port
         self.format_type = format_type
-        self.sock = None
+        self.transport = None
         self.device_count = 0
         self.event_count = 0
-        
+
+        # Datagram packing
+        self.max_payload = max_datagram_size - self.HEADER.size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.pending = deque()
+        self.pending_bytes = 0
+        self.max_pending = max_pending
+        self.datagram_sequence = 0
+        self.flush_task = None
+
+        # Socket setup backoff
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.next_connect = 0.0
+
+        self.stats = {
+            'datagrams_sent': 0,
+            'records_sent': 0,
+            'bytes_sent': 0,
+            'oversized_records': 0,
+            'records_dropped': 0,
+            'connect_failures': 0
+        }
+
         # Setup logging
         self.logger = logging.getLogger(f"{__name__}.UDPExporter")
-        
+
     async def connect(self):
-        """Setup UDP socket"""
+        """Setup UDP datagram transport"""
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol,
+                remote_addr=(self.server_host, self.server_port)
+            )
+            self.backoff = 0.0
             self.logger.info(f"UDP socket configured for {self.server_host}:{self.server_port}")
         except Exception as e:
-            self.logger.error(f"Failed to create UDP socket: {e}")
-            
-    async def send_data(self, data: str):
-        """Send data via UDP"""
-        if not self.sock:
+            self.stats['connect_failures'] += 1
+            self.backoff = min(max(self.backoff * 2, 0.5), self.max_backoff)
+            delay = self.backoff * random.uniform(0.5, 1.0)
+            self.next_connect = time.monotonic() + delay
+            self.logger.warning(f"Failed to create UDP socket: {e}, retrying in {delay:.1f}s "
+                                f"({len(self.pending)} pending)")
+
+    async def _ensure_transport(self):
+        """Set up the socket unless still backing off from a failure"""
+        if not self.transport and time.monotonic() >= self.next_connect:
             await self.connect()
-            
-        if self.sock:
-            try:
-                message = data.encode('utf-8')
-                self.sock.sendto(message, (self.server_host, self.server_port))
-            except Exception as e:
-                self.logger.error(f"Failed to send UDP data: {e}")
-                
+
+    async def send_data(self, data: Union[str, bytes]):
+        """Pack data into the current datagram, sending it once full"""
+        await self._ensure_transport()
+
+        record = data.encode('utf-8') if isinstance(data, str) else data
+        # +1 for the newline separator
+        if self.pending and self.pending_bytes + len(record) + 1 > self.max_payload:
+            self._send_pending()
+
+        if len(record) > self.max_payload:
+            self.stats['oversized_records'] += 1
+        if len(self.pending) >= self.max_pending:
+            self.pending_bytes -= len(self.pending.popleft()) + 1
+            self.stats['records_dropped'] += 1
+
+        self.pending.append(record)
+        self.pending_bytes += len(record) + 1
+
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Send partially filled datagrams every flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._ensure_transport()
+            self._send_pending()
+
+    def _send_pending(self):
+        """Frame and send the pending records, max_payload bytes per datagram"""
+        if not self.transport:
+            return
+
+        while self.pending:
+            records = []
+            size = 0
+            while self.pending and (not records or size + len(self.pending[0]) + 1 <= self.max_payload):
+                record = self.pending.popleft()
+                records.append(record)
+                size += len(record) + 1
+            self.pending_bytes -= size
+            self._send_datagram(records)
+
+    def _send_datagram(self, records: list):
+        """Frame and send records as one datagram"""
+        payload = b'\n'.join(records)
+        flags = 0
+        if self.compress:
+            compressed = zlib.compress(payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= self.FLAG_COMPRESSED
+
+        self.datagram_sequence = (self.datagram_sequence + 1) & 0xFFFFFFFF
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, flags, len(records), self.datagram_sequence)
+
+        try:
+            self.transport.sendto(header + payload)
+        except Exception as e:
+            self.logger.error(f"Failed to send UDP data: {e}")
+            return
+
+        self.stats['datagrams_sent'] += 1
+        self.stats['records_sent'] += len(records)
+        self.stats['bytes_sent'] += self.HEADER.size + len(payload)
+
+    @classmethod
+    def decode_datagram(cls, datagram: bytes) -> tuple:
+        """Unpack a datagram into (sequence, [record strings])"""
+        if len(datagram) < cls.HEADER.size:
+            raise ValueError("Datagram shorter than header")
+
+        magic, version, flags, count, sequence = cls.HEADER.unpack_from(datagram)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"Unknown datagram format: {magic!r} v{version}")
+
+        payload = datagram[cls.HEADER.size:]
+        if flags & cls.FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        records = payload.decode('utf-8').split('\n') if count else []
+        if len(records) != count:
+            raise ValueError(f"Datagram declares {count} records but contains {len(records)}")
+        return sequence, records
+
     async def export_device(self, device_info: Dict[str, Any]):
         """Export device via UDP"""
         self.device_count += 1
         
         if self.format_type == "json":
             # Send as JSON
-            data = json.dumps({
-                "type": "device",
-                "data": device_info,
-                "sequence": self.device_count,
-                "timestamp": time.time()
-            })
+            data = encode_device_envelope(device_info, self.device_count)
         elif self.format_type == "csv":
             # Send as CSV format
             data = f"DEVICE,{device_info['mac_addr']},{device_info['phy_type']},{device_info['signal_dbm']},{device_info['total_packets']},{device_info['timestamp']}"
@@ -595,40 +2719,99 @@ class UDPExporter:
         self.event_count += 1
         
         if self.format_type == "json":
-            data = json.dumps({
+            data = codec.dumps_bytes({
                 "type": "event",
                 "data": event_data,
                 "sequence": self.event_count,
                 "timestamp": time.time()
             })
         else:
-            data = f"EVENT|{json.dumps(event_data)}"
+            data = f"EVENT|{codec.dumps(event_data)}"
             
         await self.send_data(data)
         
+    def get_stats(self) -> Dict[str, Any]:
+        """Get datagram statistics"""
+        stats = dict(self.stats)
+        stats['records_per_datagram'] = (stats['records_sent'] / stats['datagrams_sent']
+                                         if stats['datagrams_sent'] else 0.0)
+        stats['pending'] = len(self.pending)
+        return stats
+
     async def close(self):
         """Close UDP socket"""
-        if self.sock:
-            self.sock.close()
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+
+        if self.transport:
+            self._send_pending()
+            self.transport.close()
         self.logger.info(f"UDP socket closed. Sent {self.device_count} devices, {self.event_count} events")
 
 
+def parse_kismet_server(spec: str, default_port: int = 2501) -> Tuple[str, str, int]:
+    """Parse a [name=]host[:port] server spec into (sensor name, host, port)"""
+    name, _, address = spec.rpartition('=')
+    host, _, port = address.partition(':')
+    if not host:
+        raise argparse.ArgumentTypeError(f"Invalid Kismet server: {spec}")
+    port = int(port) if port else default_port
+    return name or f"{host}:{port}", host, port
+
+
 async def main():
     parser = argparse.ArgumentParser(description="Kismet Real-Time Data Export Client")
     parser.add_argument("--kismet-host", default="localhost", help="Kismet server hostname")
     parser.add_argument("--kismet-port", type=int, default=2501, help="Kismet server port")
+    parser.add_argument("--kismet-server", nargs='+', metavar="[NAME=]HOST[:PORT]",
+                       help="Aggregate several Kismet sensors (overrides --kismet-host/--kismet-port)")
+    parser.add_argument("--sensor-dedupe-window", type=float, default=2.0,
+                       help="Seconds a sensor owns a MAC before others may export it (0 disables)")
     parser.add_argument("--update-rate", type=int, default=5, help="Update rate in seconds")
-    parser.add_argument("--export-type", choices=["console", "postgres", "influxdb", "mqtt", "tcp", "udp"], 
-                       default="console", help="Export destination type")
+    parser.add_argument("--export-type", choices=["console", "postgres", "influxdb", "mqtt", "tcp", "udp", "parquet"], 
+                       nargs='+', default=["console"],
+                       help="Export destination type(s); each gets its own queue and worker")
     
     # PostgreSQL options
     parser.add_argument("--postgres-conn", help="PostgreSQL connection string")
+    parser.add_argument("--postgres-batch", action="store_true",
+                       help="Buffer device updates and merge them via COPY in batches")
+    parser.add_argument("--postgres-batch-size", type=int, default=500,
+                       help="Devices per PostgreSQL batch flush")
+    parser.add_argument("--postgres-flush-interval", type=float, default=1.0,
+                       help="Maximum seconds between PostgreSQL batch flushes")
+    parser.add_argument("--postgres-event-batch-size", type=int, default=500,
+                       help="Events buffered before a COPY into kismet_events")
+    parser.add_argument("--postgres-history", action="store_true",
+                       help="Also append every update to the kismet_device_history table")
+    parser.add_argument("--postgres-history-retention-days", type=float, default=30,
+                       help="Days of history kept; older partitions are dropped (0 keeps everything)")
+    parser.add_argument("--postgres-pool-size", type=int, default=4,
+                       help="Maximum PostgreSQL connection pool size")
     
     # InfluxDB options
     parser.add_argument("--influx-url", help="InfluxDB URL")
     parser.add_argument("--influx-token", help="InfluxDB token")
     parser.add_argument("--influx-org", help="InfluxDB organization")
     parser.add_argument("--influx-bucket", help="InfluxDB bucket")
+    parser.add_argument("--influx-batch-size", type=int, default=5000,
+                       help="Points per InfluxDB write request")
+    parser.add_argument("--influx-flush-interval", type=float, default=1.0,
+                       help="Maximum seconds between InfluxDB batch writes")
+    parser.add_argument("--influx-schema", choices=InfluxDBExporter.SCHEMA_MODES, default="default",
+                       help="InfluxDB series schema (bounded caps series cardinality)")
+    parser.add_argument("--influx-tags", nargs='+',
+                       help="Device attributes written as InfluxDB tags (others become fields)")
+    parser.add_argument("--influx-mac-shards", type=int,
+                       help="Hash MACs into this many mac_shard tag values "
+                            "(default 16 in bounded mode, 0 disables)")
+    parser.add_argument("--influx-max-series", type=int, default=10000,
+                       help="Distinct tag sets tracked in bounded schema mode")
     
     # MQTT options
     parser.add_argument("--mqtt-host", help="MQTT broker hostname")
@@ -636,49 +2819,201 @@ async def main():
     parser.add_argument("--mqtt-topic-prefix", default="kismet", help="MQTT topic prefix")
     parser.add_argument("--mqtt-username", help="MQTT username")
     parser.add_argument("--mqtt-password", help="MQTT password")
+    parser.add_argument("--mqtt-signal-delta", type=float, default=5,
+                       help="Minimum signal change (dBm) that republishes a device")
+    parser.add_argument("--mqtt-retain-state", action="store_true",
+                       help="Publish compact retained state topics per device")
+    parser.add_argument("--mqtt-digest-interval", type=float, default=0,
+                       help="Seconds between digest messages for low-priority updates (0 disables)")
+    parser.add_argument("--mqtt-rate-limit", type=float, default=1.0,
+                       help="Maximum messages per second per device topic")
     
     # TCP/UDP options
     parser.add_argument("--server-host", default="172.18.18.20", help="TCP/UDP server hostname or IP address")
     parser.add_argument("--server-port", type=int, default=8685, help="TCP/UDP server port")
     parser.add_argument("--data-format", choices=["json", "csv", "simple"], default="json", 
                        help="Data format for TCP/UDP export (json, csv, or simple)")
+    parser.add_argument("--tcp-flush-size", type=int, default=65536,
+                       help="Bytes of pending TCP data that trigger a write")
+    parser.add_argument("--tcp-flush-interval", type=float, default=0.1,
+                       help="Maximum seconds between coalesced TCP writes")
+    parser.add_argument("--tcp-replay-size", type=int, default=10000,
+                       help="Records kept for replay after a TCP reconnect")
+    parser.add_argument("--udp-max-datagram", type=int, default=1400,
+                       help="Maximum UDP datagram size in bytes (records are packed up to this)")
+    parser.add_argument("--udp-flush-interval", type=float, default=0.05,
+                       help="Maximum seconds a partially filled UDP datagram is held")
+    parser.add_argument("--udp-compress", action="store_true",
+                       help="zlib-compress UDP datagram payloads")
+    
+    # Parquet archive options
+    parser.add_argument("--parquet-dir", default="kismet_archive",
+                       help="Parquet archive directory (partitioned by date and phy_type)")
+    parser.add_argument("--parquet-compression", choices=ParquetExporter.COMPRESSIONS, default="zstd",
+                       help="Parquet compression codec")
+    parser.add_argument("--parquet-batch-size", type=int, default=10000,
+                       help="Rows per partition buffered before a row group is written")
+    parser.add_argument("--parquet-flush-interval", type=float, default=10.0,
+                       help="Seconds between Parquet writes when partitions are not full")
+    parser.add_argument("--parquet-max-file-mb", type=float, default=128,
+                       help="Roll a Parquet file once it reaches this size in MB")
+    parser.add_argument("--parquet-roll-interval", type=float, default=3600.0,
+                       help="Roll a Parquet file after this many seconds")
+
+    # Ingest queue options
+    parser.add_argument("--queue-size", type=int, default=10000,
+                       help="Maximum records buffered between Kismet and each exporter")
+    parser.add_argument("--overflow-policy", choices=IngestQueue.POLICIES, default="block",
+                       help="What to do when an exporter's ingest queue is full")
+    
+    # JSON codec options
+    parser.add_argument("--json-backend", choices=JSONCodec.BACKENDS, default="auto",
+                       help="JSON library for decoding and encoding (auto picks orjson/msgspec if installed)")
+    
+    # Subscription options
+    parser.add_argument("--monitor-profile", choices=MonitorSubscription.PROFILES, default="compact",
+                       help="Fields requested from Kismet (compact/minimal use server-side field simplification)")
+    parser.add_argument("--phy", nargs='+',
+                       help="Only subscribe to these phy types (e.g. IEEE802.11 Bluetooth)")
+    parser.add_argument("--device", nargs='+',
+                       help="Only subscribe to these device keys or MAC addresses")
+    parser.add_argument("--catchup-page-size", type=int, default=500,
+                       help="Devices per page when catching up after a reconnect (0 disables catch-up)")
+    parser.add_argument("--reconnect-max-backoff", type=float, default=60.0,
+                       help="Maximum seconds between Kismet reconnect attempts")
+    
+    # Decode pool options
+    parser.add_argument("--decode-workers", type=int, default=0,
+                       help="Worker processes for JSON decoding and normalization (0 decodes on the event loop)")
+    parser.add_argument("--decode-batch-size", type=int, default=256,
+                       help="Frames per batch sent to a decode worker")
+    
+    # Delta cache options
+    parser.add_argument("--delta-mode", choices=DeviceStateCache.MODES, default="off",
+                       help="Suppress unchanged devices (changed) or send only changed fields "
+                            "to sinks that merge them, i.e. PostgreSQL without history (delta)")
+    parser.add_argument("--delta-cache-size", type=int, default=100000,
+                       help="Maximum devices held in the delta cache")
+    parser.add_argument("--delta-ttl", type=float, default=300.0,
+                       help="Seconds before an unchanged device is exported again")
+    parser.add_argument("--delta-ignore-fields", nargs="+", metavar="FIELD",
+                       default=DeviceStateCache.DEFAULT_IGNORE_FIELDS,
+                       help="Fields whose changes alone do not trigger an export "
+                            "(default: timestamps and packet counters)")
+
+    # Ingest governor options
+    parser.add_argument("--mac-rate", type=float, default=0,
+                       help="Per-device update budget in records/second (0 disables)")
+    parser.add_argument("--mac-burst", type=float, default=5,
+                       help="Per-device burst allowance for --mac-rate")
+    parser.add_argument("--global-rate", type=float, default=0,
+                       help="Total records/second passed to the sinks (0 disables)")
+    parser.add_argument("--adaptive-sampling", action="store_true",
+                       help="Sample devices with a stable signal less often")
+    parser.add_argument("--sampling-signal-delta", type=float, default=5,
+                       help="Signal change in dB that bypasses sampling and rate limits")
+    parser.add_argument("--sampling-max-interval", type=float, default=60.0,
+                       help="Longest interval between exports of a stable device")
     
     args = parser.parse_args()
+    codec.set_backend(args.json_backend)
+    
+    subscription = MonitorSubscription(profile=args.monitor_profile, phys=args.phy,
+                                       devices=args.device, rate=args.update_rate)
+    servers = None
+    if args.kismet_server:
+        try:
+            servers = [parse_kismet_server(spec, args.kismet_port) for spec in args.kismet_server]
+        except (argparse.ArgumentTypeError, ValueError) as e:
+            parser.error(str(e))
     
     # Create export client
     client = KismetExportClient(
         kismet_host=args.kismet_host,
         kismet_port=args.kismet_port,
         update_rate=args.update_rate,
-        export_type=args.export_type
+        export_type=args.export_type,
+        queue_size=args.queue_size,
+        overflow_policy=args.overflow_policy,
+        delta_mode=args.delta_mode,
+        delta_cache_size=args.delta_cache_size,
+        delta_ttl=args.delta_ttl,
+        delta_ignore_fields=args.delta_ignore_fields,
+        subscription=subscription,
+        catchup_page_size=args.catchup_page_size,
+        reconnect_max_backoff=args.reconnect_max_backoff,
+        servers=servers,
+        sensor_dedupe_window=args.sensor_dedupe_window,
+        decode_workers=args.decode_workers,
+        decode_batch_size=args.decode_batch_size,
+        governor=IngestGovernor(mac_rate=args.mac_rate, mac_burst=args.mac_burst,
+                                global_rate=args.global_rate, adaptive=args.adaptive_sampling,
+                                signal_delta=args.sampling_signal_delta,
+                                max_interval=args.sampling_max_interval,
+                                max_entries=args.delta_cache_size)
     )
     
-    # Setup exporter based on type
-    if args.export_type == "console":
-        client.exporter = ConsoleExporter()
-    elif args.export_type == "postgres":
-        if not args.postgres_conn:
-            print("Error: --postgres-conn required for PostgreSQL export")
-            sys.exit(1)
-        client.exporter = PostgreSQLExporter(args.postgres_conn)
-    elif args.export_type == "influxdb":
-        if not all([args.influx_url, args.influx_token, args.influx_org, args.influx_bucket]):
-            print("Error: InfluxDB options required for InfluxDB export")
-            sys.exit(1)
-        client.exporter = InfluxDBExporter(args.influx_url, args.influx_token, 
-                                          args.influx_org, args.influx_bucket)
-    elif args.export_type == "mqtt":
-        if not args.mqtt_host:
-            print("Error: --mqtt-host required for MQTT export")
-            sys.exit(1)
-        client.exporter = MQTTExporter(args.mqtt_host, args.mqtt_port, 
-                                      args.mqtt_topic_prefix, args.mqtt_username, args.mqtt_password)
-    elif args.export_type == "tcp":
-        print(f"Configuring TCP export to {args.server_host}:{args.server_port} (format: {args.data_format})")
-        client.exporter = TCPExporter(args.server_host, args.server_port, args.data_format)
-    elif args.export_type == "udp":
-        print(f"Configuring UDP export to {args.server_host}:{args.server_port} (format: {args.data_format})")
-        client.exporter = UDPExporter(args.server_host, args.server_port, args.data_format)
+    # Setup one exporter per requested type, all fed from the same stream
+    for export_type in dict.fromkeys(args.export_type):
+        if export_type == "console":
+            exporter = ConsoleExporter()
+        elif export_type == "postgres":
+            if not args.postgres_conn:
+                print("Error: --postgres-conn required for PostgreSQL export")
+                sys.exit(1)
+            exporter = PostgreSQLExporter(
+                args.postgres_conn,
+                batch_mode=args.postgres_batch,
+                batch_size=args.postgres_batch_size,
+                flush_interval=args.postgres_flush_interval,
+                pool_max_size=args.postgres_pool_size,
+                event_batch_size=args.postgres_event_batch_size,
+                history=args.postgres_history,
+                history_retention_days=args.postgres_history_retention_days
+            )
+        elif export_type == "influxdb":
+            if not all([args.influx_url, args.influx_token, args.influx_org, args.influx_bucket]):
+                print("Error: InfluxDB options required for InfluxDB export")
+                sys.exit(1)
+            exporter = InfluxDBExporter(args.influx_url, args.influx_token,
+                                        args.influx_org, args.influx_bucket,
+                                        batch_size=args.influx_batch_size,
+                                        flush_interval=args.influx_flush_interval,
+                                        schema_mode=args.influx_schema,
+                                        tag_keys=args.influx_tags,
+                                        mac_shards=args.influx_mac_shards,
+                                        max_series=args.influx_max_series)
+        elif export_type == "mqtt":
+            if not args.mqtt_host:
+                print("Error: --mqtt-host required for MQTT export")
+                sys.exit(1)
+            change_thresholds = dict(MQTTExporter.DEFAULT_CHANGE_THRESHOLDS, signal_dbm=args.mqtt_signal_delta)
+            exporter = MQTTExporter(args.mqtt_host, args.mqtt_port,
+                                    args.mqtt_topic_prefix, args.mqtt_username, args.mqtt_password,
+                                    change_thresholds=change_thresholds,
+                                    retain_state=args.mqtt_retain_state,
+                                    digest_interval=args.mqtt_digest_interval,
+                                    topic_rate_limit=args.mqtt_rate_limit)
+        elif export_type == "tcp":
+            print(f"Configuring TCP export to {args.server_host}:{args.server_port} (format: {args.data_format})")
+            exporter = TCPExporter(args.server_host, args.server_port, args.data_format,
+                                   flush_size=args.tcp_flush_size,
+                                   flush_interval=args.tcp_flush_interval,
+                                   replay_size=args.tcp_replay_size)
+        elif export_type == "udp":
+            print(f"Configuring UDP export to {args.server_host}:{args.server_port} (format: {args.data_format})")
+            exporter = UDPExporter(args.server_host, args.server_port, args.data_format,
+                                   max_datagram_size=args.udp_max_datagram,
+                                   flush_interval=args.udp_flush_interval,
+                                   compress=args.udp_compress)
+        elif export_type == "parquet":
+            print(f"Configuring Parquet archive in {args.parquet_dir} (compression: {args.parquet_compression})")
+            exporter = ParquetExporter(args.parquet_dir, compression=args.parquet_compression,
+                                       batch_size=args.parquet_batch_size,
+                                       flush_interval=args.parquet_flush_interval,
+                                       max_file_bytes=int(args.parquet_max_file_mb * 1024 * 1024),
+                                       roll_interval=args.parquet_roll_interval)
+        client.add_exporter(exporter, name=export_type)
     
     # Setup signal handlers for graceful shutdown
     def signal_handler(signum, frame):
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Kismet Session Recorder and Replay Server
+Records Kismet monitor and event bus WebSocket frames, replays them from a local
+WebSocket server, and generates synthetic device populations for exporter load tests
+"""
+
+import asyncio
+import argparse
+import gzip
+import heapq
+import logging
+import random
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import websockets
+
+from kismet_json_codec import codec, iter_frames
+from kismet_monitor import MonitorSubscription
+
+# Session channels
+DEVICES = "devices"
+EVENTS = "events"
+
+SESSION_HEADER = "# kismet-session 1"
+
+
+def project_device(device: Dict[str, Any], fields: List[Any]) -> Dict[str, Any]:
+    """Apply a monitor field list to a full device record the way Kismet does
+
+    Fields are names or [path, rename] pairs with "/" separated paths. A
+    field without a rename is keyed by the last path component, and a path
+    that does not resolve is sent as 0.
+    """
+    result = {}
+    for field in fields:
+        if isinstance(field, (list, tuple)):
+            path, rename = field[0], field[1] if len(field) > 1 else None
+        else:
+            path, rename = field, None
+        keys = path.split('/')
+        value = device
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        result[rename or keys[-1]] = 0 if value is None else value
+    return result
+
+
+class RecordedSession:
+    """Frames captured by SessionRecorder
+
+    The file is gzip-compressed text: a header line, then one frame per
+    line as "<offset seconds>\\t<channel>\\t<frame>".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def frames(self, channel: str) -> Iterator[Tuple[float, Any]]:
+        """Yield (offset, raw frame) for one channel in recording order"""
+        with gzip.open(self.path, 'rt', encoding='utf-8') as session:
+            for line in session:
+                if line.startswith('#'):
+                    continue
+                offset, line_channel, frame = line.rstrip('\n').split('\t', 2)
+                if line_channel == channel:
+                    yield float(offset), frame
+
+
+class SessionRecorder:
+    """Capture a live Kismet session to a compressed session file
+
+    Devices are recorded with the "full" monitor profile, so a replay can
+    serve clients using any profile. Event bus recording subscribes to every
+    event type.
+    """
+
+    def __init__(self, kismet_host: str, kismet_port: int, output_path: str,
+                 rate: int = 1, events: bool = True, duration: float = 0):
+        self.kismet_host = kismet_host
+        self.kismet_port = kismet_port
+        self.output_path = output_path
+        self.rate = rate
+        self.events = events
+        self.duration = duration
+        self.output = None
+        self.started = None
+        self.stats = {DEVICES: 0, EVENTS: 0}
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.SessionRecorder")
+
+    async def run(self):
+        """Record until duration elapses (or forever when it is 0)"""
+        subscription = MonitorSubscription(profile="full", rate=self.rate)
+        tasks = [self._record("/devices/monitor", DEVICES, subscription.requests())]
+        if self.events:
+            tasks.append(self._record("/eventbus/events", EVENTS, [{"SUBSCRIBE": "*"}]))
+
+        self.output = gzip.open(self.output_path, 'wt', encoding='utf-8')
+        self.output.write(f"{SESSION_HEADER} {codec.dumps({'host': self.kismet_host, 'started': time.time()})}\n")
+        self.started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), self.duration or None)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.output.close()
+            self.logger.info(f"Recorded {self.stats[DEVICES]} device and {self.stats[EVENTS]} event "
+                             f"frames to {self.output_path}")
+
+    async def _record(self, path: str, channel: str, requests: List[Dict[str, Any]]):
+        """Record one WebSocket endpoint"""
+        uri = f"ws://{self.kismet_host}:{self.kismet_port}{path}"
+        self.logger.info(f"Recording {uri}")
+        async with websockets.connect(uri, max_size=None) as websocket:
+            for request in requests:
+                await websocket.send(codec.dumps(request))
+            async for message in iter_frames(websocket):
+                self.write(channel, message)
+
+    def write(self, channel: str, frame):
+        """Append a frame with its offset from the start of the recording"""
+        if isinstance(frame, bytes):
+            frame = frame.decode('utf-8')
+        # Raw line breaks can only be insignificant whitespace in JSON
+        frame = frame.replace('\n', ' ').replace('\r', ' ')
+        self.output.write(f"{time.monotonic() - self.started:.6f}\t{channel}\t{frame}\n")
+        self.stats[channel] += 1
+
+
+class SyntheticSource:
+    """Synthetic device updates for a population of `devices` MACs
+
+    Updates arrive at rate per second. chatty_share of them go to the
+    chatty_fraction busiest devices and the rest are spread over the whole
+    population. Signals random-walk with an occasional large jump, and
+    packet counters only grow. Records use the nested "full" Kismet layout.
+    With alert_rate set, DEAUTHFLOOD alerts are emitted on the event channel.
+    The same seed always produces the same stream.
+    """
+
+    PHYS = [
+        ('IEEE802.11', '6', 2437000), ('IEEE802.11', '36', 5180000), ('IEEE802.11', '11', 2462000),
+        ('IEEE802.11', '1', 2412000), ('IEEE802.11', '149', 5745000), ('IEEE802.11', '6', 2437000),
+        ('IEEE802.11', '44', 5220000), ('Bluetooth', '', 2402000), ('Bluetooth', '', 2480000),
+        ('BTLE', '', 2426000)
+    ]
+    # Reference point devices are scattered around
+    ORIGIN = (38.8895, -77.0353, 30.0)
+
+    def __init__(self, devices: int = 10000, rate: float = 1000.0, chatty_fraction: float = 0.01,
+                 chatty_share: float = 0.8, alert_rate: float = 0.0, duration: float = 0,
+                 seed: int = 1):
+        self.devices = devices
+        self.rate = rate
+        self.chatty = max(1, int(devices * chatty_fraction))
+        self.chatty_share = chatty_share
+        self.alert_rate = alert_rate
+        self.duration = duration
+        self.seed = seed
+
+    @staticmethod
+    def mac_addr(index: int) -> str:
+        """Locally administered MAC for a device index"""
+        return '02:%02X:%02X:%02X:%02X:%02X' % ((index >> 32) & 255, (index >> 24) & 255,
+                                                 (index >> 16) & 255, (index >> 8) & 255, index & 255)
+
+    def frames(self, channel: str) -> Iterator[Tuple[float, Any]]:
+        """Yield (offset, record) for one channel"""
+        if channel == DEVICES:
+            return self._updates()
+        return self._alerts() if self.alert_rate else iter(())
+
+    def _updates(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        rng = random.Random(self.seed)
+        signal = array('b', bytes(self.devices))
+        packets = array('Q', bytes(8 * self.devices))
+        first_seen = array('d', bytes(8 * self.devices))
+        epoch = time.time()
+        lat, lon, alt = self.ORIGIN
+
+        count = 0
+        while True:
+            offset = count / self.rate
+            if self.duration and offset >= self.duration:
+                return
+            count += 1
+
+            if rng.random() < self.chatty_share:
+                index = rng.randrange(self.chatty)
+            else:
+                index = rng.randrange(self.devices)
+
+            now = epoch + offset
+            if not first_seen[index]:
+                first_seen[index] = now
+                signal[index] = rng.randint(-90, -40)
+            elif rng.random() < 0.01:
+                signal[index] = max(-100, min(-20, signal[index] + rng.choice((-15, 15))))
+            else:
+                signal[index] = max(-100, min(-20, signal[index] + rng.randint(-2, 2)))
+            sent = rng.randint(1, 20)
+            packets[index] += sent
+
+            phy, channel, frequency = self.PHYS[index % len(self.PHYS)]
+            # Stable per-device position derived from the index
+            spread = ((index * 2654435761) % 10000) / 10000.0 - 0.5
+            yield offset, {
+                'kismet.device.base.key': f'{index:016X}_0',
+                'kismet.device.base.macaddr': self.mac_addr(index),
+                'kismet.device.base.name': '',
+                'kismet.device.base.username': '',
+                'kismet.device.base.phyname': phy,
+                'kismet.device.base.manuf': 'Synthetic',
+                'kismet.device.base.first_time': int(first_seen[index]),
+                'kismet.device.base.last_time': int(now),
+                'kismet.device.base.channel': channel,
+                'kismet.device.base.frequency': frequency,
+                'kismet.device.base.packets.total': packets[index],
+                'kismet.device.base.packets.tx': packets[index] // 2,
+                'kismet.device.base.packets.rx': packets[index] - packets[index] // 2,
+                'kismet.device.base.datasize': packets[index] * 120,
+                'kismet.device.base.signal': {
+                    'kismet.common.signal.last_signal': signal[index],
+                    'kismet.common.signal.last_noise': -95,
+                    'kismet.common.signal.last_snr': signal[index] + 95
+                },
+                'kismet.device.base.location': {
+                    'kismet.common.location.avg_lat': lat + spread * 0.02,
+                    'kismet.common.location.avg_lon': lon - spread * 0.02,
+                    'kismet.common.location.avg_alt': alt
+                }
+            }
+
+    def _alerts(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        rng = random.Random(self.seed + 1)
+        epoch = time.time()
+        count = 0
+        while True:
+            offset = count / self.alert_rate
+            if self.duration and offset >= self.duration:
+                return
+            count += 1
+            yield offset, {'ALERT': {
+                'kismet.alert.header': 'DEAUTHFLOOD',
+                'kismet.alert.timestamp': epoch + offset,
+                'kismet.alert.transmitter_mac': self.mac_addr(rng.randrange(self.chatty)),
+                'kismet.alert.text': 'Synthetic deauthentication flood'
+            }}
+
+
+def write_session(source, output_path: str) -> int:
+    """Write a finite source to a session file, returning the frame count"""
+    frames = heapq.merge(((offset, DEVICES, record) for offset, record in source.frames(DEVICES)),
+                         ((offset, EVENTS, record) for offset, record in source.frames(EVENTS)),
+                         key=lambda frame: frame[0])
+    count = 0
+    with gzip.open(output_path, 'wt', encoding='utf-8') as output:
+        output.write(f"{SESSION_HEADER} {codec.dumps({'synthetic': True, 'started': time.time()})}\n")
+        for offset, channel, record in frames:
+            output.write(f"{offset:.6f}\t{channel}\t{codec.dumps(record)}\n")
+            count += 1
+    return count
+
+
+class ReplayServer:
+    """Local stand-in for the Kismet monitor and event bus WebSockets
+
+    Serves /devices/monitor, /devices/views/phy-<name>/monitor and
+    /eventbus/events from a recorded session or a synthetic source. Every
+    connection replays its channel from the start at speed times the
+    recorded pace (0 sends as fast as the client reads), optionally looping.
+
+    Device frames honour the client's monitor request like Kismet does:
+    streaming starts once a request arrives, its field list is applied, and
+    requests for specific keys or MACs filter the stream. Events are sent
+    unfiltered unless the client subscribes to specific event types. The
+    REST catch-up endpoint is not emulated.
+    """
+
+    def __init__(self, source, host: str = "localhost", port: int = 2501,
+                 speed: float = 1.0, loop: bool = False, request_timeout: float = 5.0):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.loop = loop
+        self.request_timeout = request_timeout
+        self.server = None
+        self.stats = {
+            'clients': 0,
+            'frames_sent': 0
+        }
+
+        # Setup logging
+        self.logger = logging.getLogger(f"{__name__}.ReplayServer")
+
+    async def start(self):
+        """Start listening (port 0 picks a free port)"""
+        self.server = await websockets.serve(self.handler, self.host, self.port,
+                                             max_size=None, compression=None)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.logger.info(f"Replay server listening on ws://{self.host}:{self.port} (speed {self.speed or 'max'})")
+
+    async def close(self):
+        """Stop the server and drop its connections"""
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handler(self, websocket, path: str = None):
+        """Serve one client connection"""
+        if path is None:
+            request = getattr(websocket, 'request', None)
+            path = request.path if request is not None else websocket.path
+        path = path.split('?', 1)[0]
+
+        phy = None
+        if path == "/eventbus/events":
+            channel = EVENTS
+        elif path == "/devices/monitor":
+            channel = DEVICES
+        elif path.startswith("/devices/views/") and path.endswith("/monitor"):
+            channel = DEVICES
+            view = path.split('/')[3]
+            phy = view[4:] if view.startswith("phy-") else None
+        else:
+            await websocket.close(1008, "Unknown endpoint")
+            return
+
+        self.stats['clients'] += 1
+        client = {'fields': None, 'targets': set(), 'event_types': set(), 'ready': asyncio.Event()}
+        reader = asyncio.create_task(self._read_requests(websocket, client))
+        try:
+            if channel == DEVICES:
+                # Kismet streams nothing until a monitor request arrives
+                await asyncio.wait_for(client['ready'].wait(), self.request_timeout)
+            await self._stream(websocket, channel, client, phy)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+            pass
+        finally:
+            reader.cancel()
+
+    async def _read_requests(self, websocket, client: Dict[str, Any]):
+        """Track monitor requests and event subscriptions sent by the client"""
+        async for message in websocket:
+            try:
+                request = codec.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue
+            if 'monitor' in request:
+                client['fields'] = request.get('fields') or None
+                client['targets'].add(str(request['monitor']).lower())
+                client['ready'].set()
+            if 'SUBSCRIBE' in request:
+                client['event_types'].add(request['SUBSCRIBE'])
+            if 'UNSUBSCRIBE' in request:
+                client['event_types'].discard(request['UNSUBSCRIBE'])
+
+    async def _stream(self, websocket, channel: str, client: Dict[str, Any], phy: Optional[str]):
+        """Send a channel's frames at the configured pace"""
+        start = time.monotonic()
+        base = 0.0
+        sent = 0
+        while True:
+            last = 0.0
+            for offset, payload in self.source.frames(channel):
+                last = offset
+                delay = start + (base + offset) / self.speed - time.monotonic() if self.speed else 0
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif sent % 100 == 0:
+                    # Let other clients and the request reader run when behind schedule
+                    await asyncio.sleep(0)
+                sent += 1
+
+                frame = (self._device_frame(payload, client, phy) if channel == DEVICES
+                         else self._event_frame(payload, client))
+                if frame is not None:
+                    await websocket.send(frame)
+                    self.stats['frames_sent'] += 1
+
+            if not self.loop or not last:
+                return
+            base += last
+
+    def _device_frame(self, payload, client: Dict[str, Any], phy: Optional[str]) -> Optional[str]:
+        """Filter and project one device record for a client"""
+        targets = client['targets']
+        fields = client['fields']
+        if phy is None and "*" in targets and isinstance(payload, str):
+            # Whole records of the full profile need no reshaping
+            if fields is None or all(isinstance(field, str) and '/' not in field for field in fields):
+                return payload
+
+        device = codec.loads(payload) if isinstance(payload, str) else payload
+        if phy is not None and device.get('kismet.device.base.phyname') != phy:
+            return None
+        if "*" not in targets:
+            key = str(device.get('kismet.device.base.key', '')).lower()
+            mac_addr = str(device.get('kismet.device.base.macaddr', '')).lower()
+            if key not in targets and mac_addr not in targets:
+                return None
+        return codec.dumps(project_device(device, fields) if fields else device)
+
+    def _event_frame(self, payload, client: Dict[str, Any]) -> Optional[str]:
+        """Filter one event bus message by the client's subscriptions"""
+        event_types = client['event_types']
+        if event_types and "*" not in event_types:
+            event = codec.loads(payload) if isinstance(payload, str) else payload
+            if not any(event_type in event for event_type in event_types):
+                return None
+        return payload if isinstance(payload, str) else codec.dumps(payload)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get replay statistics"""
+        return dict(self.stats)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Kismet Session Recorder and Replay Server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Recorder options
+    record = subparsers.add_parser("record", help="Record a live Kismet session")
+    record.add_argument("--kismet-host", default="localhost", help="Kismet server hostname")
+    record.add_argument("--kismet-port", type=int, default=2501, help="Kismet server port")
+    record.add_argument("--output", required=True, help="Session file to write (gzip)")
+    record.add_argument("--update-rate", type=int, default=1, help="Monitor update rate in seconds")
+    record.add_argument("--duration", type=float, default=0, help="Seconds to record (0 until interrupted)")
+    record.add_argument("--no-events", action="store_true", help="Do not record the event bus")
+
+    # Synthetic population options (shared by serve and generate)
+    synthetic = argparse.ArgumentParser(add_help=False)
+    synthetic.add_argument("--devices", type=int, default=10000, help="Synthetic device population")
+    synthetic.add_argument("--rate", type=float, default=1000.0, help="Synthetic device updates per second")
+    synthetic.add_argument("--chatty-fraction", type=float, default=0.01,
+                           help="Fraction of devices that are chatty")
+    synthetic.add_argument("--chatty-share", type=float, default=0.8,
+                           help="Share of updates sent by the chatty devices")
+    synthetic.add_argument("--alert-rate", type=float, default=0.0, help="Synthetic alerts per second")
+    synthetic.add_argument("--seed", type=int, default=1, help="Random seed")
+
+    # Replay options
+    serve = subparsers.add_parser("serve", parents=[synthetic],
+                                  help="Replay a session file or a synthetic population")
+    serve.add_argument("--session", help="Session file to replay (default: synthetic population)")
+    serve.add_argument("--host", default="localhost", help="Listen address")
+    serve.add_argument("--port", type=int, default=2501, help="Listen port")
+    serve.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (0 for max speed)")
+    serve.add_argument("--loop", action="store_true", help="Restart the session when it ends")
+
+    generate = subparsers.add_parser("generate", parents=[synthetic],
+                                     help="Write a synthetic session file")
+    generate.add_argument("--output", required=True, help="Session file to write (gzip)")
+    generate.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic to generate")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "record":
+        recorder = SessionRecorder(args.kismet_host, args.kismet_port, args.output,
+                                   rate=args.update_rate, events=not args.no_events,
+                                   duration=args.duration)
+        await recorder.run()
+        return
+
+    if args.command == "generate":
+        source = SyntheticSource(args.devices, args.rate, args.chatty_fraction, args.chatty_share,
+                                 args.alert_rate, duration=args.duration, seed=args.seed)
+        print(f"Wrote {write_session(source, args.output)} frames to {args.output}")
+        return
+
+    if args.session:
+        source = RecordedSession(args.session)
+    else:
+        source = SyntheticSource(args.devices, args.rate, args.chatty_fraction, args.chatty_share,
+                                 args.alert_rate, seed=args.seed)
+    server = ReplayServer(source, args.host, args.port, speed=args.speed, loop=args.loop)
+    await server.start()
+    try:
+        await asyncio.Future()
+    finally:
+        await server.close()
+        stats = server.get_stats()
+        print(f"Served {stats['frames_sent']} frames to {stats['clients']} clients")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
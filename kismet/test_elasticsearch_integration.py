@@ -9,8 +9,10 @@ import json
 import sqlite3
 import tempfile
 import os
+import threading
+import time
 from datetime import datetime, timezone
-from kismet_elasticsearch_export import OfflineStorage, ElasticsearchExporter, KismetElasticsearchClient
+from kismet_elasticsearch_export import OfflineStorage, ElasticsearchExporter, KismetElasticsearchClient, DrainThrottle
 
 def test_offline_storage():
     """Test offline storage functionality"""
@@ -194,6 +196,12 @@ def test_elasticsearch_document_preparation():
         assert doc['_source']['location']['lat'] == 37.7749, "Incorrect latitude in geo_point"
         assert doc['_source']['location']['lon'] == -122.4194, "Incorrect longitude in geo_point"
         
+        # Index month and _id come from the record, not the time it is sent
+        assert doc['_index'] == 'kismet-devices-2025.01', f"Index not taken from the record: {doc['_index']}"
+        assert doc['_id'] == 'cc:dd:ee:ff:aa:bb-1737477045123', f"Unexpected _id: {doc['_id']}"
+        assert exporter._prepare_device_doc(dict(device_data, last_seen=1737477045))['_id'] == \
+            'cc:dd:ee:ff:aa:bb-1737477045000', "_id not taken from last_seen"
+        
         print("✅ Document preparation tests passed!")
         
     except ImportError:
@@ -243,6 +251,311 @@ def test_buffer_management():
         if os.path.exists(db_path):
             os.unlink(db_path)
 
+def test_group_commit():
+    """Test batched writes and sharing the buffer with a sync thread"""
+    print("\nTesting buffer group commits...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        storage = OfflineStorage(os.path.join(directory, 'buffer.db'), batch_size=3, flush_interval=60)
+        
+        journal_mode = storage._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == 'wal', f"Expected WAL journal, got {journal_mode}"
+        
+        def device(i):
+            return {'timestamp': datetime.now(timezone.utc).isoformat(), 'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}'}
+        
+        storage.store_device(device(0))
+        storage.store_device(device(1))
+        assert storage.write_stats['commits'] == 0, "Rows committed before the batch filled"
+        storage.store_device(device(2))
+        assert storage.write_stats['commits'] == 1, "Full batch not committed"
+        assert storage.write_stats['rows_written'] == 3, "Batch rows not written"
+        print("✅ Group commit: OK")
+        
+        # A sync thread reads and marks rows with its own connection while rows are written
+        synced = []
+        def sync_worker():
+            while len(synced) < 20:
+                devices = storage.get_unsynced_devices(limit=5)
+                if storage.mark_synced('device_buffer', [d['_buffer_id'] for d in devices]):
+                    synced.extend(devices)
+        
+        worker = threading.Thread(target=sync_worker)
+        worker.start()
+        for i in range(3, 20):
+            storage.store_device(device(i))
+        storage.flush()
+        worker.join(timeout=10)
+        assert not worker.is_alive(), "Sync thread did not finish"
+        
+        assert len({d['mac_addr'] for d in synced}) == 20, "Rows lost or synced twice"
+        assert len(storage.connections) == 2, "Expected one connection per thread"
+        assert storage.get_stats()['unsynced_devices'] == 0
+        storage.close()
+        print("✅ Concurrent sync thread: OK")
+    
+    print("✅ Group commit tests passed!")
+
+async def test_writer_thread():
+    """Test the non-blocking writer thread API"""
+    print("\nTesting buffer writer thread...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        storage = OfflineStorage(os.path.join(directory, 'buffer.db'), batch_size=50, flush_interval=60)
+        storage.start_writer()
+        
+        for i in range(120):
+            assert storage.enqueue_device({'timestamp': datetime.now(timezone.utc).isoformat(),
+                                           'mac_addr': f'aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}'})
+        storage.enqueue_event({'event_type': 'new_device', 'mac_addr': 'aa:bb:cc:dd:00:00'})
+        
+        assert await storage.flush_async(), "Writer flush failed"
+        queue_stats = storage.get_queue_stats()
+        assert queue_stats['enqueued'] == 121 and queue_stats['depth'] == 0, f"Unexpected queue stats {queue_stats}"
+        assert storage.write_stats['rows_written'] == 121, "Queued rows not written"
+        
+        # Reads from another thread see everything enqueued before them
+        stats = storage.get_stats()
+        assert stats['unsynced_devices'] == 120 and stats['unsynced_events'] == 1
+        assert storage.writer.is_alive(), "Writer thread stopped"
+        print("✅ Enqueue and flush: OK")
+        
+        # Rows still queued at close are committed
+        storage.enqueue_device({'timestamp': datetime.now(timezone.utc).isoformat(), 'mac_addr': 'ff:ff:ff:ff:ff:ff'})
+        writer = storage.writer
+        await storage.close_async()
+        assert not writer.is_alive(), "Writer thread still running after close"
+        assert storage.write_stats['rows_written'] == 122, "Row lost on close"
+        print("✅ Close: OK")
+    
+    # A full queue drops instead of blocking the caller
+    with tempfile.TemporaryDirectory() as directory:
+        storage = OfflineStorage(os.path.join(directory, 'buffer.db'), batch_size=1, max_pending=1)
+        row = {'timestamp': datetime.now(timezone.utc).isoformat(), 'mac_addr': 'aa:aa:aa:aa:aa:aa'}
+        with storage.write_lock:
+            # The writer stalls opening its connection, so the next row stays queued
+            assert storage.enqueue_device(row)
+            while storage.write_queue.qsize():
+                time.sleep(0.01)
+            assert storage.enqueue_device(row)
+            assert not storage.enqueue_device(row), "Enqueue should fail when the queue is full"
+        assert storage.get_queue_stats()['dropped'] == 1
+        await storage.close_async()
+        assert storage.write_stats['rows_written'] == 2
+        print("✅ Queue overflow: OK")
+    
+    print("✅ Writer thread tests passed!")
+
+def test_buffer_compaction():
+    """Test the sync cursor, compaction and the size cap"""
+    print("\nTesting buffer compaction...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'buffer.db')
+        storage = OfflineStorage(db_path)
+        for i in range(10):
+            storage.store_device({'timestamp': datetime.now(timezone.utc).isoformat(),
+                                  'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}'})
+        
+        devices = storage.get_unsynced_devices(limit=4)
+        assert storage.mark_synced('device_buffer', [d['_buffer_id'] for d in devices])
+        assert storage.compact() == 4, "Synced rows not deleted"
+        stats = storage.get_stats()
+        assert stats['total_devices'] == 6 and stats['unsynced_devices'] == 6
+        storage.close()
+        
+        # The cursor survives a restart
+        storage = OfflineStorage(db_path)
+        devices = storage.get_unsynced_devices()
+        assert [d['mac_addr'] for d in devices] == [f'aa:bb:cc:dd:ee:{i:02x}' for i in range(4, 10)]
+        assert storage.mark_synced('device_buffer', [devices[0]['_buffer_id']])
+        storage.close()
+        assert OfflineStorage(db_path).get_stats()['unsynced_devices'] == 5, "Cursor not persisted"
+        print("✅ Sync cursor: OK")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'buffer.db')
+        storage = OfflineStorage(db_path, batch_size=1000)
+        assert storage._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2, "Incremental vacuum off"
+        for i in range(2000):
+            storage.store_device({'timestamp': datetime.now(timezone.utc).isoformat(),
+                                  'mac_addr': f'aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}', 'name': 'x' * 200})
+        storage.store_event({'event_type': 'NEWDEVICE'})
+        storage.flush()
+        storage.compact()
+        full_size = os.path.getsize(db_path)
+        
+        storage.max_bytes = 100000
+        assert storage.compact() > 0, "Nothing evicted over the size cap"
+        assert storage._used_bytes(storage._connection()) <= storage.max_bytes
+        assert os.path.getsize(db_path) < full_size / 2, "Free pages not reclaimed"
+        
+        # Eviction removes the oldest devices first
+        devices = storage.get_unsynced_devices(limit=10000)
+        assert devices and devices[-1]['mac_addr'] == 'aa:bb:cc:dd:07:cf', "Newest device evicted"
+        stats = storage.get_stats()
+        assert stats['buffer_evicted'] == 2001 - stats['total_devices'] - stats['total_events']
+        storage.close()
+        print("✅ Size cap: OK")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'buffer.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE device_buffer (id INTEGER PRIMARY KEY, timestamp TEXT, mac_addr TEXT, data JSON)")
+        conn.close()
+        
+        storage = OfflineStorage(db_path)
+        assert storage._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 0, "Old buffer vacuumed at open"
+        storage.close()
+        storage = OfflineStorage(db_path, convert_vacuum=True)
+        assert storage._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2, "Old buffer not converted"
+        storage.close()
+        print("✅ Vacuum conversion opt-in: OK")
+    
+    print("✅ Buffer compaction tests passed!")
+
+async def test_bulk_indexer():
+    """Test the live bulk indexer against a stub _bulk endpoint"""
+    print("\nTesting bulk indexer...")
+    from aiohttp import web
+    
+    requests = []
+    async def bulk(request):
+        lines = (await request.text()).strip().split('\n')
+        docs = [json.loads(line) for line in lines[1::2]]
+        requests.append(docs)
+        # Reject one device the way Elasticsearch reports a mapping error
+        items = [{'index': {'status': 400 if doc['mac_addr'] == 'ff:ff:ff:ff:ff:ff' else 201,
+                            'error': {'type': 'mapper_parsing_exception'}}} for doc in docs]
+        return web.json_response({'took': 1, 'errors': True, 'items': items},
+                                 headers={'X-Elastic-Product': 'Elasticsearch'})
+    
+    app = web.Application()
+    app.router.add_route('*', '/_bulk', bulk)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'buffer.db')
+        exporter = ElasticsearchExporter(hosts=[url], offline_mode=True,
+                                         offline_storage=OfflineStorage(db_path),
+                                         bulk_size=3, bulk_interval=0.05)
+        # Pretend the connection check succeeded
+        exporter.offline_mode = False
+        exporter.connected = True
+        exporter.client_config = {'hosts': [url]}
+        
+        for mac in ['aa:aa:aa:aa:aa:aa', 'ff:ff:ff:ff:ff:ff', 'bb:bb:bb:bb:bb:bb']:
+            await exporter.export_device({'timestamp': datetime.now(timezone.utc).isoformat(), 'mac_addr': mac})
+        await exporter.export_device({'timestamp': datetime.now(timezone.utc).isoformat(), 'mac_addr': 'cc:cc:cc:cc:cc:cc'})
+        await asyncio.sleep(0.3)
+        assert [len(docs) for docs in requests] == [3, 1], f"Unexpected bulk requests {requests}"
+        print("✅ Size and interval flushes: OK")
+        
+        stats = exporter.get_status()['bulk']
+        assert stats['docs_indexed'] == 3 and stats['docs_failed'] == 1, f"Unexpected stats {stats}"
+        await exporter.close()
+        
+        devices = OfflineStorage(db_path).get_unsynced_devices()
+        assert [d['mac_addr'] for d in devices] == ['ff:ff:ff:ff:ff:ff'], "Only the rejected device should be buffered"
+        print("✅ Failed documents buffered: OK")
+    
+    await runner.cleanup()
+    print("✅ Bulk indexer tests passed!")
+
+def test_drain_offline_data():
+    """Test draining the offline buffer with concurrent, throttled bulk requests"""
+    print("\nTesting offline buffer drain...")
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from elasticsearch import Elasticsearch
+    
+    state = {'requests': 0, 'active': 0, 'max_active': 0, 'indexed': [], 'ids': [], 'throttle_all': False}
+    lock = threading.Lock()
+    
+    class BulkHandler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+            lines = body.strip().split('\n')
+            docs = [json.loads(line) for line in lines[1::2]]
+            with lock:
+                state['requests'] += 1
+                state['active'] += 1
+                state['max_active'] = max(state['max_active'], state['active'])
+                # The first requests are throttled as a busy cluster would
+                throttled = state['requests'] <= 2 or state['throttle_all']
+            time.sleep(0.02)
+            if throttled:
+                items = [{'index': {'status': 429, 'error': {'type': 'es_rejected_execution_exception'}}}
+                         for _ in docs]
+            else:
+                items = [{'index': {'status': 201}} for _ in docs]
+                with lock:
+                    state['indexed'].extend(docs)
+                    state['ids'].extend(json.loads(line)['index'].get('_id') for line in lines[0::2])
+            payload = json.dumps({'took': 1, 'errors': throttled, 'items': items}).encode()
+            with lock:
+                state['active'] -= 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('X-Elastic-Product', 'Elasticsearch')
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        do_POST = do_PUT
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BulkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        storage = OfflineStorage(os.path.join(directory, 'buffer.db'), batch_size=1000)
+        for i in range(2500):
+            storage.store_device({'timestamp': datetime.now(timezone.utc).isoformat(),
+                                  'mac_addr': f'aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}'})
+        for i in range(10):
+            storage.store_event({'event_type': 'NEWDEVICE', 'index': i})
+        
+        exporter = ElasticsearchExporter(hosts=["http://localhost:9200"], offline_mode=True,
+                                         offline_storage=storage)
+        exporter.offline_mode = False
+        exporter.connected = True
+        exporter.es_client = Elasticsearch([f"http://127.0.0.1:{server.server_address[1]}"])
+        
+        synced = exporter.drain_offline_data(chunk_size=200, workers=3, initial_backoff=0.05)
+        assert synced == 2510, f"Expected 2510 records synced, got {synced}"
+        assert len(state['indexed']) == 2510, "Throttled documents not retried"
+        assert state['max_active'] > 1, "Bulk requests were not concurrent"
+        assert len(set(state['ids']) - {None}) == 2500, "Drained device documents share an _id"
+        stats = storage.get_stats()
+        assert stats['unsynced_devices'] == 0 and stats['unsynced_events'] == 0, "Backlog not drained"
+        print("✅ Drain with throttling: OK")
+        
+        # Nothing is sent again once the backlog is empty
+        requests = state['requests']
+        assert exporter.drain_offline_data(chunk_size=200, workers=3) == 0
+        assert state['requests'] == requests
+        print("✅ Empty backlog: OK")
+        
+        # A chunk that stays throttled gives up after max_retries, or at once when stopping
+        state['throttle_all'] = True
+        docs = [exporter._prepare_device_doc({'mac_addr': 'aa:aa:aa:aa:aa:aa', 'last_seen': 1})]
+        assert exporter._index_chunk(docs, DrainThrottle(1, initial_backoff=0.01), max_retries=2) is None
+        assert state['requests'] == requests + 3, "Throttled chunk not retried exactly max_retries times"
+        assert exporter._index_chunk(docs, DrainThrottle(1, initial_backoff=10),
+                                     should_stop=lambda: True) is None
+        assert state['requests'] == requests + 4, "Retried after a stop request"
+        storage.close()
+        print("✅ Bounded retries: OK")
+    
+    server.shutdown()
+    print("✅ Offline drain tests passed!")
+
 async def run_all_tests():
     """Run all tests"""
     print("🧪 Starting Kismet Elasticsearch Integration Tests\n")
@@ -253,6 +566,11 @@ async def run_all_tests():
         await test_offline_mode()
         test_elasticsearch_document_preparation()
         test_buffer_management()
+        test_group_commit()
+        test_buffer_compaction()
+        await test_writer_thread()
+        await test_bulk_indexer()
+        test_drain_offline_data()
         
         print("\n🎉 All tests passed successfully!")
         print("\nNext steps:")
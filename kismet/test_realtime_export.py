@@ -0,0 +1,1117 @@
+#!/usr/bin/env python3
+"""
+Test script for the Kismet real-time export client
+Tests exporter batching and record handling without live sinks
+"""
+
+import asyncio
+import json
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime
+from kismet_realtime_export import (KismetExportClient, PostgreSQLExporter, InfluxDBExporter, MQTTExporter,
+                                    TCPExporter, UDPExporter, ParquetExporter, IngestQueue, IngestGovernor, DeviceStateCache,
+                                    SensorDedupe, parse_kismet_server, PARQUET_AVAILABLE)
+from kismet_json_codec import JSONCodec, ORJSON_AVAILABLE, MSGSPEC_AVAILABLE
+from kismet_device_record import BatchTimestamp, DeviceRecord, record_dict
+from kismet_monitor import MonitorSubscription, MonitorSupervisor, AIOHTTP_AVAILABLE
+from kismet_decode_pool import DecodePool
+from kismet_replay import (ReplayServer, RecordedSession, SyntheticSource, project_device, write_session,
+                           DEVICES, EVENTS)
+
+def test_postgres_batch_records():
+    """Test PostgreSQL batch record preparation"""
+    print("Testing PostgreSQL batch records...")
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet", batch_mode=True, batch_size=2)
+
+    device_info = {
+        'mac_addr': 'aa:bb:cc:dd:ee:ff',
+        'name': 'Test Device',
+        'phy_type': 'IEEE802.11',
+        'frequency': 2412000.0,
+        'last_seen': 1737476000,
+        'signal_dbm': -42,
+        'latitude': 40.7128
+    }
+
+    record = exporter._device_record(device_info)
+    columns = [column for column, _ in PostgreSQLExporter.DEVICE_COLUMNS]
+
+    assert len(record) == len(columns), "Record does not match column list"
+    assert record[columns.index('mac_addr')] == 'aa:bb:cc:dd:ee:ff', "MAC address mismatch"
+    assert record[columns.index('frequency')] == 2412000, "Frequency not coerced to integer"
+    assert isinstance(record[columns.index('frequency')], int), "Frequency not coerced to integer"
+    assert record[columns.index('noise_dbm')] is None, "Missing field should be NULL"
+    assert record[columns.index('latitude')] == 40.7128, "Latitude mismatch"
+
+    stats = exporter.get_stats()
+    assert stats['buffered'] == 0, "Buffer should start empty"
+    assert stats['avg_batch_size'] == 0, "Average batch size should start at 0"
+
+    # Delta records are merged into the stored row rather than nulling columns
+    assert exporter.accepts_deltas, "PostgreSQL should accept delta records"
+    assert not PostgreSQLExporter("postgresql://localhost/kismet", history=True).accepts_deltas
+    assert "COALESCE(EXCLUDED.signal_dbm, kismet_devices.signal_dbm)" in PostgreSQLExporter.DEVICE_UPSERT
+    delta = exporter._device_record({'mac_addr': 'aa:bb:cc:dd:ee:ff', 'last_seen': 1737476001, 'channel': '11'})
+    rows = exporter._merge_rows([delta, record])
+    assert len(rows) == 1, "Rows not merged per MAC"
+    assert rows[0][columns.index('channel')] == '11' and rows[0][columns.index('signal_dbm')] == -42, \
+        f"Delta not merged onto the full row: {rows[0]}"
+
+    print("✅ PostgreSQL batch record tests passed!")
+
+async def test_postgres_flush_retry():
+    """Test that failed PostgreSQL batches are retried, then written row by row"""
+    print("\nTesting PostgreSQL flush retries...")
+
+    class FailingPool:
+        """Batch COPYs fail; single-row upserts fail only for one bad MAC"""
+
+        def __init__(self):
+            self.upserted = []
+
+        def acquire(self):
+            raise ConnectionError("connection refused")
+
+        async def execute(self, query, *args):
+            if args[0] == 'aa:bb:cc:dd:ee:00':
+                raise ValueError("bad row")
+            self.upserted.append(args[0])
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet", batch_mode=True,
+                                  batch_size=2, max_flush_retries=2)
+    exporter.pool = FailingPool()
+    exporter.buffer = [exporter._device_record({'mac_addr': f'aa:bb:cc:dd:ee:0{i}', 'last_seen': i})
+                       for i in range(2)]
+
+    await exporter.flush()
+    assert len(exporter.buffer) == 2, "Failed batch not re-queued"
+    await exporter.flush()
+    assert exporter.stats['flush_errors'] == 1, "Flush retried before the backoff elapsed"
+
+    await exporter.flush(force=True)
+    assert len(exporter.buffer) == 2 and exporter.stats['records_dropped'] == 0
+    await exporter.flush(force=True)
+    assert not exporter.buffer, "Batch not given up after retries"
+    assert exporter.pool.upserted == ['aa:bb:cc:dd:ee:01'], "Good row not salvaged one at a time"
+    assert exporter.stats['records_dropped'] == 1, "Only the failing row should be dropped"
+    assert exporter.stats['flush_errors'] == 3
+
+    # Both write paths ignore updates older than the stored row
+    assert "kismet_devices.last_seen <= EXCLUDED.last_seen" in PostgreSQLExporter.DEVICE_UPSERT
+
+    print("✅ PostgreSQL flush retry tests passed!")
+
+class LegacyEventsConnection:
+    """asyncpg connection stub holding the baseline's unpartitioned kismet_events"""
+
+    def __init__(self, fail_on=None, rows=()):
+        self.fail_on = fail_on
+        self.statements = []
+        self.rows = list(rows)
+        self.copied = []
+
+    def transaction(self):
+        return self
+
+    def acquire(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetchval(self, query):
+        return 'kismet_events' if 'to_regclass' in query and 'pg_partitioned_table' not in query else None
+
+    async def fetch(self, query):
+        return [{'column_name': column} for column in
+                ('id', 'event_type', 'event_time', 'device_mac', 'event_data', 'created_at')]
+
+    async def cursor(self, query, prefetch=None):
+        self.statements.append(' '.join(query.split()))
+        for row in self.rows:
+            yield row
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.extend(records)
+
+    async def execute(self, query):
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError("permission denied")
+        self.statements.append(' '.join(query.split()))
+        return "INSERT 0 3"
+
+async def test_postgres_event_migration():
+    """Test migration of an unpartitioned kismet_events table"""
+    print("\nTesting PostgreSQL event table migration...")
+
+    rows = [
+        (datetime(2024, 1, 2, 10, 30), 'NEWDEVICE', None, '{"mac": "aa:bb"}'),
+        ('1704240000', 'ALERT', None, None),
+        ('02/01/2024 10:30', 'ALERT', None, '{}'),
+        (datetime(2024, 1, 3), None, None, '{}')
+    ]
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet")
+    exporter.pool = conn = LegacyEventsConnection(rows=rows)
+    await exporter._create_events_table()
+    assert conn.statements[0] == "ALTER TABLE kismet_events RENAME TO kismet_events_legacy"
+    assert any("event_data::text FROM kismet_events_legacy" in sql for sql in conn.statements), conn.statements
+    assert [row[0].date().isoformat() for row in conn.copied] == ['2024-01-02', '2024-01-03'], conn.copied
+    assert conn.copied[1][3] == '{}', "Missing legacy payload not defaulted"
+    assert any("PARTITION OF kismet_events FOR VALUES FROM ('2024-01-03" in sql for sql in conn.statements)
+    assert exporter.stats['legacy_events_skipped'] == 2, "Unparseable legacy rows not skipped"
+    print("✅ Legacy rows copied: OK")
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet")
+    exporter.pool = LegacyEventsConnection(fail_on="RENAME")
+    try:
+        await exporter._create_events_table()
+        assert False, "Migration failure not raised"
+    except RuntimeError:
+        pass
+    exporter.events_enabled = False
+    await exporter.export_event({'event_type': 'ALERT'})
+    assert not exporter.event_buffer, "Events buffered with persistence disabled"
+    print("✅ Failed migration disables events: OK")
+
+    class FailingPool:
+        def acquire(self):
+            raise ConnectionError("connection refused")
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet", max_flush_retries=1)
+    exporter.pool = FailingPool()
+    exporter.event_buffer = [exporter._event_record({'ALERT': {}})]
+    await exporter.flush_events()
+    assert len(exporter.event_buffer) == 1, "Failed event batch not re-queued"
+    await exporter.flush_events()
+    assert exporter.stats['event_flush_errors'] == 1, "Event flush retried before the backoff elapsed"
+    await exporter.flush_events(force=True)
+    assert not exporter.event_buffer and exporter.stats['events_dropped'] == 1, "Event batch not dropped"
+    print("✅ Event flush retries: OK")
+
+    print("✅ PostgreSQL event migration tests passed!")
+
+def test_postgres_event_records():
+    """Test PostgreSQL event row preparation"""
+    print("\nTesting PostgreSQL event records...")
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet")
+
+    alert = {
+        'ALERT': {'kismet.alert.header': 'DEAUTHFLOOD', 'kismet.alert.timestamp': 1737476000.5},
+        'sensor': 'north'
+    }
+    event_time, event_type, sensor, payload = exporter._event_record(alert)
+    assert event_type == 'ALERT', f"Unexpected event type: {event_type}"
+    assert event_time.timestamp() == 1737476000.5 and event_time.tzinfo is not None, "Alert time not used"
+    assert sensor == 'north', "Sensor not extracted"
+    assert json.loads(payload) == alert, "Payload does not round-trip"
+
+    event_time, event_type, sensor, _ = exporter._event_record({'message': 'text only'})
+    assert event_type == 'unknown' and sensor is None, "Unexpected fallback row"
+    assert abs(event_time.timestamp() - time.time()) < 5, "Missing time should default to now"
+    assert len(exporter._event_record(alert)) == len(PostgreSQLExporter.EVENT_COLUMNS)
+
+    print("✅ PostgreSQL event record tests passed!")
+
+def test_postgres_history_records():
+    """Test PostgreSQL history row preparation"""
+    print("\nTesting PostgreSQL history records...")
+
+    exporter = PostgreSQLExporter("postgresql://localhost/kismet", history=True)
+
+    row = exporter._history_record({
+        'mac_addr': 'aa:bb:cc:dd:ee:ff',
+        'last_seen': 1737476000,
+        'signal_dbm': -42.0,
+        'latitude': 40.7128,
+        'total_packets': '17',
+        'sensor': 'north'
+    })
+    columns = ['observed_at'] + [column for column, _ in PostgreSQLExporter.HISTORY_COLUMNS]
+    assert len(row) == len(columns), "History row does not match column list"
+    values = dict(zip(columns, row))
+    assert values['observed_at'].timestamp() == 1737476000 and values['observed_at'].tzinfo is not None
+    assert values['signal_dbm'] == -42 and isinstance(values['signal_dbm'], int), "Signal not coerced"
+    assert values['total_packets'] == 17, "Packet counter not coerced"
+    assert values['noise_dbm'] is None and values['sensor'] == 'north'
+    print("✅ History rows: OK")
+
+    print("✅ PostgreSQL history record tests passed!")
+
+async def test_ingest_queue_policies():
+    """Test ingest queue overflow policies"""
+    print("\nTesting ingest queue overflow policies...")
+
+    queue = IngestQueue(maxsize=2, policy="drop-oldest")
+    for i in range(3):
+        await queue.put('device', {'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}'}, f'aa:bb:cc:dd:ee:{i:02x}')
+    kind, payload = await queue.get()
+    assert payload['mac_addr'] == 'aa:bb:cc:dd:ee:01', "Oldest record not dropped"
+    assert queue.get_stats()['dropped_oldest'] == 1, "Drop counter not updated"
+    print("✅ Drop-oldest: OK")
+
+    queue = IngestQueue(maxsize=2, policy="drop-newest")
+    for i in range(3):
+        await queue.put('device', {'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}'})
+    kind, payload = await queue.get()
+    assert payload['mac_addr'] == 'aa:bb:cc:dd:ee:00', "Newest record not dropped"
+    assert queue.get_stats()['dropped_newest'] == 1, "Drop counter not updated"
+    print("✅ Drop-newest: OK")
+
+    queue = IngestQueue(maxsize=2, policy="coalesce")
+    await queue.put('device', {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -80}, 'aa:bb:cc:dd:ee:ff')
+    await queue.put('event', {'event_type': 'ALERT'})
+    await queue.put('device', {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -40}, 'aa:bb:cc:dd:ee:ff')
+    stats = queue.get_stats()
+    assert stats['depth'] == 2, f"Expected depth 2, got {stats['depth']}"
+    assert stats['coalesced'] == 1, "Coalesce counter not updated"
+    kind, payload = await queue.get()
+    assert kind == 'device' and payload['signal_dbm'] == -40, "Latest update not kept in place"
+    await queue.put('device', {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -30}, 'aa:bb:cc:dd:ee:ff')
+    assert queue.get_stats()['depth'] == 2, "Dequeued MAC should queue again"
+    print("✅ Coalesce per MAC: OK")
+
+    queue = IngestQueue(maxsize=2, policy="coalesce", merge=True)
+    await queue.put('device', {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'channel': '6'}, 'aa:bb:cc:dd:ee:ff')
+    await queue.put('device', {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -40}, 'aa:bb:cc:dd:ee:ff')
+    kind, payload = await queue.get()
+    assert payload == {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'channel': '6', 'signal_dbm': -40}, \
+        f"Coalesced deltas not merged: {payload}"
+    print("✅ Coalesce merges deltas: OK")
+
+    print("✅ Ingest queue tests passed!")
+
+class RecordingExporter:
+    """Exporter stub that records what it receives"""
+
+    def __init__(self):
+        self.devices = []
+        self.events = []
+
+    async def export_device(self, device_info):
+        self.devices.append(device_info)
+
+    async def export_event(self, event_data):
+        self.events.append(event_data)
+
+    async def close(self):
+        pass
+
+async def test_multi_sink_fanout():
+    """Test fan-out of one parsed stream to several exporters"""
+    print("\nTesting multi-sink fan-out...")
+
+    client = KismetExportClient()
+    first = RecordingExporter()
+    second = RecordingExporter()
+    client.add_exporter(first, "first")
+    client.add_exporter(second, "second")
+    client.start_export_workers()
+
+    await client.process_device_update({'kismet.device.base.macaddr': 'aa:bb:cc:dd:ee:ff'})
+    await client.process_event({'event_type': 'ALERT'})
+    await client.stop()
+
+    assert len(first.devices) == 1 and len(second.devices) == 1, "Device not delivered to every sink"
+    assert first.devices[0] is second.devices[0], "Device record extracted more than once"
+    assert len(first.events) == 1 and len(second.events) == 1, "Event not delivered to every sink"
+    assert client.exporter is first, "Compatibility exporter property mismatch"
+
+    client = KismetExportClient(delta_mode="delta")
+    full = RecordingExporter()
+    merging = RecordingExporter()
+    merging.accepts_deltas = True
+    client.add_exporter(full, "full")
+    client.add_exporter(merging, "merging")
+    client.start_export_workers()
+    update = {'kismet.device.base.macaddr': 'aa:bb:cc:dd:ee:ff', 'kismet.device.base.channel': '6'}
+    await client.process_device_update(update)
+    await client.process_device_update(dict(update, **{'kismet.device.base.channel': '11'}))
+    await client.stop()
+
+    assert len(full.devices) == 2 and full.devices[1]['phy_type'] is not None, "Non-merging sink got a delta"
+    assert 'phy_type' not in merging.devices[1] and merging.devices[1]['channel'] == '11', \
+        f"Merging sink did not get the delta: {merging.devices[1]}"
+
+    print("✅ Multi-sink fan-out tests passed!")
+
+class FlakyWriteApi:
+    """InfluxDB write API stub that throttles the first request"""
+
+    def __init__(self):
+        self.calls = 0
+        self.records = []
+
+    def write(self, bucket, record):
+        self.calls += 1
+        if self.calls == 1:
+            error = Exception("throttled")
+            error.status = 429
+            error.retry_after = "0"
+            raise error
+        self.records.append(record)
+
+async def test_influxdb_line_protocol():
+    """Test InfluxDB line protocol encoding and batched writes"""
+    print("\nTesting InfluxDB line protocol writer...")
+
+    exporter = InfluxDBExporter("http://localhost:8086", "token", "org", "bucket",
+                                batch_size=2, flush_interval=0.05)
+
+    line = exporter.encode_device_line({
+        'mac_addr': 'aa:bb:cc:dd:ee:ff',
+        'phy_type': 'IEEE802.11',
+        'manufacturer': 'Acme, Inc',
+        'signal_dbm': -42,
+        'frequency': 2412000,
+        'latitude': 40.7128,
+        'last_seen': 1737476000
+    })
+    assert line == ("device_metrics,mac_addr=aa:bb:cc:dd:ee:ff,phy_type=IEEE802.11,"
+                    "manufacturer=Acme\\,\\ Inc signal_dbm=-42i,frequency=2412000.0,"
+                    "latitude=40.7128 1737476000000000000"), f"Unexpected line: {line}"
+    print("✅ Line encoding: OK")
+
+    exporter.write_api = FlakyWriteApi()
+    for i in range(3):
+        await exporter.export_device({'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}', 'signal_dbm': -40 - i})
+    await exporter.close()
+
+    stats = exporter.get_stats()
+    assert stats['points_written'] == 3, f"Expected 3 points written, got {stats['points_written']}"
+    assert stats['retries'] == 1, "Throttled write not retried"
+    assert len(exporter.write_api.records) == 2, "Points not written in batches"
+    print("✅ Batched writes with retry: OK")
+
+    print("✅ InfluxDB writer tests passed!")
+
+def test_influxdb_bounded_schema():
+    """Test InfluxDB series cardinality control"""
+    print("\nTesting InfluxDB bounded schema...")
+
+    exporter = InfluxDBExporter("http://localhost:8086", "token", "org", "bucket",
+                                schema_mode="bounded", tag_keys=['phy_type', 'manufacturer'],
+                                mac_shards=4, max_series=1)
+
+    first = exporter.encode_device_line({
+        'mac_addr': 'aa:bb:cc:dd:ee:ff', 'phy_type': 'IEEE802.11',
+        'manufacturer': 'Apple', 'signal_dbm': -42, 'last_seen': 1737476000
+    })
+    tags, fields, _ = first.split(' ')
+    assert 'mac_addr=' not in tags, "MAC should not be a tag in bounded mode"
+    assert ',mac_shard=' in tags, "MAC shard tag missing"
+    assert 'mac_addr="aa:bb:cc:dd:ee:ff"' in fields, "MAC not written as a field"
+
+    second = exporter.encode_device_line({
+        'mac_addr': 'aa:bb:cc:dd:ee:ff', 'phy_type': 'IEEE802.11',
+        'manufacturer': 'Samsung', 'signal_dbm': -50, 'last_seen': 1737476001
+    })
+    tags, fields, _ = second.split(' ')
+    assert 'manufacturer=_other' in tags, "Overflow series not aggregated"
+    assert 'phy_type=IEEE802.11' in tags, "Aggregate series lost phy_type"
+    assert 'manufacturer_raw="Samsung"' in fields, "Aggregated tag value not kept as a field"
+
+    stats = exporter.get_stats()
+    assert stats['series_tracked'] == 1, "Series tracker exceeded its cap"
+    assert stats['points_aggregated'] == 1, "Aggregated point not counted"
+
+    # Devices sharing a series and a last_seen second must not overwrite each other
+    exporter = InfluxDBExporter("http://localhost:8086", "token", "org", "bucket", schema_mode="bounded",
+                                mac_shards=1)
+    assert InfluxDBExporter("http://localhost:8086", "token", "org", "bucket",
+                            schema_mode="bounded").mac_shards == 16, "Bounded mode should shard MACs"
+    lines = [exporter.encode_device_line({'mac_addr': mac, 'phy_type': 'IEEE802.11', 'signal_dbm': -40,
+                                          'last_seen': 1737476000})
+             for mac in ('aa:bb:cc:dd:ee:01', 'aa:bb:cc:dd:ee:02')]
+    identities = {(line.split(' ')[0], line.split(' ')[2]) for line in lines}
+    assert len(identities) == 2, f"Same-second points collide: {lines}"
+    for line in lines:
+        assert 1737476000000000000 <= int(line.split(' ')[2]) < 1737476001000000000, "Point left its second"
+
+    print("✅ InfluxDB bounded schema tests passed!")
+
+class RecordingMQTTClient:
+    """paho client stub that records publishes"""
+
+    def __init__(self):
+        self.messages = []
+        self.qos = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.messages.append((topic, json.loads(payload), retain))
+        self.qos.append(qos)
+
+async def test_mqtt_change_only_publishing():
+    """Test MQTT change-only publishing, state topics and digests"""
+    print("\nTesting MQTT change-only publishing...")
+
+    exporter = MQTTExporter("localhost", retain_state=True, digest_interval=60, topic_rate_limit=0)
+    exporter.client = RecordingMQTTClient()
+    exporter.connected = exporter.started = True
+
+    device_info = {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'name': 'Test', 'signal_dbm': -60, 'total_packets': 10}
+    await exporter.export_device(device_info)
+    await exporter.export_device(dict(device_info, signal_dbm=-62, total_packets=20))
+    await exporter.export_device(dict(device_info, signal_dbm=-70))
+
+    topics = [topic for topic, _, _ in exporter.client.messages]
+    assert topics.count('kismet/devices/aa_bb_cc_dd_ee_ff') == 2, "Small signal change should not publish"
+    assert topics.count('kismet/state/aa_bb_cc_dd_ee_ff') == 2, "State topic not published"
+    assert all(retain for topic, _, retain in exporter.client.messages if '/state/' in topic), "State not retained"
+    assert exporter.get_stats()['suppressed'] == 1, "Suppressed update not counted"
+    print("✅ Change thresholds: OK")
+
+    await exporter.export_device(dict(device_info, signal_dbm=-71, total_packets=30))
+    exporter.publish_digest()
+    topic, payload, _ = exporter.client.messages[-1]
+    assert topic == 'kismet/digest', "Digest not published"
+    assert payload['count'] == 1 and payload['devices'][0]['signal_dbm'] == -71, "Digest content mismatch"
+    print("✅ Digest batching: OK")
+
+    # Without a digest, the latest rate-limited update goes out when the window ends
+    exporter = MQTTExporter("localhost", topic_rate_limit=20)
+    exporter.client = RecordingMQTTClient()
+    exporter.connected = exporter.started = True
+    await exporter.export_device(device_info)
+    await exporter.export_device(dict(device_info, signal_dbm=-80))
+    await exporter.export_device(dict(device_info, signal_dbm=-81))
+    assert len(exporter.client.messages) == 1 and exporter.get_stats()['deferred_pending'] == 1
+    await asyncio.sleep(0.1)
+    topic, payload, _ = exporter.client.messages[-1]
+    assert len(exporter.client.messages) == 2 and payload['signal_dbm'] == -81, "Deferred update not published"
+    assert exporter.get_stats()['deferred_published'] == 1
+    await exporter.export_event({'ALERT': {}})
+    assert exporter.client.qos[-1] == exporter.qos, "Event QoS ignores the configured QoS"
+    print("✅ Rate-limited updates deferred: OK")
+
+    # An unreachable broker is retried after a backoff, not once per record
+    exporter = MQTTExporter("localhost", topic_rate_limit=0)
+    exporter.client = RecordingMQTTClient()
+    attempts = []
+
+    async def unreachable():
+        attempts.append(time.monotonic())
+        raise ConnectionError("Timed out connecting to MQTT broker")
+
+    exporter.connect = unreachable
+    for i in range(5):
+        await exporter.export_device(dict(device_info, signal_dbm=-40 - i))
+    await exporter.export_event({'ALERT': {}})
+    stats = exporter.get_stats()
+    assert len(attempts) == 1 and stats['connect_failures'] == 1, "Reconnect attempted per record"
+    assert stats['deferred_pending'] == 1 and stats['events_dropped'] == 1, f"Unexpected stats: {stats}"
+
+    async def reachable():
+        exporter.connected = exporter.started = True
+
+    exporter.connect = reachable
+    exporter.next_connect = 0
+    await exporter.export_device(dict(device_info, mac_addr='11:22:33:44:55:66'))
+    payloads = [payload for _, payload, _ in exporter.client.messages]
+    assert [payload['signal_dbm'] for payload in payloads] == [-44, -60], "Held update not published on connect"
+    print("✅ Connect backoff: OK")
+
+    print("✅ MQTT publishing tests passed!")
+
+async def test_tcp_coalescing_and_replay():
+    """Test TCP write coalescing and replay after reconnect"""
+    print("\nTesting TCP write coalescing and replay...")
+
+    received = []
+
+    async def handle(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            received.append(json.loads(line)['sequence'])
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    exporter = TCPExporter('127.0.0.1', port, flush_interval=0.05, replay_window=60)
+    for i in range(5):
+        await exporter.export_device({'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}'})
+    await asyncio.sleep(0.2)
+
+    assert received == [1, 2, 3, 4, 5], f"Unexpected records: {received}"
+    assert exporter.get_stats()['writes'] == 1, "Records not coalesced into one write"
+    print("✅ Write coalescing: OK")
+
+    # Simulate the collector restarting: the next write fails
+    exporter.writer.transport.abort()
+    await exporter.export_device({'mac_addr': 'aa:bb:cc:dd:ee:05'})
+    await asyncio.sleep(0.2)
+    exporter.next_connect = 0.0
+    await asyncio.sleep(0.2)
+    await exporter.close()
+    server.close()
+    await server.wait_closed()
+
+    stats = exporter.get_stats()
+    assert stats['reconnects'] == 1, "Exporter did not reconnect"
+    assert stats['records_replayed'] == 6, f"Expected 6 replayed records, got {stats['records_replayed']}"
+    assert received[-6:] == [1, 2, 3, 4, 5, 6], f"Replay order mismatch: {received}"
+    print("✅ Reconnect and replay: OK")
+
+    print("✅ TCP exporter tests passed!")
+
+async def test_udp_datagram_packing():
+    """Test UDP datagram packing and decoding"""
+    print("\nTesting UDP datagram packing...")
+
+    datagrams = []
+    loop = asyncio.get_running_loop()
+
+    class Receiver(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            datagrams.append(data)
+
+    transport, _ = await loop.create_datagram_endpoint(Receiver, local_addr=('127.0.0.1', 0))
+    port = transport.get_extra_info('sockname')[1]
+
+    for compress in (False, True):
+        datagrams.clear()
+        exporter = UDPExporter('127.0.0.1', port, max_datagram_size=600, flush_interval=0.05, compress=compress)
+        for i in range(20):
+            await exporter.export_device({'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}', 'signal_dbm': -40})
+        await exporter.close()
+        await asyncio.sleep(0.1)
+
+        assert 1 < len(datagrams) < 20, f"Expected packed datagrams, got {len(datagrams)}"
+        assert all(len(d) <= 600 for d in datagrams), "Datagram exceeds size limit"
+
+        records = []
+        sequences = []
+        for datagram in datagrams:
+            sequence, batch = UDPExporter.decode_datagram(datagram)
+            sequences.append(sequence)
+            records.extend(json.loads(record)['sequence'] for record in batch)
+        assert records == list(range(1, 21)), "Records lost or reordered"
+        assert sequences == list(range(1, len(datagrams) + 1)), "Datagram sequence mismatch"
+
+    # Records are held (bounded) while the socket cannot be set up
+    datagrams.clear()
+    exporter = UDPExporter('127.0.0.1', 70000, max_datagram_size=600, max_pending=5)
+    for i in range(20):
+        await exporter.export_device({'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}', 'signal_dbm': -40})
+    stats = exporter.get_stats()
+    assert stats['connect_failures'] == 1, "Socket setup retried without backoff"
+    assert stats['pending'] == 5 and stats['records_dropped'] == 15, f"Pending not bounded: {stats}"
+
+    exporter.server_port = port
+    exporter.next_connect = 0.0
+    await exporter.export_device({'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -40})
+    await exporter.close()
+    await asyncio.sleep(0.1)
+    records = [json.loads(record)['sequence'] for datagram in datagrams
+               for record in UDPExporter.decode_datagram(datagram)[1]]
+    assert records == list(range(16, 22)), f"Unexpected records after reconnect: {records}"
+    assert all(len(d) <= 600 for d in datagrams), "Datagram exceeds size limit"
+
+    transport.close()
+    print("✅ UDP datagram packing tests passed!")
+
+def test_delta_cache():
+    """Test per-device delta cache suppression"""
+    print("\nTesting delta cache...")
+
+    cache = DeviceStateCache(mode="changed", max_entries=2)
+    device_info = {'timestamp': '1', 'mac_addr': 'aa:bb:cc:dd:ee:ff', 'signal_dbm': -40, 'channel': '6'}
+
+    assert cache.filter(device_info) is device_info, "First sighting not forwarded"
+    assert cache.filter(dict(device_info, timestamp='2')) is None, "Unchanged device not suppressed"
+    changed = dict(device_info, timestamp='3', signal_dbm=-50)
+    assert cache.filter(changed) is changed, "Changed device not forwarded"
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 1 and stats['suppressed'] == 1, f"Unexpected stats: {stats}"
+
+    for i in range(3):
+        cache.filter({'mac_addr': f'11:22:33:44:55:{i:02x}'})
+    assert cache.get_stats()['entries'] == 2, "Cache exceeded its size cap"
+    assert cache.get_stats()['evictions'] == 2, "Evictions not counted"
+    print("✅ Changed mode: OK")
+
+    cache = DeviceStateCache(mode="delta")
+    cache.filter(device_info)
+    delta = cache.filter(dict(device_info, timestamp='4', channel='11'))
+    assert delta == {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'timestamp': '4', 'channel': '11'}, f"Unexpected delta: {delta}"
+    assert cache.filter(dict(device_info, timestamp='5', channel='11', last_seen=5, total_packets=9)) is None, \
+        "Volatile fields alone should not trigger an export"
+    print("✅ Delta mode: OK")
+
+    cache = DeviceStateCache(mode="changed", ttl=-1)
+    cache.filter(device_info)
+    assert cache.filter(dict(device_info)) is not None, "Expired entry should be forwarded"
+    print("✅ TTL expiry: OK")
+
+    print("✅ Delta cache tests passed!")
+
+def test_ingest_governor():
+    """Test adaptive sampling and token-bucket rate limiting"""
+    print("\nTesting ingest governor...")
+
+    def update(mac, signal=-50):
+        return {'mac_addr': mac, 'signal_dbm': signal}
+
+    governor = IngestGovernor(adaptive=True, min_interval=10)
+    assert governor.admit(update('aa:00')), "New device should pass"
+    assert governor.admit(update('aa:00')), "First routine update should pass"
+    assert not governor.admit(update('aa:00', -52)), "Stable device should be sampled out"
+    assert governor.admit(update('aa:00', -70)), "Large signal change should pass"
+    assert governor.get_stats()['sampled_out'] == 1 and governor.get_stats()['signal_changes'] == 1
+    print("✅ Adaptive sampling: OK")
+
+    governor = IngestGovernor(mac_rate=0.001, mac_burst=2)
+    results = [governor.admit(update('bb:00')) for _ in range(4)]
+    assert results == [True, True, True, False], f"Unexpected per-MAC limiting: {results}"
+    assert governor.get_stats()['rate_limited'] == 1
+    print("✅ Per-MAC token bucket: OK")
+
+    governor = IngestGovernor(global_rate=0.001, global_burst=2, max_entries=2)
+    assert all(governor.admit(update(f'cc:{i:02x}')) for i in range(3)), "New devices should bypass the budget"
+    assert not governor.admit(update('cc:02')), "Routine update should respect the global budget"
+    stats = governor.get_stats()
+    assert stats['budget_dropped'] == 1 and stats['entries'] == 2 and stats['evictions'] == 1, f"Unexpected stats: {stats}"
+    print("✅ Global budget and bounded state: OK")
+
+    assert not IngestGovernor().enabled, "Governor without limits should be disabled"
+    print("✅ Ingest governor tests passed!")
+
+def test_json_codec():
+    """Test JSON codec backends"""
+    print("\nTesting JSON codec...")
+
+    backends = ["stdlib"]
+    if ORJSON_AVAILABLE:
+        backends.append("orjson")
+    if MSGSPEC_AVAILABLE:
+        backends.append("msgspec")
+
+    device_info = {'mac_addr': 'aa:bb:cc:dd:ee:ff', 'name': 'Café', 'signal_dbm': -42, 'latitude': 40.7128}
+
+    for backend in backends:
+        codec = JSONCodec(backend)
+        encoded = codec.dumps_bytes(device_info)
+        assert isinstance(encoded, bytes), f"{backend}: dumps_bytes did not return bytes"
+        assert codec.loads(encoded) == device_info, f"{backend}: bytes round trip failed"
+        assert codec.loads(codec.dumps(device_info)) == device_info, f"{backend}: str round trip failed"
+
+        try:
+            codec.loads(b'{"truncated": ')
+            assert False, f"{backend}: invalid JSON accepted"
+        except json.JSONDecodeError:
+            pass
+        print(f"✅ {backend} backend: OK")
+
+    print("✅ JSON codec tests passed!")
+
+def test_device_record():
+    """Test compiled device record extraction"""
+    print("\nTesting device record extraction...")
+
+    client = KismetExportClient()
+    raw_data = {
+        'kismet.device.base.macaddr': 'AA:BB:CC:DD:EE:FF',
+        'kismet.device.base.phyname': 'IEEE802.11',
+        'kismet.device.base.packets.total': 150,
+        'kismet.device.base.signal': {'kismet.common.signal.last_signal': -45}
+    }
+
+    record = client.extract_device_info(raw_data)
+    assert isinstance(record, DeviceRecord), "Extractor did not return a DeviceRecord"
+    assert not hasattr(record, '__dict__'), "DeviceRecord should be slot-only"
+    assert record['mac_addr'] == 'AA:BB:CC:DD:EE:FF'
+    assert record['signal_dbm'] == -45 and record['noise_dbm'] == 0
+    assert record['name'] == '' and record.get('name', 'x') == ''
+    assert 'latitude' not in record and record.get('latitude') is None, "Missing location group exposed"
+    try:
+        record['latitude']
+        assert False, "Missing location field should raise KeyError"
+    except KeyError:
+        pass
+    print("✅ Field access: OK")
+
+    as_dict = record_dict(record)
+    assert as_dict is record.to_dict(), "Dict view not cached"
+    assert 'latitude' not in as_dict and as_dict['total_packets'] == 150
+    assert json.loads(json.dumps(as_dict)) == dict(record.items())
+    assert record.copy() is not as_dict and record.copy() == as_dict
+    assert record_dict(as_dict) is as_dict
+    print("✅ Dict view: OK")
+
+    timestamp = BatchTimestamp(resolution=3600)
+    assert timestamp() is timestamp(), "Timestamp not reused within its window"
+    print("✅ Batch timestamp: OK")
+
+    print("✅ Device record tests passed!")
+
+def test_monitor_subscription():
+    """Test monitor subscription profiles and filters"""
+    print("\nTesting monitor subscription...")
+
+    full = MonitorSubscription()
+    assert full.endpoints() == ["/devices/monitor"]
+    assert "kismet.device.base.signal" in full.requests()[0]['fields'], "Full profile should request nested objects"
+    print("✅ Full profile: OK")
+
+    compact = MonitorSubscription(profile="compact", rate=2)
+    request = compact.requests()[0]
+    assert request['monitor'] == "*" and request['rate'] == 2
+    assert ["kismet.device.base.signal/kismet.common.signal.last_signal", "signal_dbm"] in request['fields']
+    assert ["kismet.device.base.macaddr", "mac_addr"] in request['fields']
+
+    # Kismet returns simplified leaves under their renamed keys (0 for missing paths)
+    record = compact.extract({'mac_addr': 'AA:BB:CC:DD:EE:FF', 'signal_dbm': -45, 'noise_dbm': 0, 'snr_db': 0,
+                              'latitude': 0, 'longitude': 0, 'altitude': 0}, 'now')
+    nested = full.extract({'kismet.device.base.macaddr': 'AA:BB:CC:DD:EE:FF',
+                           'kismet.device.base.signal': {'kismet.common.signal.last_signal': -45}}, 'now')
+    assert record.to_dict() == nested.to_dict(), f"Compact and full records differ: {record}"
+    print("✅ Compact profile: OK")
+
+    minimal = MonitorSubscription(profile="minimal")
+    assert len(minimal.requests()[0]['fields']) < len(request['fields'])
+    record = minimal.extract({'mac_addr': 'AA:BB:CC:DD:EE:FF', 'signal_dbm': -60}, 'now')
+    assert record['signal_dbm'] == -60 and record['noise_dbm'] == 0 and 'latitude' not in record
+    print("✅ Minimal profile: OK")
+
+    filtered = MonitorSubscription(profile="compact", phys=["Bluetooth", "BTLE"],
+                                   devices=["4202770D00000000_0000AABBCCDDEEFF", "11:22:33:44:55:66"])
+    assert filtered.endpoints() == ["/devices/views/phy-Bluetooth/monitor", "/devices/views/phy-BTLE/monitor"]
+    requests = filtered.requests()
+    assert [r['monitor'] for r in requests] == filtered.devices
+    assert len(set(r['request'] for r in requests)) == 2, "Monitor requests need distinct ids"
+    print("✅ Phy/device filters: OK")
+
+    print("✅ Monitor subscription tests passed!")
+
+async def test_monitor_supervisor():
+    """Test monitor reconnect and REST catch-up"""
+    print("\nTesting monitor supervisor...")
+
+    if not AIOHTTP_AVAILABLE:
+        print("⚠️ aiohttp not installed, skipping")
+        return
+
+    from aiohttp import web
+
+    def device(mac, last_seen):
+        return {'mac_addr': mac, 'last_seen': last_seen}
+
+    connections = []
+    catchup_calls = []
+
+    async def monitor(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribe = json.loads((await ws.receive()).data)
+        connections.append(subscribe)
+        if len(connections) == 1:
+            # First session: two updates, then Kismet goes away
+            await ws.send_str(json.dumps(device('aa', 100)))
+            await ws.send_str(json.dumps(device('bb', 100)))
+            await ws.close()
+        else:
+            await ws.send_str(json.dumps(device('cc', 120)))
+            async for _ in ws:
+                pass
+        return ws
+
+    async def devices(request):
+        catchup_calls.append((int(request.query['page']), int(request.query['length']), await request.json()))
+        pages = [[device('aa', 100), device('cc', 120), device('dd', 110)], [device('ee', 115)]]
+        page = int(request.query['page'])
+        return web.json_response({'data': pages[page], 'last_page': len(pages)})
+
+    app = web.Application()
+    app.router.add_get('/devices/monitor', monitor)
+    app.router.add_post('/devices/views/all/devices.json', devices)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    handled = []
+
+    async def handler(device_data):
+        handled.append((device_data['mac_addr'], device_data['last_seen']))
+
+    supervisor = MonitorSupervisor('127.0.0.1', port, MonitorSubscription(profile="compact"), handler,
+                                   catchup_page_size=3, min_backoff=0.01)
+    task = asyncio.create_task(supervisor.run())
+    for _ in range(100):
+        if len(handled) >= 5 and len(catchup_calls) >= 2:
+            break
+        await asyncio.sleep(0.05)
+    await supervisor.stop()
+    await asyncio.wait_for(task, 5)
+    await runner.cleanup()
+
+    assert len(connections) == 2, f"Expected one reconnect, saw {len(connections)} connections"
+    print("✅ Reconnect: OK")
+
+    assert [(page, length) for page, length, _ in catchup_calls] == [(0, 3), (1, 3)], f"Unexpected paging: {catchup_calls}"
+    assert catchup_calls[0][2]['last_time'] == 100, "Catch-up did not start at the watermark"
+    assert catchup_calls[0][2]['fields'] == connections[0]['fields'], "Catch-up projection differs from the stream"
+    print("✅ Paged catch-up: OK")
+
+    assert sorted(handled) == [('aa', 100), ('bb', 100), ('cc', 120), ('dd', 110), ('ee', 115)], f"Unexpected updates: {handled}"
+    assert supervisor.get_stats()['duplicates'] == 2, f"Unexpected stats: {supervisor.get_stats()}"
+    print("✅ Stream dedupe: OK")
+
+    print("✅ Monitor supervisor tests passed!")
+
+async def test_multi_server_aggregation():
+    """Test multi-sensor tagging and cross-sensor dedupe"""
+    print("\nTesting multi-server aggregation...")
+
+    assert parse_kismet_server("north=10.0.0.5:2502") == ("north", "10.0.0.5", 2502)
+    assert parse_kismet_server("10.0.0.6") == ("10.0.0.6:2501", "10.0.0.6", 2501)
+    print("✅ Server specs: OK")
+
+    dedupe = SensorDedupe(window=60)
+    assert dedupe.admit('aa', 'north') and dedupe.admit('aa', 'north'), "Owning sensor was blocked"
+    assert not dedupe.admit('aa', 'south'), "Duplicate from second sensor not dropped"
+    assert dedupe.admit('bb', 'south'), "Unseen MAC should pass"
+    dedupe.window = 0
+    assert dedupe.admit('aa', 'south'), "Ownership should pass on after the window"
+    assert dedupe.get_stats()['handovers'] == 1 and dedupe.get_stats()['duplicates'] == 1
+    print("✅ Dedupe window: OK")
+
+    client = KismetExportClient(servers=[("north", "10.0.0.5", 2501), ("south", "10.0.0.6", 2501)])
+    assert len(client.supervisors) == 2, "Expected one supervisor per server"
+    sink = RecordingExporter()
+    client.add_exporter(sink, "shared")
+    client.start_export_workers()
+
+    raw = {'kismet.device.base.macaddr': 'aa:bb:cc:dd:ee:ff'}
+    await client.supervisors[0].handler(raw)
+    await client.supervisors[1].handler(raw)
+    await client.process_event({'event_type': 'ALERT'}, 'south')
+    await client.stop()
+
+    assert len(sink.devices) == 1, f"Expected one deduplicated device, got {len(sink.devices)}"
+    assert sink.devices[0]['sensor'] == "north" and sink.devices[0].to_dict()['sensor'] == "north"
+    assert sink.events[0]['sensor'] == "south", "Event not tagged with its sensor"
+    assert 'sensor' not in KismetExportClient().extract_device_info(raw), "Single-server records should not be tagged"
+    print("✅ Shared sinks and tagging: OK")
+
+    exporter = InfluxDBExporter("http://localhost:8086", "token", "org", "bucket")
+    line = exporter.encode_device_line({'mac_addr': 'aa:bb:cc:dd:ee:ff', 'phy_type': 'BTLE',
+                                        'sensor': 'north', 'signal_dbm': -60, 'last_seen': 1})
+    assert line.startswith("device_metrics,mac_addr=aa:bb:cc:dd:ee:ff,phy_type=BTLE,sensor=north "), line
+    columns = [column for column, _ in PostgreSQLExporter.DEVICE_COLUMNS]
+    assert columns[-1] == 'sensor', "PostgreSQL rows missing the sensor column"
+    print("✅ Sink sensor columns: OK")
+
+    print("✅ Multi-server aggregation tests passed!")
+
+async def test_decode_pool():
+    """Test process-pool decoding with ordered delivery"""
+    print("\nTesting decode pool...")
+
+    pool = DecodePool(workers=2, batch_size=3, batch_interval=0.01, timestamp=lambda: 'now')
+    delivered = []
+
+    async def deliver(record):
+        delivered.append(record)
+
+    pipeline = pool.pipeline("compact", deliver, sensor="north")
+    frames = [json.dumps({'mac_addr': f'aa:bb:cc:dd:ee:{i % 2:02x}', 'last_seen': i, 'signal_dbm': -40 - i}).encode()
+              for i in range(10)]
+    frames.insert(4, b'{"truncated": ')
+    for frame in frames:
+        await pipeline.feed(frame)
+    await pipeline.close()
+    await pool.close()
+
+    assert [record['last_seen'] for record in delivered] == list(range(10)), "Records delivered out of order"
+    assert all(isinstance(record, DeviceRecord) for record in delivered)
+    print("✅ Ordered delivery: OK")
+
+    record = delivered[3]
+    assert record._json is not None, "JSON not encoded in the worker"
+    assert json.loads(record.to_json()) == record.to_dict(), "Worker JSON does not match the record"
+    assert record['sensor'] == "north" and record['timestamp'] == 'now'
+    print("✅ Worker encoding: OK")
+
+    # A record with its JSON encoded crosses processes as that JSON alone
+    shipped = pickle.loads(pickle.dumps(record))
+    assert record.to_json() in pickle.dumps(record) and shipped._dict is None
+    try:
+        DeviceRecord.last_seen.__get__(shipped)
+        assert False, "Slots were pickled along with the JSON"
+    except AttributeError:
+        pass
+    assert shipped['last_seen'] == 3 and shipped.get('signal_dbm') == -43 and 'sensor' in shipped
+    assert shipped.to_dict() == record.to_dict() and shipped.to_json() == record.to_json()
+    print("✅ JSON-only record pickling: OK")
+
+    stats = pool.get_stats()
+    assert stats['frames'] == 11 and stats['records'] == 10 and stats['decode_errors'] == 1, f"Unexpected stats: {stats}"
+    print("✅ Decode stats: OK")
+
+    pool = DecodePool(workers=1, batch_size=2, batch_interval=0.01, timestamp=lambda: 'now')
+    delivered = []
+    pipeline = pool.pipeline("compact", deliver)
+    frames = [json.dumps({'mac_addr': 'aa:bb:cc:dd:ee:ff', 'last_seen': i}).encode() for i in range(6)]
+    for frame in frames[:2]:
+        await pipeline.feed(frame)
+    await asyncio.sleep(0.5)
+    for process in list(pool.executor._processes.values()):
+        process.kill()
+    await asyncio.sleep(0.5)
+    for frame in frames[2:]:
+        await pipeline.feed(frame)
+    await pipeline.close()
+    await pool.close()
+
+    assert [record['last_seen'] for record in delivered] == list(range(6)), "Records lost when a worker died"
+    assert pool.get_stats()['pool_restarts'] == 1, f"Broken pool not restarted: {pool.get_stats()}"
+    print("✅ Broken pool restart: OK")
+
+    print("✅ Decode pool tests passed!")
+
+async def test_parquet_archive():
+    """Test partitioned Parquet archive writing and rolling"""
+    print("\nTesting Parquet archive...")
+
+    if not PARQUET_AVAILABLE:
+        print("⚠️  pyarrow not installed, skipping")
+        return
+
+    import pyarrow.dataset as ds
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        exporter = ParquetExporter(output_dir, batch_size=2, flush_interval=0.05, max_file_bytes=1)
+        for i in range(5):
+            await exporter.export_device({
+                'mac_addr': f'aa:bb:cc:dd:ee:{i:02x}',
+                'phy_type': 'IEEE802.11' if i % 2 else 'Bluetooth',
+                'last_seen': 1737476000 + i * 43200,
+                'signal_dbm': -40 - i,
+                'frequency': 'unknown',
+                'sensor': 'north'
+            })
+        await exporter.close()
+
+        paths = sorted(os.path.relpath(os.path.join(root, name), output_dir)
+                       for root, _, names in os.walk(output_dir) for name in names)
+        assert paths and all(os.path.basename(path).startswith('part-') for path in paths), \
+            f"Temporary files left behind: {paths}"
+        assert {os.path.dirname(path) for path in paths} == {
+            'date=2025-01-21/phy_type=Bluetooth',
+            'date=2025-01-22/phy_type=Bluetooth', 'date=2025-01-22/phy_type=IEEE802.11',
+            'date=2025-01-23/phy_type=Bluetooth', 'date=2025-01-23/phy_type=IEEE802.11'}, f"Unexpected partitions: {paths}"
+        print("✅ Date/phy partitioning: OK")
+
+        table = ds.dataset(output_dir, format="parquet", partitioning="hive").to_table()
+        rows = sorted(table.to_pylist(), key=lambda row: row['mac_addr'])
+        assert len(rows) == 5, f"Expected 5 rows, got {len(rows)}"
+        assert rows[1]['phy_type'] == 'IEEE802.11' and rows[1]['signal_dbm'] == -41
+        assert rows[0]['frequency'] is None and rows[0]['sensor'] == 'north'
+        print("✅ Archive readable as a dataset: OK")
+
+        stats = exporter.get_stats()
+        assert stats['rows_written'] == 5 and stats['files_written'] == len(paths) and stats['open_files'] == 0, \
+            f"Unexpected stats: {stats}"
+        print("✅ File rolling: OK")
+
+    print("✅ Parquet archive tests passed!")
+
+async def test_replay_server():
+    """Test synthetic sessions and the replay server"""
+    print("\nTesting replay server...")
+
+    import websockets
+
+    source = SyntheticSource(devices=50, rate=1000, duration=0.1, alert_rate=50, seed=7)
+    first = [record for _, record in source.frames(DEVICES)]
+    assert len(first) == 100 and first == [record for _, record in source.frames(DEVICES)], \
+        "Synthetic stream not reproducible"
+    assert len({record['kismet.device.base.macaddr'] for record in first}) <= 50
+
+    compact = MonitorSubscription(profile="compact")
+    flat = project_device(first[0], compact.fields)
+    record = compact.extract(flat, 'now')
+    assert record['mac_addr'] == first[0]['kismet.device.base.macaddr'], "Projection lost the MAC"
+    assert record['signal_dbm'] == first[0]['kismet.device.base.signal']['kismet.common.signal.last_signal']
+    assert project_device({}, [['kismet.device.base.signal/kismet.common.signal.last_signal', 'signal_dbm']]) == \
+        {'signal_dbm': 0}, "Missing paths should be sent as 0"
+    print("✅ Synthetic source and field projection: OK")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.gz")
+        assert write_session(source, path) == 105, "Unexpected frame count"
+        session = RecordedSession(path)
+        offsets = [offset for offset, _ in session.frames(DEVICES)]
+        assert len(offsets) == 100 and offsets == sorted(offsets), "Device frames not in order"
+        assert sum(1 for _ in session.frames(EVENTS)) == 5, "Events not recorded"
+        print("✅ Session file round trip: OK")
+
+        server = ReplayServer(session, port=0, speed=0)
+        await server.start()
+        try:
+            uri = f"ws://localhost:{server.port}/devices/views/phy-Bluetooth/monitor"
+            async with websockets.connect(uri) as websocket:
+                await websocket.send(json.dumps(compact.requests()[0]))
+                frame = json.loads(await asyncio.wait_for(websocket.recv(), 5))
+            assert frame['phy_type'] == 'Bluetooth' and 'kismet.device.base.signal' not in frame, \
+                f"Unexpected replayed frame: {frame}"
+
+            async with websockets.connect(f"ws://localhost:{server.port}/eventbus/events") as websocket:
+                event = json.loads(await asyncio.wait_for(websocket.recv(), 5))
+            assert 'ALERT' in event, "Event not replayed"
+        finally:
+            await server.close()
+        assert server.get_stats()['clients'] == 2
+        print("✅ Replay with phy view and field simplification: OK")
+
+    print("✅ Replay server tests passed!")
+
+async def run_all_tests():
+    """Run all tests"""
+    print("🧪 Starting Kismet Real-Time Export Tests\n")
+
+    try:
+        test_postgres_batch_records()
+        await test_postgres_flush_retry()
+        await test_postgres_event_migration()
+        test_postgres_event_records()
+        test_postgres_history_records()
+        await test_ingest_queue_policies()
+        await test_multi_sink_fanout()
+        await test_influxdb_line_protocol()
+        test_influxdb_bounded_schema()
+        await test_mqtt_change_only_publishing()
+        await test_tcp_coalescing_and_replay()
+        await test_udp_datagram_packing()
+        test_delta_cache()
+        test_ingest_governor()
+        test_json_codec()
+        test_device_record()
+        test_monitor_subscription()
+        await test_monitor_supervisor()
+        await test_multi_server_aggregation()
+        await test_decode_pool()
+        await test_parquet_archive()
+        await test_replay_server()
+
+        print("\n🎉 All tests passed successfully!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(run_all_tests())